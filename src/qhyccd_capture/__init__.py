@@ -1,4 +1,11 @@
-from .qhyccd_capture import CameraControlWidget
+from .camera import QHYCCDCamera, QHYCCDCameraGroup, QHYCCDError, scan_cameras
+from .async_camera import AsyncQHYCCDCamera
 __version__ = "0.0.3.6"
 
 
+def __getattr__(name):
+    # 延迟导入界面部件，无界面环境只使用 QHYCCDCamera 时不加载 napari 和 PyQt5
+    if name == 'CameraControlWidget':
+        from .qhyccd_capture import CameraControlWidget
+        return CameraControlWidget
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
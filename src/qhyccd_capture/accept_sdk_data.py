@@ -1,5 +1,5 @@
 from PyQt5.QtCore import QThread, pyqtSignal
-import time
+import queue
 
 class AcceptSDKData(QThread):
     data_signal = pyqtSignal(dict)  # 定义信号，发送字典数据
@@ -11,11 +11,24 @@ class AcceptSDKData(QThread):
 
     def run(self):
         while self.is_running:
-            if not self.sdk_output_queue.empty():
-                result = self.sdk_output_queue.get()  # 从输出队列获取数据
-                self.data_signal.emit(result)  # 发送信号
-            else:
-                time.sleep(0.1)  # 短暂休眠以减少CPU占用
+            # 阻塞等待消息，到达即转发，不再按固定间隔轮询；进程内后端的帧延迟由此决定
+            try:
+                result = self.sdk_output_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            # 一次取完已到达的消息，曝光进度按相机和来源合并，只发送最新一条
+            progress = {}
+            while result is not None:
+                if result['order'] == 'exposure_progress':
+                    progress[(result.get('camera_id'), result['data']['source'])] = result
+                else:
+                    self.data_signal.emit(result)  # 发送信号
+                try:
+                    result = self.sdk_output_queue.get_nowait()  # 从输出队列获取数据
+                except queue.Empty:
+                    result = None
+            for result in progress.values():
+                self.data_signal.emit(result)
 
     def stop(self):
         self.is_running = False
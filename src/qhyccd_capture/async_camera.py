@@ -0,0 +1,349 @@
+import asyncio
+import queue
+from collections import deque
+
+from .camera import QHYCCDCamera, QHYCCDError
+from .language import translations
+
+
+class AsyncQHYCCDCamera(QHYCCDCamera):
+    """QHYCCDCamera 的 asyncio 版本
+
+    应答通过事件循环监听 sdk_output_queue 底层管道的可读事件分发，不占用轮询线程，
+    多台相机、赤道仪、调焦器可在同一个事件循环中驱动::
+
+        async with AsyncQHYCCDCamera() as cam:
+            await cam.set_exposure(20000)
+            img = await cam.capture()
+            async for frame in cam.frames(max_frames=100):
+                ...
+
+    序列拍摄和连续模式分别用 sequence() 和 frames() 异步产出图像，capture_sequence() 和 stream() 是它们的别名。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop = None
+        self.waiters = {}
+        self.frame_queue = None
+        self.sequence_queue = None
+        self.reader_task = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def start_reader(self):
+        """注册输出队列与进程哨兵的可读回调，Proactor 事件循环退化为执行器读取"""
+        self.loop = asyncio.get_running_loop()
+        try:
+            self.loop.add_reader(self.output_queue._reader.fileno(), self.on_readable)
+            self.loop.add_reader(self.process.sentinel, self.on_process_exit)
+        except NotImplementedError:
+            self.reader_task = self.loop.create_task(self.executor_reader())
+
+    def stop_reader(self):
+        if self.loop is None:
+            return
+        if self.reader_task is not None:
+            self.reader_task.cancel()
+            self.reader_task = None
+        else:
+            self.loop.remove_reader(self.output_queue._reader.fileno())
+            self.loop.remove_reader(self.process.sentinel)
+
+    async def executor_reader(self):
+        while True:
+            try:
+                result = await self.loop.run_in_executor(None, self.output_queue.get, True, 0.5)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    self.on_process_exit()
+                    return
+                continue
+            self.dispatch(result)
+
+    def on_readable(self):
+        # 一次取完可读的消息，曝光进度只回调最新一条
+        progress = None
+        while True:
+            try:
+                result = self.output_queue.get_nowait()
+            except queue.Empty:
+                break
+            if result['order'] == 'exposure_progress':
+                progress = result
+                continue
+            self.dispatch(result)
+        if progress is not None:
+            self.dispatch(progress)
+
+    def on_process_exit(self):
+        self.loop.remove_reader(self.process.sentinel)
+        self.fail_waiters(QHYCCDError(translations[self.language]['qhyccd_sdk']['process_error']))
+
+    def fail_waiters(self, error):
+        for futures in self.waiters.values():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+        self.waiters.clear()
+
+    def dispatch(self, result):
+        order = result['order']
+        if order == 'error':
+            self.errors.append(result['data'])
+            return
+        if order == 'exposure_progress':
+            if self.progress_callback is not None:
+                self.progress_callback(result['data'])
+            return
+        if order == 'telemetry_ring':
+            self.on_telemetry_ring(result['data'])
+            return
+        if order == 'preview_frame' and self.frame_queue is not None:
+            # 共享内存只有两块缓冲，积压的旧描述已失效，只保留最新帧
+            if self.frame_queue.full():
+                self.frame_queue.get_nowait()
+            self.frame_queue.put_nowait(result['data'])
+            return
+        if order == 'sequenceCapture_frame' and self.sequence_queue is not None:
+            self.sequence_queue.put_nowait(result['data'])
+            return
+        futures = self.waiters.get(order)
+        while futures:
+            # 跳过已超时取消的等待者
+            future = futures.popleft()
+            if not future.done():
+                future.set_result(result['data'])
+                return
+        if order == 'stop_success':
+            self.fail_waiters(QHYCCDError(translations[self.language]['qhyccd_sdk']['process_error']))
+
+    def expect(self, reply):
+        future = self.loop.create_future()
+        self.waiters.setdefault(reply, deque()).append(future)
+        return future
+
+    async def wait_for(self, reply, timeout=None, future=None, failure=None, failed=None):
+        """等待指定应答，期间收到的错误信息在超时或先收到 failure 应答时一并抛出"""
+        if future is None:
+            future = self.expect(reply)
+        if failure is not None and failed is None:
+            failed = self.expect(failure)
+        try:
+            if failed is None:
+                return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+            await asyncio.wait((future, failed), timeout=self.timeout if timeout is None else timeout, return_when=asyncio.FIRST_COMPLETED)
+            if future.done():
+                return future.result()
+            if failed.done():
+                failed.result()  # 进程退出时抛出 process_error
+                raise QHYCCDError('; '.join(self.errors[-3:]) or failure)
+            raise asyncio.TimeoutError
+        except asyncio.TimeoutError:
+            message = '; '.join(self.errors[-3:]) or reply
+            raise QHYCCDError(f"timeout waiting for {reply}: {message}") from None
+        finally:
+            for pending in (future, failed):
+                if pending is not None and not pending.done():
+                    pending.cancel()
+
+    async def request(self, order, data, reply, timeout=None, failure=None):
+        self.errors.clear()
+        # 先登记等待再发送，避免应答在登记前到达
+        future = self.expect(reply)
+        failed = self.expect(failure) if failure is not None else None
+        self.send(order, data)
+        return await self.wait_for(reply, timeout, future, failure, failed)
+
+    async def open(self):
+        if self.process is not None:
+            return
+        self.start_worker()
+        self.start_reader()
+        try:
+            init_future = self.expect('init_qhyccd_resource_success')
+            names_future = self.expect('readCameraName_success')
+            await self.wait_for('init_qhyccd_resource_success', future=init_future)
+            self.camera_ids = await self.wait_for('readCameraName_success', future=names_future)
+            if not self.camera_ids:
+                raise QHYCCDError(translations[self.language]['qhyccd_sdk']['open_camera_failed'])
+            if self.camera_id is None:
+                self.camera_id = self.camera_ids[0]
+            elif self.camera_id not in self.camera_ids:
+                raise QHYCCDError(f"{translations[self.language]['qhyccd_sdk']['open_camera_failed']}: {self.camera_id}")
+            data = await self.request('open_camera', self.camera_id, 'openCamera_success')
+            self.readout_mode_name_dict = data['readout_mode_name_dict']
+            self.stream_and_capture_mode_dict = data['stream_and_capture_mode_dict']
+            self.attach_buffers(await self.request('get_image_buffer_size', self.camera_id, 'getImageBufferSize_success'))
+            if self.readout_mode is None:
+                self.readout_mode = list(self.readout_mode_name_dict.keys())[0]
+            self.camera_param = await self.request('init_camera', [self.camera_id, self.readout_mode, self.camera_mode_name()], 'initCamera_success', failure='initCamera_failed')
+            self.apply_camera_param(self.camera_param)
+            await self.request('set_resolution', (0, 0, self.image_w, self.image_h), 'setResolution_success', failure='setResolution_failed')
+        except BaseException:
+            await self.close()
+            raise
+
+    async def close(self):
+        if self.process is not None:
+            if self.process.is_alive():
+                try:
+                    await self.request('stop', '', 'stop_success')
+                except QHYCCDError:
+                    pass
+            self.stop_reader()
+            await self.loop.run_in_executor(None, self.process.join, self.timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+            self.worker = None
+        self.fail_waiters(QHYCCDError(translations[self.language]['qhyccd_sdk']['process_error']))
+        self.release_buffers()
+        self.frame_reader.close()
+        self.close_telemetry_ring()
+        self.streaming = False
+
+    async def set_exposure(self, exposure_us: float) -> float:
+        self.exposure = await self.request('set_exposure_time', float(exposure_us), 'setExposureTime_success', failure='setExposureTime_failed')
+        return self.exposure
+
+    async def set_gain(self, gain: float) -> float:
+        return await self.request('set_gain', float(gain), 'setGain_success', failure='setGain_failed')
+
+    async def set_offset(self, offset: float) -> float:
+        return await self.request('set_offset', float(offset), 'setOffset_success', failure='setOffset_failed')
+
+    async def set_usb_traffic(self, usb_traffic: int) -> int:
+        return await self.request('set_usb_traffic', int(usb_traffic), 'setUsbTraffic_success', failure='setUsbTraffic_failed')
+
+    async def auto_tune_usb(self, traffic=None, readout_modes=None, depths=None, duration=2.0, use_cache=True, apply=True):
+        """异步扫描 USB 流量，参数和返回值与 QHYCCDCamera.auto_tune_usb 相同"""
+        data = {'traffic': traffic, 'readout_modes': readout_modes, 'depths': depths, 'duration': duration, 'use_cache': use_cache, 'apply': apply}
+        result = await self.request('auto_tune_usb', data, 'autoTuneUSB_success', self.usb_tune_timeout(data), 'autoTuneUSB_failed')
+        if apply and result['best']['depth'] is not None:
+            self.image_b = result['best']['depth']
+        return result
+
+    async def set_depth(self, depth: int) -> int:
+        self.image_b = await self.request('set_camera_depth', int(depth), 'setDepth_success', failure='setDepth_failed')
+        await self.sync_preview()
+        return self.image_b
+
+    async def set_bin(self, pixel_bin) -> str:
+        if isinstance(pixel_bin, int):
+            pixel_bin = f"{pixel_bin}*{pixel_bin}"
+        await self.request('set_camera_pixel_bin', pixel_bin, 'setCameraPixelBin_success', failure='setCameraPixelBin_failed')
+        bin_x, bin_y = self.camera_param['pixel_bin'][pixel_bin]
+        await self.set_roi(0, 0, self.camera_param['readout_w'] // bin_x, self.camera_param['readout_h'] // bin_y)
+        return pixel_bin
+
+    async def set_roi(self, x: int, y: int, w: int, h: int):
+        await self.request('set_resolution', (int(x), int(y), int(w), int(h)), 'setResolution_success', failure='setResolution_failed')
+        self.image_w = int(w)
+        self.image_h = int(h)
+        await self.sync_preview()
+
+    async def set_debayer(self, debayer: bool) -> bool:
+        await self.request('update_debayer_mode', bool(debayer), 'setDebayerMode_success')
+        self.image_c = 3 if debayer and self.camera_param.get('is_color') else 1
+        await self.sync_preview()
+        return bool(debayer)
+
+    async def set_telemetry_rate(self, rate: float) -> float:
+        return await self.request('set_telemetry_rate', float(rate), 'setTelemetryRate_success')
+
+    async def set_temperature(self, temperature: float) -> float:
+        return await self.request('set_temperature', float(temperature), 'setTemperature_success')
+
+    async def set_realtime(self, cpus=None, priority=None, gc_control=True, lock_memory=True, enabled=True):
+        """参数与 QHYCCDCamera.set_realtime 相同，在下一次 frames() 开始时生效"""
+        return await self.request('set_realtime_mode', self.realtime_config(cpus, priority, gc_control, lock_memory, enabled), 'setRealtimeMode_success')
+
+    async def preview_timing(self):
+        return await self.request('get_preview_timing', '', 'previewTiming_success')
+
+    async def sync_preview(self):
+        if self.streaming:
+            await self.request('update_shared_image_data', (self.image_w, self.image_h, self.image_c, self.image_b), 'updateSharedImageData_success')
+
+    async def capture(self, timeout=None, copy=True):
+        if timeout is None:
+            timeout = self.capture_timeout()
+        data = await self.request('singleCapture', (self.image_w, self.image_h, self.image_c, self.image_b), 'singleCapture_success', timeout, 'singleCapture_failed')
+        return self.read_frame(data, copy)
+
+    def capture_sequence(self, count, save=None, timeout=None, copy=True, temperature_gate=None):
+        return self.sequence(count, save, timeout, copy, temperature_gate)
+
+    async def sequence(self, count, save=None, timeout=None, copy=True, temperature_gate=None):
+        """异步产出序列拍摄的每一帧，参数与 QHYCCDCamera.capture_sequence 相同"""
+        if timeout is None:
+            timeout = self.capture_timeout()
+        self.errors.clear()
+        self.sequence_queue = asyncio.Queue()
+        done = self.expect('sequenceCapture_success')
+        failed = self.expect('sequenceCapture_failed')
+        self.send('sequence_capture', {'count': int(count), 'image_data': (self.image_w, self.image_h, self.image_c, self.image_b), 'save': save,
+                                       'temperature_gate': temperature_gate})
+        completed = False
+        try:
+            for index in range(count):
+                # 第一帧之前可能在等待温度稳定
+                frame_ready = asyncio.ensure_future(self.sequence_queue.get())
+                await asyncio.wait((frame_ready, failed), timeout=timeout + (temperature_gate or {}).get('timeout', 0) if index == 0 else timeout,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if not frame_ready.done():
+                    frame_ready.cancel()
+                    if failed.done():
+                        failed.result()  # 进程退出时抛出 process_error
+                        raise QHYCCDError('; '.join(self.errors[-3:]) or 'sequenceCapture_failed')
+                    raise QHYCCDError(f"timeout waiting for sequenceCapture_frame: {'; '.join(self.errors[-3:])}")
+                data = frame_ready.result()
+                frame = self.read_frame(data['frame'], copy)
+                if copy:
+                    self.release_frame(data['frame'])
+                yield frame
+                if not copy:
+                    self.release_frame(data['frame'])
+            self.sequence_stats = await self.wait_for('sequenceCapture_success', timeout, done)
+            completed = True
+        finally:
+            self.sequence_queue = None
+            failed.cancel()
+            if not completed:
+                done.cancel()
+                if self.process is not None and self.process.is_alive():
+                    self.send('cancel_capture', '')
+
+    def stream(self, max_frames=None, timeout=None, copy=True):
+        return self.frames(max_frames, timeout, copy)
+
+    async def frames(self, max_frames=None, timeout=None, copy=True):
+        """连续模式下异步产出图像，参数、copy 的含义和视图有效期与 QHYCCDCamera.stream 相同"""
+        if not self.live:
+            raise QHYCCDError(translations[self.language]['qhyccd_sdk']['camera_not_support_continuous_mode'])
+        if timeout is None:
+            timeout = self.capture_timeout()
+        self.frame_queue = asyncio.Queue(maxsize=2)
+        await self.request('start_preview', (self.image_w, self.image_h, self.image_c, self.image_b, self.exposure, None, None, self.image_c == 3), 'start_preview_success', failure='start_preview_failed')
+        self.streaming = True
+        count = 0
+        try:
+            while max_frames is None or count < max_frames:
+                try:
+                    data = await asyncio.wait_for(self.frame_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    raise QHYCCDError(f"timeout waiting for preview_frame: {'; '.join(self.errors[-3:])}") from None
+                count += 1
+                frame = self.frame_view(data)
+                yield frame.copy() if copy else frame
+        finally:
+            self.streaming = False
+            self.frame_queue = None
+            if self.process is not None and self.process.is_alive():
+                await self.request('stop_preview', '', 'stop_preview_success')
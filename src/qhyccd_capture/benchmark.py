@@ -0,0 +1,349 @@
+import argparse
+import ctypes
+import multiprocessing
+import statistics
+import time
+from ctypes import byref
+
+import numpy as np
+
+from .camera import QHYCCDCamera
+from .control_id import CONTROL_ID
+from .frame_slot import FrameSlot, FrameSlotReader
+from .qhyccd_dll import bind_prototypes
+from .simulator import SimulatedQHYCCD, is_simulator_path, parse_simulator_path
+
+DEFAULT_SDK_PATH = 'simulator:time_scale=0'
+
+
+def load_dll(sdk_path, typed=True):
+    """每次都加载独立的库实例，typed=False 时只保留 OpenQHYCCD 的原型，与未声明原型的调用方式相同"""
+    if is_simulator_path(sdk_path):
+        qhyccddll = SimulatedQHYCCD(parse_simulator_path(sdk_path))
+    else:
+        qhyccddll = ctypes.CDLL(sdk_path)
+    if typed:
+        bind_prototypes(qhyccddll)
+    else:
+        qhyccddll.OpenQHYCCD.argtypes = [ctypes.c_char_p]
+        qhyccddll.OpenQHYCCD.restype = ctypes.c_void_p
+    return qhyccddll
+
+
+def open_first_camera(qhyccddll):
+    qhyccddll.InitQHYCCDResource()
+    if qhyccddll.ScanQHYCCD() == 0:
+        raise RuntimeError("no camera found")
+    id_buffer = ctypes.create_string_buffer(40)
+    qhyccddll.GetQHYCCDId(0, id_buffer)
+    camhandle = qhyccddll.OpenQHYCCD(id_buffer)
+    if not camhandle:
+        raise RuntimeError(f"open camera failed: {id_buffer.value}")
+    qhyccddll.InitQHYCCD(ctypes.c_void_p(camhandle))
+    return camhandle
+
+
+def time_call(func, count, repeat=5):
+    """返回每次调用耗时（纳秒）的最小值和中位数"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(count):
+            func()
+        samples.append((time.perf_counter_ns() - start) / count)
+    return min(samples), statistics.median(samples)
+
+
+def call_cases(qhyccddll, camhandle, typed):
+    """被测调用，未声明原型时句柄和浮点参数需要手动包装"""
+    handle = camhandle if typed else ctypes.c_void_p(camhandle)
+    gain = 10.0 if typed else ctypes.c_double(10.0)
+    w, h, b, c = ctypes.c_uint32(), ctypes.c_uint32(), ctypes.c_uint32(), ctypes.c_uint32()
+    buffer = (ctypes.c_ubyte * 16)()
+    return {
+        'GetQHYCCDParam': lambda: qhyccddll.GetQHYCCDParam(handle, CONTROL_ID.CONTROL_GAIN.value),
+        'SetQHYCCDParam': lambda: qhyccddll.SetQHYCCDParam(handle, CONTROL_ID.CONTROL_GAIN.value, gain),
+        'IsQHYCCDControlAvailable': lambda: qhyccddll.IsQHYCCDControlAvailable(handle, CONTROL_ID.CONTROL_GAIN.value),
+        'GetQHYCCDExposureRemaining': lambda: qhyccddll.GetQHYCCDExposureRemaining(handle),
+        'GetQHYCCDLiveFrame': lambda: qhyccddll.GetQHYCCDLiveFrame(handle, byref(w), byref(h), byref(b), byref(c), buffer),
+    }
+
+
+def benchmark_calls(sdk_path, count=100000):
+    """比较声明原型前后每次 SDK 调用的开销，GetQHYCCDLiveFrame 在未开始连续模式时调用，只测调用本身
+
+    只能针对真实的 libqhyccd：模拟相机的函数是纯 Python，不经过 ctypes 参数转换，两种方式的差别只是噪声。
+    """
+    if is_simulator_path(sdk_path):
+        raise ValueError("the calls benchmark needs a real libqhyccd path; simulator calls bypass ctypes argument conversion")
+    results = {}
+    for typed in (True, False):
+        qhyccddll = load_dll(sdk_path, typed)
+        camhandle = open_first_camera(qhyccddll)
+        for name, func in call_cases(qhyccddll, camhandle, typed).items():
+            results.setdefault(name, {})['typed' if typed else 'untyped'] = time_call(func, count)
+        qhyccddll.CloseQHYCCD(ctypes.c_void_p(camhandle))
+    print(f"SDK: {sdk_path}, {count} calls x 5")
+    print(f"{'function':<30}{'typed ns (min/median)':>26}{'untyped ns (min/median)':>28}")
+    for name, result in results.items():
+        typed_min, typed_median = result['typed']
+        untyped_min, untyped_median = result['untyped']
+        print(f"{name:<30}{typed_min:>14.0f} / {typed_median:<9.0f}{untyped_min:>16.0f} / {untyped_median:<9.0f}")
+    return results
+
+
+def transfer_producer(transport, width, height, count, output_queue, ack_queue):
+    """模拟 SDK 进程读出完成后把整帧交给接收端，时间戳取自跨进程一致的单调时钟"""
+    slot = FrameSlot()
+    length = width * height * 2
+    for index in range(count):
+        if transport == 'queue':
+            img = np.full((height, width), index, dtype=np.uint16)
+            output_queue.put({'order': 'singleCapture_success', 'data': {'img': img, 'gps_data': None}, 'sent': time.monotonic_ns()})
+        else:
+            with slot.lock:
+                buffer = slot.buffer(length)
+                np.frombuffer(buffer, dtype=np.uint16)[:] = index
+                del buffer
+                frame = slot.descriptor(width, height, 16, 1, False)
+            output_queue.put({'order': 'singleCapture_success', 'data': frame, 'sent': time.monotonic_ns()})
+        # 与单帧拍摄一致，接收端处理完上一帧后才开始下一帧
+        ack_queue.get()
+    slot.close()
+
+
+def benchmark_transfer(transport, width, height, count):
+    """返回 (拿到视图的延迟, 拿到自有数组的延迟) 毫秒列表，队列方式两者相同"""
+    output_queue = multiprocessing.Queue()
+    ack_queue = multiprocessing.Queue()
+    reader = FrameSlotReader()
+    process = multiprocessing.Process(target=transfer_producer, args=(transport, width, height, count, output_queue, ack_queue), daemon=True)
+    process.start()
+    view_latency = []
+    owned_latency = []
+    for _ in range(count):
+        result = output_queue.get()
+        if transport == 'queue':
+            img = result['data']['img']
+            view_latency.append((time.monotonic_ns() - result['sent']) / 1e6)
+        else:
+            view = reader.view(result['data'])
+            view_latency.append((time.monotonic_ns() - result['sent']) / 1e6)
+            img = view.copy()
+            del view
+        owned_latency.append((time.monotonic_ns() - result['sent']) / 1e6)
+        del img
+        ack_queue.put(True)
+    process.join()
+    reader.close()
+    return view_latency, owned_latency
+
+
+def benchmark_capture(sdk_path=DEFAULT_SDK_PATH, width=9576, height=6388, count=5):
+    """比较整帧经队列序列化与经共享内存槽传递的延迟，并测量相机对象 capture() 的端到端耗时"""
+    size_mb = width * height * 2 / 2**20
+    print(f"frame: {width}x{height} 16bit ({size_mb:.0f} MB), {count} frames")
+    print(f"{'transport':<12}{'view ms (median/max)':>24}{'owned array ms (median/max)':>32}")
+    for transport in ('queue', 'slot'):
+        view_latency, owned_latency = benchmark_transfer(transport, width, height, count)
+        print(f"{transport:<12}{statistics.median(view_latency):>12.1f} / {max(view_latency):<9.1f}"
+              f"{statistics.median(owned_latency):>20.1f} / {max(owned_latency):<9.1f}")
+
+    if is_simulator_path(sdk_path):
+        # 模拟相机按基准尺寸生成画面，曝光取最小值，只剩读出、渲染和传输
+        options = f"width={width},height={height},exposure=1,gps=False"
+        sdk_path = f"{sdk_path},{options}" if ':' in sdk_path else f"{sdk_path}:{options}"
+    with QHYCCDCamera(sdk_path=sdk_path, timeout=60.0) as cam:
+        cam.set_depth(16)
+        cam.set_exposure(1)
+        cam.capture()
+        for copy in (True, False):
+            samples = []
+            for _ in range(count):
+                start = time.perf_counter()
+                img = cam.capture(copy=copy)
+                samples.append((time.perf_counter() - start) * 1000)
+                del img
+            print(f"capture(copy={copy}) {cam.image_w}x{cam.image_h}: median {statistics.median(samples):.1f} ms, max {max(samples):.1f} ms")
+
+
+def benchmark_trigger(sdk_path=DEFAULT_SDK_PATH, count=200, interval=0.1):
+    """外触发连续出帧，统计从布防到 GetQHYCCDSingleFrame 返回的耗时和帧间隔分布"""
+    if is_simulator_path(sdk_path):
+        # 模拟相机按固定周期产生触发
+        options = f"trigger_interval={interval},exposure=1000,time_scale=1"
+        sdk_path = f"{sdk_path.split(':', 1)[0]}:{options}"
+    with QHYCCDCamera(sdk_path=sdk_path, live=True, timeout=30.0) as cam:
+        enabled, interfaces = cam.camera_param['external_trigger']
+        if not enabled or not interfaces:
+            raise RuntimeError("camera has no external trigger interface")
+        image_data = (cam.image_w, cam.image_h, cam.image_c, cam.image_b)
+        cam.request('start_preview', image_data + (cam.exposure, None, None, False), 'start_preview_success')
+        cam.streaming = True
+        cam.send('set_external_trigger', (list(interfaces)[0], False, image_data))
+        for _ in range(count):
+            cam.wait_for('preview_frame')
+        stats = cam.request('get_external_trigger_timing', '', 'externalTriggerTiming_success')
+        cam.request('stop_external_trigger', '', 'stopExternalTrigger_success')
+        cam.request('stop_preview', '', 'stop_preview_success')
+        cam.streaming = False
+    print(f"SDK: {sdk_path}, {stats['count']} triggered frames {cam.image_w}x{cam.image_h}")
+    print(f"{'ms':<18}" + ''.join(f"{key:>10}" for key in ('min', 'p50', 'p90', 'p99', 'max', 'std')))
+    for name in ('trigger_latency', 'frame_interval'):
+        print(f"{name:<18}" + ''.join(f"{stats[name][key]:>10.2f}" for key in ('min', 'p50', 'p90', 'p99', 'max', 'std')))
+    return stats
+
+
+def benchmark_sequence(sdk_path=DEFAULT_SDK_PATH, count=10, exposure=0.2):
+    """比较逐帧 capture() 往返与 SDK 进程内流水线序列拍摄的总耗时和占空比"""
+    if is_simulator_path(sdk_path):
+        sdk_path = f"{sdk_path.split(':', 1)[0]}:time_scale=1"
+    with QHYCCDCamera(sdk_path=sdk_path, timeout=30.0) as cam:
+        cam.set_exposure(exposure * 1e6)
+        cam.capture()
+        start = time.perf_counter()
+        for _ in range(count):
+            cam.capture()
+        round_trip = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in cam.capture_sequence(count):
+            pass
+        pipelined = time.perf_counter() - start
+        stats = cam.sequence_stats
+    print(f"SDK: {sdk_path}, {count} frames x {exposure * 1000:.0f} ms")
+    print(f"{'mode':<12}{'elapsed s':>12}{'duty cycle':>12}")
+    print(f"{'capture()':<12}{round_trip:>12.3f}{count * exposure / round_trip:>12.1%}")
+    print(f"{'sequence':<12}{pipelined:>12.3f}{count * exposure / pipelined:>12.1%}")
+    print(f"sequence in SDK process: duty cycle {stats['duty_cycle']:.1%}, readout-to-next-exposure gap mean {stats['gap_mean_ms']:.3f} ms, max {stats['gap_max_ms']:.3f} ms")
+    return stats
+
+
+def benchmark_jitter(sdk_path=DEFAULT_SDK_PATH, count=500, exposure=0.01, cpus=None, priority=None):
+    """比较普通模式与实时模式下连续采集的帧间隔分布"""
+    if is_simulator_path(sdk_path):
+        sdk_path = f"{sdk_path.split(':', 1)[0]}:time_scale=1,width=1920,height=1080"
+    results = {}
+    with QHYCCDCamera(sdk_path=sdk_path, live=True, timeout=30.0) as cam:
+        cam.set_exposure(exposure * 1e6)
+        for mode in ('normal', 'realtime'):
+            cam.set_realtime(cpus, priority, enabled=mode == 'realtime')
+            for _ in cam.stream(count):
+                pass
+            results[mode] = cam.preview_timing()
+    print(f"SDK: {sdk_path}, {count} frames x {exposure * 1000:.0f} ms, cpus={cpus}, priority={priority}")
+    print(f"{'frame interval ms':<18}" + ''.join(f"{key:>10}" for key in ('min', 'p50', 'p90', 'p99', 'max', 'std')))
+    for mode, stats in results.items():
+        print(f"{mode:<18}" + ''.join(f"{stats['frame_interval'][key]:>10.2f}" for key in ('min', 'p50', 'p90', 'p99', 'max', 'std')))
+    report = results['realtime']['realtime']
+    print(f"real-time mode: cpus {report['cpus']}, priority {report['priority']}, gc control {report['gc']}, locked {report['locked'] / 2**20:.1f} MiB")
+    for error in report['errors']:
+        print(f"  not applied: {error}")
+    return results
+
+
+def benchmark_backend(sdk_path=DEFAULT_SDK_PATH, count=1000, frames=50, width=1920, height=1080):
+    """比较 SDK 子进程与进程内线程两种后端的命令往返延迟、单帧拍摄延迟和连续模式帧间隔"""
+    if is_simulator_path(sdk_path):
+        # 曝光取最小值，只剩读出、渲染和传输
+        options = f"width={width},height={height},exposure=1,gps=False"
+        sdk_path = f"{sdk_path},{options}" if ':' in sdk_path else f"{sdk_path}:{options}"
+    results = {}
+    for backend in ('process', 'thread'):
+        result = results[backend] = {}
+        with QHYCCDCamera(sdk_path=sdk_path, timeout=60.0, backend=backend) as cam:
+            cam.set_depth(16)
+            cam.set_exposure(1)
+            samples = []
+            for _ in range(count):
+                start = time.perf_counter()
+                cam.request('get_exposure_value', '', 'getExposureValue_success')
+                samples.append((time.perf_counter() - start) * 1000)
+            result['command'] = samples
+            cam.capture(copy=False)
+            samples = []
+            for _ in range(frames):
+                start = time.perf_counter()
+                img = cam.capture(copy=False)
+                samples.append((time.perf_counter() - start) * 1000)
+                del img
+            result['capture'] = samples
+        with QHYCCDCamera(sdk_path=sdk_path, live=True, timeout=60.0, backend=backend) as cam:
+            cam.set_exposure(1)
+            samples = []
+            last = None
+            for img in cam.stream(frames):
+                now = time.perf_counter()
+                if last is not None:
+                    samples.append((now - last) * 1000)
+                last = now
+                del img
+            result['stream'] = samples
+    print(f"SDK: {sdk_path}, {count} commands, {frames} frames {width}x{height}")
+    print(f"{'ms (median/p99)':<22}" + ''.join(f"{backend:>20}" for backend in results))
+    for name, label in (('command', 'command round trip'), ('capture', 'capture(copy=False)'), ('stream', 'stream frame interval')):
+        cells = []
+        for result in results.values():
+            p50, p99 = np.percentile(result[name], [50, 99])
+            cells.append(f"{p50:>11.3f} / {p99:<6.3f}")
+        print(f"{label:<22}" + ''.join(f"{cell:>20}" for cell in cells))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m qhyccd_capture.benchmark')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    calls = subparsers.add_parser('calls', help='per-call overhead of SDK entry points')
+    calls.add_argument('--sdk', required=True, help='libqhyccd path (the simulator bypasses ctypes and is rejected)')
+    calls.add_argument('--count', type=int, default=100000)
+
+    capture = subparsers.add_parser('capture', help='capture-to-display latency of large single frames')
+    capture.add_argument('--sdk', default=DEFAULT_SDK_PATH, help='libqhyccd path or simulator[:options]')
+    capture.add_argument('--width', type=int, default=9576)
+    capture.add_argument('--height', type=int, default=6388)
+    capture.add_argument('--count', type=int, default=5)
+
+    trigger = subparsers.add_parser('trigger', help='trigger-to-frame timing distribution in external trigger mode')
+    trigger.add_argument('--sdk', default=DEFAULT_SDK_PATH, help='libqhyccd path or simulator[:options]')
+    trigger.add_argument('--count', type=int, default=200)
+    trigger.add_argument('--interval', type=float, default=0.1, help='simulated trigger period in seconds')
+
+    sequence = subparsers.add_parser('sequence', help='duty cycle of pipelined single-frame sequences')
+    sequence.add_argument('--sdk', default=DEFAULT_SDK_PATH, help='libqhyccd path or simulator[:options]')
+    sequence.add_argument('--count', type=int, default=10)
+    sequence.add_argument('--exposure', type=float, default=0.2, help='exposure in seconds')
+
+    jitter = subparsers.add_parser('jitter', help='frame interval jitter of continuous capture with and without real-time mode')
+    jitter.add_argument('--sdk', default=DEFAULT_SDK_PATH, help='libqhyccd path or simulator[:options]')
+    jitter.add_argument('--count', type=int, default=500)
+    jitter.add_argument('--exposure', type=float, default=0.01, help='exposure in seconds')
+    jitter.add_argument('--cpus', type=int, nargs='*', help='CPU cores for the capture thread')
+    jitter.add_argument('--priority', type=int, help='SCHED_FIFO priority, falls back to a lower nice value')
+
+    backend = subparsers.add_parser('backend', help='command and frame latency of the subprocess and in-process SDK backends')
+    backend.add_argument('--sdk', default=DEFAULT_SDK_PATH, help='libqhyccd path or simulator[:options]')
+    backend.add_argument('--count', type=int, default=1000, help='command round trips')
+    backend.add_argument('--frames', type=int, default=50)
+    backend.add_argument('--width', type=int, default=1920)
+    backend.add_argument('--height', type=int, default=1080)
+
+    args = parser.parse_args(argv)
+    if args.command == 'calls':
+        try:
+            benchmark_calls(args.sdk, args.count)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.command == 'capture':
+        benchmark_capture(args.sdk, args.width, args.height, args.count)
+    elif args.command == 'trigger':
+        benchmark_trigger(args.sdk, args.count, args.interval)
+    elif args.command == 'sequence':
+        benchmark_sequence(args.sdk, args.count, args.exposure)
+    elif args.command == 'jitter':
+        benchmark_jitter(args.sdk, args.count, args.exposure, args.cpus, args.priority)
+    elif args.command == 'backend':
+        benchmark_backend(args.sdk, args.count, args.frames, args.width, args.height)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,486 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .frame_slot import FrameOverwrittenError, FrameSlotReader
+from .language import translations
+from .sdk_pool import SDKWorker
+from .telemetry import TelemetryRing
+
+
+class QHYCCDError(RuntimeError):
+    """SDK 进程返回错误或未在超时时间内应答"""
+
+
+class QHYCCDCamera:
+    """不依赖 napari 和 Qt 的相机对象
+
+    复用 QHYCCDSDK 进程的命令协议和共享内存帧通道，可直接用于无界面的采集流程::
+
+        with QHYCCDCamera() as cam:
+            cam.set_exposure(20000)
+            img = cam.capture()
+
+    backend='thread' 时 SDK 命令循环在本进程的线程中运行，命令和帧不跨进程传递，延迟更低，
+    但 SDK 崩溃会导致调用进程退出。
+    """
+
+    def __init__(self, camera_id=None, sdk_path=None, readout_mode=None, live=False, language='en', timeout=10.0, backend='process'):
+        self.camera_id = camera_id
+        self.sdk_path = sdk_path
+        self.readout_mode = readout_mode
+        self.live = live
+        self.language = language
+        self.timeout = timeout
+        self.backend = backend
+        self.worker = None
+        self.input_queue = None
+        self.output_queue = None
+        self.process = None
+        self.shm1 = None
+        self.shm2 = None
+        self.frame_reader = FrameSlotReader()
+        self.telemetry_ring = None  # SDK 遥测线程的环形缓冲区，进程启动时附加
+        self.camera_ids = []
+        self.readout_mode_name_dict = {}
+        self.stream_and_capture_mode_dict = {}
+        self.camera_param = {}
+        self.image_w = 0
+        self.image_h = 0
+        self.image_c = 1
+        self.image_b = 8
+        self.exposure = None
+        self.streaming = False
+        self.sequence_stats = None
+        self.progress_callback = None
+        self.errors = []
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def shape(self):
+        """当前帧的 numpy 形状"""
+        if self.image_c == 1:
+            return (self.image_h, self.image_w)
+        return (self.image_h, self.image_w, self.image_c)
+
+    @property
+    def dtype(self):
+        return np.uint8 if self.image_b == 8 else np.uint16
+
+    def open(self):
+        """启动 SDK 进程，扫描并初始化相机"""
+        if self.process is not None:
+            return
+        self.start_worker()
+        try:
+            self.wait_for('init_qhyccd_resource_success')
+            self.camera_ids = self.wait_for('readCameraName_success')
+            if not self.camera_ids:
+                raise QHYCCDError(translations[self.language]['qhyccd_sdk']['open_camera_failed'])
+            if self.camera_id is None:
+                self.camera_id = self.camera_ids[0]
+            elif self.camera_id not in self.camera_ids:
+                raise QHYCCDError(f"{translations[self.language]['qhyccd_sdk']['open_camera_failed']}: {self.camera_id}")
+            data = self.request('open_camera', self.camera_id, 'openCamera_success')
+            self.readout_mode_name_dict = data['readout_mode_name_dict']
+            self.stream_and_capture_mode_dict = data['stream_and_capture_mode_dict']
+            self.attach_buffers(self.request('get_image_buffer_size', self.camera_id, 'getImageBufferSize_success'))
+            if self.readout_mode is None:
+                self.readout_mode = list(self.readout_mode_name_dict.keys())[0]
+            self.camera_param = self.request('init_camera', [self.camera_id, self.readout_mode, self.camera_mode_name()], 'initCamera_success', failure='initCamera_failed')
+            self.apply_camera_param(self.camera_param)
+            self.request('set_resolution', (0, 0, self.image_w, self.image_h), 'setResolution_success', failure='setResolution_failed')
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        """关闭相机并停止 SDK 进程，释放共享内存"""
+        if self.process is not None:
+            if self.process.is_alive():
+                self.send('stop', '')
+                try:
+                    self.wait_for('stop_success')
+                except QHYCCDError:
+                    pass
+            self.process.join(self.timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+            self.worker = None
+        self.release_buffers()
+        self.frame_reader.close()
+        self.close_telemetry_ring()
+        self.streaming = False
+
+    def start_worker(self):
+        """为本相机启动独占的 SDK 工作进程（或进程内线程）"""
+        self.worker = SDKWorker(self.camera_id, language=self.language, backend=self.backend)
+        self.input_queue = self.worker.input_queue
+        self.output_queue = self.worker.output_queue
+        self.process = self.worker.process
+        self.worker.start(self.sdk_path)
+
+    def camera_mode_name(self):
+        key = 'continuous_mode' if self.live else 'single_frame_mode'
+        name = translations[self.language]['qhyccd_capture'][key]
+        if name not in self.stream_and_capture_mode_dict:
+            raise QHYCCDError(translations[self.language]['qhyccd_sdk'][f'camera_not_support_{key}'])
+        return name
+
+    def apply_camera_param(self, camera_param):
+        """根据 initCamera_success 返回的参数更新图像尺寸"""
+        self.image_w = camera_param['readout_w']
+        self.image_h = camera_param['readout_h']
+        self.image_c = 1
+        depth = camera_param.get('depth')
+        if isinstance(depth, dict) and depth:
+            self.image_b = list(depth.values())[0]
+        limit = camera_param.get('limit') or {}
+        if 'exposure' in limit:
+            self.exposure = limit['exposure'][3]
+
+    def attach_buffers(self, size):
+        """创建预览使用的双缓冲共享内存并通知 SDK 进程"""
+        self.release_buffers()
+        self.shm1 = shared_memory.SharedMemory(create=True, size=max(int(size), 1))
+        self.shm2 = shared_memory.SharedMemory(create=True, size=max(int(size), 1))
+        self.send('set_image_buffer', {'shm1': self.shm1.name, 'shm2': self.shm2.name})
+
+    def release_buffers(self):
+        for shm in (self.shm1, self.shm2):
+            if shm is None:
+                continue
+            try:
+                shm.close()
+            except BufferError:
+                # 仍有帧视图在外部引用，由垃圾回收释放映射
+                pass
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.shm1 = None
+        self.shm2 = None
+
+    def send(self, order, data):
+        self.input_queue.put({'order': order, 'data': data})
+
+    def wait_for(self, reply, timeout=None, failure=None):
+        """等待指定应答，期间收到的错误信息在超时或收到 failure 应答时一并抛出"""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                message = '; '.join(self.errors[-3:]) or reply
+                raise QHYCCDError(f"timeout waiting for {reply}: {message}")
+            try:
+                result = self.output_queue.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                if self.process is None or not self.process.is_alive():
+                    raise QHYCCDError(translations[self.language]['qhyccd_sdk']['process_error']) from None
+                continue
+            if result['order'] == reply:
+                return result['data']
+            if failure is not None and result['order'] == failure:
+                raise QHYCCDError('; '.join(self.errors[-3:]) or failure)
+            if result['order'] == 'exposure_progress':
+                if self.progress_callback is not None:
+                    self.progress_callback(result['data'])
+            elif result['order'] == 'error':
+                self.errors.append(result['data'])
+            elif result['order'] == 'telemetry_ring':
+                self.on_telemetry_ring(result['data'])
+            elif result['order'] == 'stop_success':
+                raise QHYCCDError(translations[self.language]['qhyccd_sdk']['process_error'])
+
+    def request(self, order, data, reply, timeout=None, failure=None):
+        self.errors.clear()
+        self.send(order, data)
+        return self.wait_for(reply, timeout, failure)
+
+    def subscribe_progress(self, callback, rate=2.0):
+        """曝光进行中由 SDK 进程按 rate（次/秒）推送进度，在等待应答期间回调 callback(data)
+
+        data 含 source（single/sequence/plan）、state（exposing/readout/done）、exposure、elapsed、remaining、progress。
+        callback 为 None 时取消订阅。
+        """
+        self.progress_callback = callback
+        self.send('set_exposure_progress_rate', float(rate) if callback is not None else 0.0)
+
+    def set_exposure(self, exposure_us: float) -> float:
+        """设置曝光时间（微秒）"""
+        self.exposure = self.request('set_exposure_time', float(exposure_us), 'setExposureTime_success', failure='setExposureTime_failed')
+        return self.exposure
+
+    def set_gain(self, gain: float) -> float:
+        return self.request('set_gain', float(gain), 'setGain_success', failure='setGain_failed')
+
+    def set_offset(self, offset: float) -> float:
+        return self.request('set_offset', float(offset), 'setOffset_success', failure='setOffset_failed')
+
+    def set_usb_traffic(self, usb_traffic: int) -> int:
+        return self.request('set_usb_traffic', int(usb_traffic), 'setUsbTraffic_success', failure='setUsbTraffic_failed')
+
+    def auto_tune_usb(self, traffic=None, readout_modes=None, depths=None, duration=2.0, use_cache=True, apply=True):
+        """在连续模式下扫描 USB 流量（可选读出模式和位深），返回不丢帧且帧率最高的设置
+
+        返回 {'camera', 'best', 'results', 'cached'}，best 含 readout_mode、depth、traffic、fps、throughput。
+        结果按相机和主机缓存，apply 为 True 时应用最佳的 USB 流量和位深；读出模式不同时需重新 open。
+        """
+        data = {'traffic': traffic, 'readout_modes': readout_modes, 'depths': depths, 'duration': duration, 'use_cache': use_cache, 'apply': apply}
+        result = self.request('auto_tune_usb', data, 'autoTuneUSB_success', self.usb_tune_timeout(data), 'autoTuneUSB_failed')
+        if apply and result['best']['depth'] is not None:
+            self.image_b = result['best']['depth']
+        return result
+
+    def usb_tune_timeout(self, data):
+        count = len(data['traffic'] or range(8)) * len(data['readout_modes'] or [None]) * len(data['depths'] or [None])
+        return self.timeout + count * (data['duration'] + 2.0 + 4 * (self.exposure or 0) / 1e6)
+
+    def set_depth(self, depth: int) -> int:
+        """设置传输位深（8 或 16）"""
+        self.image_b = self.request('set_camera_depth', int(depth), 'setDepth_success', failure='setDepth_failed')
+        self.sync_preview()
+        return self.image_b
+
+    def set_bin(self, pixel_bin) -> str:
+        """设置像素合并，支持 2 或 '2*2'，并将分辨率重置为合并后的全幅"""
+        if isinstance(pixel_bin, int):
+            pixel_bin = f"{pixel_bin}*{pixel_bin}"
+        self.request('set_camera_pixel_bin', pixel_bin, 'setCameraPixelBin_success', failure='setCameraPixelBin_failed')
+        bin_x, bin_y = self.camera_param['pixel_bin'][pixel_bin]
+        self.set_roi(0, 0, self.camera_param['readout_w'] // bin_x, self.camera_param['readout_h'] // bin_y)
+        return pixel_bin
+
+    def set_roi(self, x: int, y: int, w: int, h: int):
+        self.request('set_resolution', (int(x), int(y), int(w), int(h)), 'setResolution_success', failure='setResolution_failed')
+        self.image_w = int(w)
+        self.image_h = int(h)
+        self.sync_preview()
+
+    def set_debayer(self, debayer: bool) -> bool:
+        """彩色相机开启去马赛克后输出三通道图像"""
+        self.request('update_debayer_mode', bool(debayer), 'setDebayerMode_success')
+        self.image_c = 3 if debayer and self.camera_param.get('is_color') else 1
+        self.sync_preview()
+        return bool(debayer)
+
+    def sync_preview(self):
+        """预览进行中时同步预览线程的图像参数"""
+        if self.streaming:
+            self.request('update_shared_image_data', (self.image_w, self.image_h, self.image_c, self.image_b), 'updateSharedImageData_success')
+
+    def set_temperature(self, temperature: float) -> float:
+        return self.request('set_temperature', float(temperature), 'setTemperature_success')
+
+    def on_telemetry_ring(self, data):
+        self.close_telemetry_ring()
+        self.telemetry_ring = TelemetryRing.attach(data)
+
+    def close_telemetry_ring(self):
+        # 线程后端交出的是 SDK 持有的对象，由 SDK 负责释放
+        if self.telemetry_ring is not None and not self.telemetry_ring.owner:
+            self.telemetry_ring.close()
+        self.telemetry_ring = None
+
+    def telemetry(self):
+        """最新的遥测样本 {'time', 'temperature', 'setpoint', 'pwm', 'humidity', 'memory'}，直接读共享内存，不经过 SDK 命令队列"""
+        return self.telemetry_ring.latest() if self.telemetry_ring is not None else None
+
+    def telemetry_history(self, seconds=None):
+        """最近 seconds 秒（默认为缓冲区内全部）的遥测样本，{字段: 按时间排列的数组}，缺失的值为 NaN"""
+        if self.telemetry_ring is None:
+            raise QHYCCDError(translations[self.language]['qhyccd_sdk']['process_error'])
+        return self.telemetry_ring.history(seconds)
+
+    def set_telemetry_rate(self, rate: float) -> float:
+        """设置 SDK 遥测线程的采样频率（次/秒），0 为停止采样"""
+        return self.request('set_telemetry_rate', float(rate), 'setTelemetryRate_success')
+
+    def set_realtime(self, cpus=None, priority=None, gc_control=True, lock_memory=True, enabled=True):
+        """设置连续模式采集线程的实时调度，在下一次 stream() 开始时生效；gc_control 只在 process 后端生效"""
+        return self.request('set_realtime_mode', self.realtime_config(cpus, priority, gc_control, lock_memory, enabled), 'setRealtimeMode_success')
+
+    @staticmethod
+    def realtime_config(cpus, priority, gc_control, lock_memory, enabled):
+        if not enabled:
+            return None
+        return {'cpus': list(cpus) if cpus else None, 'priority': priority, 'gc_control': gc_control, 'lock_memory': lock_memory}
+
+    def preview_timing(self):
+        """最近一次连续采集的帧间隔分布（毫秒）及实时模式的生效情况"""
+        return self.request('get_preview_timing', '', 'previewTiming_success')
+
+    def capture_timeout(self):
+        return self.timeout + (self.exposure or 0) / 1e6
+
+    def capture(self, timeout=None, copy=True) -> np.ndarray:
+        """单帧曝光并返回图像数组
+
+        图像经 SDK 进程的共享内存槽传回；copy=False 时返回槽上的视图，在下一次拍摄前有效。
+        """
+        data = self.request('singleCapture', (self.image_w, self.image_h, self.image_c, self.image_b), 'singleCapture_success', timeout or self.capture_timeout(), 'singleCapture_failed')
+        return self.read_frame(data, copy)
+
+    def capture_sequence(self, count, save=None, timeout=None, copy=True, temperature_gate=None):
+        """连续拍摄 count 帧并逐帧产出图像
+
+        SDK 进程在读出完成后立即开始下一次曝光，转换和保存在其工作线程中并行进行。
+        每帧经两块轮流使用的共享内存槽传回，读完才释放给下一帧，处理跟不上时 SDK 进程等待；copy=False 时产出槽上的视图，在取下一帧前有效。
+        save 为 {'path', 'file_name', 'save_format', ...} 时每帧另存为单帧文件。
+        temperature_gate 为 {'tolerance', 'hold', 'timeout', 'setpoint'} 时先等待传感器温度在设定值 ±tolerance 内
+        持续 hold 秒，setpoint 为 None 时使用最近一次设置的目标温度。
+        结束后 sequence_stats 记录 {'count', 'exposure', 'elapsed', 'duty_cycle', 'gap_mean_ms', 'gap_max_ms', 'gate_wait'}：
+        曝光时间 exposure、总耗时 elapsed 和温度等待时间 gate_wait 单位为秒，帧间空闲时间 gap_mean_ms/gap_max_ms 单位为毫秒。
+        """
+        if timeout is None:
+            timeout = self.capture_timeout()
+        self.errors.clear()
+        self.send('sequence_capture', {'count': int(count), 'image_data': (self.image_w, self.image_h, self.image_c, self.image_b), 'save': save,
+                                       'temperature_gate': temperature_gate})
+        completed = False
+        try:
+            for index in range(count):
+                # 第一帧之前可能在等待温度稳定
+                data = self.wait_for('sequenceCapture_frame', timeout + (temperature_gate or {}).get('timeout', 0) if index == 0 else timeout, 'sequenceCapture_failed')
+                frame = self.read_frame(data['frame'], copy)
+                # 拷贝后立即释放槽；视图在取下一帧时才释放，之前 SDK 不会覆盖
+                if copy:
+                    self.release_frame(data['frame'])
+                yield frame
+                if not copy:
+                    self.release_frame(data['frame'])
+            self.sequence_stats = self.wait_for('sequenceCapture_success', timeout)
+            completed = True
+        finally:
+            if not completed and self.process is not None and self.process.is_alive():
+                self.send('cancel_capture', '')
+
+    def read_frame(self, data, copy=True) -> np.ndarray:
+        try:
+            return self.frame_reader.read(data) if copy else self.frame_reader.view(data)
+        except FrameOverwrittenError as e:
+            raise QHYCCDError(f"{translations[self.language]['qhyccd_sdk']['frame_overwritten']}: {e}") from None
+
+    def release_frame(self, data):
+        """通知 SDK 进程该帧已读完，占用的共享内存槽可以写入下一帧"""
+        if data.get('release') and self.process is not None and self.process.is_alive():
+            self.send('release_frame_slot', {'slot_id': data['slot_id'], 'sequence': data['sequence']})
+
+    def frame_view(self, data) -> np.ndarray:
+        """按 preview_frame 描述从共享内存构造零拷贝视图"""
+        image_h, image_w, image_c, image_b = data['shape']
+        shm = self.shm1 if data['shm_status'] else self.shm2
+        dtype = np.uint8 if image_b == 8 else np.uint16
+        count = data['image_size'] // np.dtype(dtype).itemsize
+        img = np.frombuffer(shm.buf, dtype=dtype, count=count)
+        if image_c == 1:
+            return img.reshape((image_h, image_w))
+        return img.reshape((image_h, image_w, image_c))
+
+    def stream(self, max_frames=None, timeout=None, copy=True):
+        """连续模式下逐帧产出图像
+
+        默认产出拷贝；copy=False 时产出共享内存双缓冲上的零拷贝视图，在下一帧写入同一块前有效，
+        且必须在 close() 前释放，否则映射无法关闭。
+        """
+        if not self.live:
+            raise QHYCCDError(translations[self.language]['qhyccd_sdk']['camera_not_support_continuous_mode'])
+        if timeout is None:
+            timeout = self.capture_timeout()
+        self.request('start_preview', (self.image_w, self.image_h, self.image_c, self.image_b, self.exposure, None, None, self.image_c == 3), 'start_preview_success', failure='start_preview_failed')
+        self.streaming = True
+        count = 0
+        try:
+            while max_frames is None or count < max_frames:
+                data = self.wait_for('preview_frame', timeout)
+                count += 1
+                frame = self.frame_view(data)
+                yield frame.copy() if copy else frame
+        finally:
+            self.streaming = False
+            if self.process is not None and self.process.is_alive():
+                self.request('stop_preview', '', 'stop_preview_success')
+
+
+def scan_cameras(sdk_path=None, language='en', timeout=10.0, backend='process'):
+    """启动临时 SDK 进程扫描已连接的相机 ID"""
+    worker = SDKWorker(None, language=language, backend=backend)
+    worker.start(sdk_path)
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                result = worker.output_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if result['order'] == 'readCameraName_success':
+                return result['data']
+        raise QHYCCDError("timeout waiting for readCameraName_success")
+    finally:
+        worker.stop(timeout)
+
+
+class QHYCCDCameraGroup:
+    """按相机 ID 同时打开多台相机，每台相机独占一个 SDK 工作进程::
+
+        with QHYCCDCameraGroup() as group:
+            group['QHY600M-xxxx'].set_exposure(1000000)
+            frames = group.capture()  # {camera_id: ndarray}，各相机同时曝光和读出
+    """
+
+    def __init__(self, camera_ids=None, sdk_path=None, language='en', timeout=10.0, **kwargs):
+        self.camera_ids = camera_ids
+        self.sdk_path = sdk_path
+        self.language = language
+        self.timeout = timeout
+        self.kwargs = kwargs
+        self.cameras = {}
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getitem__(self, camera_id):
+        return self.cameras[camera_id]
+
+    def __iter__(self):
+        return iter(self.cameras)
+
+    def open(self):
+        if self.camera_ids is None:
+            self.camera_ids = scan_cameras(self.sdk_path, self.language, self.timeout, self.kwargs.get('backend', 'process'))
+        for camera_id in self.camera_ids:
+            self.cameras[camera_id] = QHYCCDCamera(camera_id, self.sdk_path, language=self.language, timeout=self.timeout, **self.kwargs)
+        try:
+            with ThreadPoolExecutor(max_workers=max(len(self.cameras), 1)) as executor:
+                for future in [executor.submit(camera.open) for camera in self.cameras.values()]:
+                    future.result()
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        for camera in self.cameras.values():
+            camera.close()
+        self.cameras = {}
+
+    def capture(self, timeout=None):
+        """所有相机同时开始单帧曝光，全部读出后按相机 ID 返回图像"""
+        for camera in self.cameras.values():
+            camera.errors.clear()
+            camera.send('singleCapture', (camera.image_w, camera.image_h, camera.image_c, camera.image_b))
+        return {camera_id: camera.read_frame(camera.wait_for('singleCapture_success', timeout or camera.capture_timeout(), 'singleCapture_failed')) for camera_id, camera in self.cameras.items()}
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from ctypes import c_char_p
+
+from .control_id import CONTROL_ID
+from .qhyccd_dll import QHYCCD_SUCCESS
+
+
+class CFWManager:
+    """SDK 进程内的滤镜轮管理
+
+    移动在后台线程中监视，命令循环不被阻塞，到位、超时或被新的移动取代时回调 callback(result)。
+    result 含 camera、slot、from、duration、ok、error。到位的孔位间耗时按相机记录，
+    保存在 cfw_move_times.json 中供计划耗时估算使用；各相机的 SDK 进程共用同一文件，写入前重新读取并合并。
+    """
+
+    def __init__(self, timeout=30.0, poll_interval=0.05, file_path="cfw_move_times.json"):
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        self.move_id = 0
+        self.moving = None  # 当前移动的信息
+        self.move_times = self.load_move_times()
+
+    @staticmethod
+    def slot_of(value):
+        """CONTROL_CFWPORT 返回孔位字符（'0'~'f'）的 ASCII 码"""
+        try:
+            return int(chr(int(value)), 16)
+        except (ValueError, OverflowError):
+            return None
+
+    def current_slot(self, qhyccddll, camhandle):
+        return self.slot_of(qhyccddll.GetQHYCCDParam(camhandle, CONTROL_ID.CONTROL_CFWPORT.value))
+
+    def move(self, qhyccddll, camhandle, slot, camera=None, callback=None, use_order=True):
+        """开始移动到 slot（整数孔位），立即返回；use_order 为 False 时通过 CONTROL_CFWPORT 下发"""
+        target = format(int(slot), 'x')
+        start_slot = self.current_slot(qhyccddll, camhandle)
+        with self.lock:
+            self.move_id += 1
+            move_id = self.move_id
+            previous = self.moving
+            self.moving = {'id': move_id, 'qhyccddll': qhyccddll, 'camhandle': camhandle, 'camera': camera, 'slot': int(slot), 'from': start_slot,
+                           'start': time.monotonic(), 'callback': callback}
+        if previous is not None:
+            self.finish(previous, False, 'superseded')
+        if use_order:
+            order = target.encode('utf-8')
+            ret = qhyccddll.SendOrder2QHYCCDCFW(camhandle, c_char_p(order), len(order))
+        else:
+            ret = qhyccddll.SetQHYCCDParam(camhandle, CONTROL_ID.CONTROL_CFWPORT.value, ord(target))
+        if ret != QHYCCD_SUCCESS:
+            self.complete(move_id, False, 'failed')
+            return
+        if start_slot == int(slot):
+            self.complete(move_id, True)
+            return
+        threading.Thread(target=self.watch, args=(move_id,), daemon=True).start()
+
+    def watch(self, move_id):
+        while True:
+            with self.lock:
+                moving = self.moving
+            if moving is None or moving['id'] != move_id:
+                return
+            if self.current_slot(moving['qhyccddll'], moving['camhandle']) == moving['slot']:
+                self.complete(move_id, True)
+                return
+            if time.monotonic() - moving['start'] > self.timeout:
+                self.complete(move_id, False, 'timeout')
+                return
+            time.sleep(self.poll_interval)
+
+    def complete(self, move_id, ok, error=None):
+        with self.lock:
+            moving = self.moving
+            if moving is None or moving['id'] != move_id:
+                return
+            self.moving = None
+        self.finish(moving, ok, error)
+
+    def finish(self, moving, ok, error=None):
+        duration = time.monotonic() - moving['start']
+        if ok and moving['from'] is not None and moving['from'] != moving['slot']:
+            self.record(moving['camera'], moving['from'], moving['slot'], duration)
+        if moving['callback'] is not None:
+            moving['callback']({'camera': moving['camera'], 'slot': moving['slot'], 'from': moving['from'],
+                                'duration': duration, 'ok': ok, 'error': error})
+
+    def is_moving(self):
+        return self.moving is not None
+
+    def cancel(self):
+        with self.lock:
+            moving = self.moving
+            self.moving = None
+        if moving is not None:
+            self.finish(moving, False, 'canceled')
+
+    def record(self, camera, from_slot, to_slot, duration):
+        """按相机记录孔位间移动耗时的滑动平均"""
+        key = f"{from_slot}->{to_slot}"
+        with self.lock:
+            # 其他 SDK 进程可能已写入新的记录，以文件为准，只补上文件中没有的本进程记录
+            move_times = self.load_move_times()
+            for name, times in self.move_times.items():
+                for name_key, value in times.items():
+                    move_times.setdefault(name, {}).setdefault(name_key, value)
+            times = move_times.setdefault(str(camera), {})
+            mean, count = times.get(key, (0.0, 0))
+            count = min(count + 1, 20)
+            times[key] = (mean + (duration - mean) / count, count)
+            self.move_times = move_times
+            self.save_move_times()
+
+    def estimate(self, camera, from_slot, to_slot, slots=None):
+        """估算移动耗时（秒）：有记录时取记录，否则按已记录的单孔平均耗时乘以经过的孔数"""
+        if from_slot is None or from_slot == to_slot:
+            return 0.0
+        times = self.move_times.get(str(camera), {})
+        key = f"{from_slot}->{to_slot}"
+        if key in times:
+            return times[key][0]
+        if slots and times:
+            per_slot = []
+            for name, (mean, _) in times.items():
+                start, end = (int(value) for value in name.split('->'))
+                per_slot.append(mean / ((end - start) % slots or slots))
+            return sum(per_slot) / len(per_slot) * ((to_slot - from_slot) % slots)
+        return None
+
+    def load_move_times(self):
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as file:
+                return {camera: {key: tuple(value) for key, value in times.items()} for camera, times in json.load(file).items()}
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError, TypeError):
+            return {}
+
+    def save_move_times(self):
+        temp_path = f"{self.file_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.move_times, file, ensure_ascii=False, indent=4)
+            os.replace(temp_path, self.file_path)
+        except OSError:
+            pass
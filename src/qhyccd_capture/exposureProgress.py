@@ -0,0 +1,74 @@
+import threading
+import time
+
+
+class ExposureProgressThread(threading.Thread):
+    """曝光进度推送
+
+    单帧、序列和计划拍摄在曝光开始和读出结束时登记，本线程按订阅的频率向输出队列推送
+    exposure_progress，接收端不再逐次发命令查询。剩余时间按本地单调时钟计算，
+    不与读出线程并发调用 SDK。频率为 0 时不推送。
+    """
+
+    def __init__(self, output_queue, rate=0.0):
+        super().__init__(daemon=True)
+        self.output_queue = output_queue
+        self.rate = rate
+        self.exposures = {}  # 来源 -> 曝光信息
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = True
+
+    def set_rate(self, rate):
+        self.rate = max(float(rate), 0.0)
+        self.wakeup.set()
+
+    def begin(self, source, exposure, index=None, count=None):
+        """登记一次曝光，exposure 为曝光时间（秒）"""
+        item = {'start': time.monotonic(), 'exposure': exposure, 'index': index, 'count': count}
+        with self.lock:
+            self.exposures[source] = item
+        # 唤醒推送线程，立即发出第一条进度
+        self.wakeup.set()
+
+    def end(self, source):
+        with self.lock:
+            item = self.exposures.pop(source, None)
+        if item is not None and self.rate > 0:
+            self.publish(source, item, time.monotonic(), 'done')
+
+    def publish(self, source, item, now, state=None):
+        elapsed = now - item['start']
+        remaining = max(item['exposure'] - elapsed, 0.0)
+        if state is None:
+            state = 'exposing' if remaining > 0 else 'readout'
+        progress = 1.0 if state == 'done' or item['exposure'] <= 0 else min(elapsed / item['exposure'], 1.0)
+        self.output_queue.put({"order":"exposure_progress","data":{
+            'source': source,
+            'state': state,
+            'exposure': item['exposure'],
+            'elapsed': elapsed,
+            'remaining': remaining,
+            'progress': progress,
+            'index': item['index'],
+            'count': item['count'],
+            'time': now,
+        }})
+
+    def run(self):
+        while self.running:
+            if self.rate <= 0 or not self.exposures:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            now = time.monotonic()
+            with self.lock:
+                items = list(self.exposures.items())
+            for source, item in items:
+                self.publish(source, item, now)
+            self.wakeup.wait(1 / self.rate)
+            self.wakeup.clear()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
@@ -2,11 +2,15 @@ import numpy as np
 import ctypes
 from ctypes import byref
 from .language import translations
+from .qhyccd_dll import QHYCCD_SUCCESS
+from .realtime import interval_stats
 import threading
 import time
+from collections import deque
+from multiprocessing import shared_memory
 
 class ExternalTriggerThread(threading.Thread):
-    def __init__(self, camhandle, qhyccddll,sdk_output_queue,trigger_interface_id,use_trigger_output,image_data,language='cn'):
+    def __init__(self, camhandle, qhyccddll,sdk_output_queue,trigger_interface_id,use_trigger_output,image_data,shm1_name,shm2_name,GPS_control=False,language='cn'):
         super().__init__()
         self.language = language
         self.camhandle = camhandle
@@ -15,10 +19,24 @@ class ExternalTriggerThread(threading.Thread):
         self.trigger_interface_id = trigger_interface_id
         self.use_trigger_output = use_trigger_output
         self.image_w,self.image_h,self.image_c,self.camera_bit = image_data
+        self.GPS_control = GPS_control
         self.trigger_state = True
         self.running = threading.Event()
         self.running.set()
         self.capture_thread = None
+        self.lock = threading.Lock()
+        # 预分配的读出缓冲池，轮流使用，上一帧的缓冲在下一次读出期间保持不变
+        self.pool_size = 2
+        self.buffers = []
+        self.buffer_index = 0
+        self.allocate_buffers()
+        # 与预览共用的双缓冲共享内存，只在线程存续期间附加一次
+        self.shm_list = [shared_memory.SharedMemory(name=shm1_name), shared_memory.SharedMemory(name=shm2_name)]
+        self.shm_status = True
+        # 从触发布防（ExpQHYCCDSingleFrame）到 GetQHYCCDSingleFrame 返回的耗时，以及帧间隔，单位毫秒
+        self.trigger_latency = deque(maxlen=1000)
+        self.frame_interval = deque(maxlen=1000)
+        self.last_frame_time = None
         self.set_trigger_function(self.trigger_state)
         self.update_trigger_interface(self.trigger_interface_id)
         self.enable_trigger_output(self.use_trigger_output)
@@ -27,55 +45,93 @@ class ExternalTriggerThread(threading.Thread):
         self.capture_thread = threading.Thread(target=self.capture_frame)
         self.capture_thread.start()
 
+    def allocate_buffers(self):
+        length = int(self.image_h * self.image_w * self.image_c * (self.camera_bit // 8))
+        if self.GPS_control:
+            length += 44
+        self.buffers = [(ctypes.c_ubyte * length)() for _ in range(self.pool_size)]
+        self.buffer_index = 0
+
     def capture_frame(self):
+        w, h, b, c = ctypes.c_uint32(), ctypes.c_uint32(), ctypes.c_uint32(), ctypes.c_uint32()
         while self.running.is_set():
+            with self.lock:
+                imgdata = self.buffers[self.buffer_index]
+                self.buffer_index = (self.buffer_index + 1) % self.pool_size
+            arm_time = time.perf_counter()
             ret = self.qhyccddll.ExpQHYCCDSingleFrame(self.camhandle)
-            if ret != 0:
-                self.sdk_output_queue.put({"order":"error","data":f"exp_qhyccd_single_frame_failed: {ret}"})
+            if ret != QHYCCD_SUCCESS:
+                self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['externalTriggerThread']['exp_qhyccd_single_frame_failed']}: {ret}"})
                 return
-            w, h, b, c = ctypes.c_uint32(), ctypes.c_uint32(), ctypes.c_uint32(), ctypes.c_uint32()
-            length = int(self.image_h * self.image_w * self.image_c * (self.camera_bit // 8))
-            imgdata = (ctypes.c_ubyte * length)()
             ret = self.qhyccddll.GetQHYCCDSingleFrame(self.camhandle, byref(w), byref(h), byref(b), byref(c), imgdata)
-            if ret != 0:
-                self.sdk_output_queue.put({"order":"error","data":f"get_single_frame_failed: {ret}"})
+            frame_time = time.perf_counter()
+            if not self.running.is_set():
+                return
+            if ret != QHYCCD_SUCCESS:
+                self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['externalTriggerThread']['get_single_frame_failed']}: {ret}"})
                 return
-            img_size = w.value * h.value * c.value * (b.value // 8)
-            img = np.ctypeslib.as_array(imgdata, shape=(img_size,))
-            if c.value == 3:
-                img = img.reshape((h.value, w.value, c.value))
-                img = img[:, :, ::-1]  # BGR to RGB
-            else:
-                img = img.reshape((h.value, w.value)) if b.value != 16 else img.view(np.uint16).reshape((h.value, w.value))
-            self.sdk_output_queue.put({"order":"success",'data':{'img':img,'w':w.value,'h':h.value,'c':c.value,'b':b.value}})
+            self.trigger_latency.append((frame_time - arm_time) * 1000)
+            fps = 0
+            if self.last_frame_time is not None:
+                self.frame_interval.append((frame_time - self.last_frame_time) * 1000)
+                fps = 1000 / (sum(self.frame_interval) / len(self.frame_interval))
+            self.last_frame_time = frame_time
+            self.publish_frame(imgdata, w.value, h.value, b.value, c.value, fps)
+
+    def publish_frame(self, imgdata, w, h, b, c, fps):
+        """按预览帧的格式写入共享内存双缓冲，界面沿用预览帧的显示流程"""
+        dtype = np.uint16 if b == 16 else np.uint8
+        offset = 44 if self.GPS_control else 0
+        gps_data = np.frombuffer(imgdata, dtype=np.uint8, count=44).copy() if self.GPS_control else None
+        shape = (h, w, c) if c == 3 else (h, w)
+        img = np.frombuffer(imgdata, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+        if c == 3:
+            img = img[:, :, ::-1]  # BGR to RGB
+        image_size = img.nbytes
+        shm = self.shm_list[0] if self.shm_status else self.shm_list[1]
+        if image_size > shm.size:
+            self.sdk_output_queue.put({"order":"error","data":translations[self.language]['debug']['shm_data_size_error']})
+            return
+        # 一次拷贝完成通道翻转并写入共享内存
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf)[:] = img
+        self.sdk_output_queue.put({"order":"preview_frame","data":{"fps":fps,"shm_status":self.shm_status,"image_size":image_size,"shape":(h,w,c,b),"gps_data":gps_data,"trigger_latency":self.trigger_latency[-1]}})
+        self.shm_status = not self.shm_status
+
+    def timing_stats(self):
+        """触发到出帧耗时与帧间隔的分布（毫秒）"""
+        return {'count': len(self.trigger_latency),
+                'trigger_latency': interval_stats(self.trigger_latency),
+                'frame_interval': interval_stats(self.frame_interval)}
 
     def update_trigger_interface(self,trigger_interface_id):
         ret = self.qhyccddll.SetQHYCCDTrigerInterface(self.camhandle,trigger_interface_id)
-        if ret != 0:
+        if ret != QHYCCD_SUCCESS:
             self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['externalTriggerThread']['set_trigger_interface_failed']}: {ret}"})
             return
         self.sdk_output_queue.put({"order":"tip","data":f"{translations[self.language]['externalTriggerThread']['set_trigger_interface_success']}:{trigger_interface_id}:{trigger_interface_id}"})
     
     def set_trigger_function(self,trigger_state):
         ret = self.qhyccddll.SetQHYCCDTrigerFunction(self.camhandle,trigger_state)
-        if ret != 0:
+        if ret != QHYCCD_SUCCESS:
             self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['externalTriggerThread']['set_trigger_function_failed']}: {ret}"})
             return
         self.sdk_output_queue.put({"order":"tip","data":f"{translations[self.language]['externalTriggerThread']['set_trigger_function_success']}:{trigger_state}:{trigger_state}"})
         
     def enable_trigger_output(self,use_trigger_output):
         ret = self.qhyccddll.EnableQHYCCDTrigerOut(self.camhandle)
-        if ret != 0:
+        if ret != QHYCCD_SUCCESS:
             self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['externalTriggerThread']['enable_trigger_output_failed']}: {ret}"})
             return
         self.sdk_output_queue.put({"order":"tip","data":f"{translations[self.language]['externalTriggerThread']['enable_trigger_output_success']}:{use_trigger_output}:{use_trigger_output}"})
         
     def set_image_data(self,image_data):
-        self.image_w,self.image_h,self.image_c,self.camera_bit = image_data
+        with self.lock:
+            self.image_w,self.image_h,self.image_c,self.camera_bit = image_data
+            self.allocate_buffers()
     
     def cancel_qhyccd_exposing_and_readout(self):
         ret = self.qhyccddll.CancelQHYCCDExposingAndReadout(self.camhandle)
-        if ret != 0:
+        if ret != QHYCCD_SUCCESS:
             self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['externalTriggerThread']['cancel_qhyccd_exposing_and_readout_failed']}: {ret}"})
             return
         self.sdk_output_queue.put({"order":"tip","data":f"{translations[self.language]['externalTriggerThread']['cancel_qhyccd_exposing_and_readout_success']}:{ret}:{ret}"})
@@ -84,14 +140,16 @@ class ExternalTriggerThread(threading.Thread):
         if self.capture_thread is not None:
             self.running.clear()
             ret = self.qhyccddll.CancelQHYCCDExposingAndReadout(self.camhandle)
-            if ret != 0:
+            if ret != QHYCCD_SUCCESS:
                 self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['externalTriggerThread']['cancel_qhyccd_exposing_and_readout_failed']}: {ret}"})
                 return
             self.sdk_output_queue.put({"order":"tip","data":f"{translations[self.language]['externalTriggerThread']['set_trigger_function_success']}:False"})
             self.capture_thread.join()
+        for shm in self.shm_list:
+            shm.close()
         self.trigger_state = False
         ret = self.qhyccddll.SetQHYCCDTrigerFunction(self.camhandle,False)
-        if ret != 0:
+        if ret != QHYCCD_SUCCESS:
             self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['externalTriggerThread']['set_trigger_function_failed']}: {ret}"})
             return
         
@@ -0,0 +1,162 @@
+import ctypes
+import os
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+GPS_HEADER_SIZE = 44
+STAMP_SIZE = 8  # 图像区之后记录槽内当前帧的序号，写入期间为 0
+
+
+class FrameOverwrittenError(RuntimeError):
+    """描述对应的帧已被下一次读出覆盖"""
+
+
+class FrameSlot:
+    """SDK 进程内的单帧结果共享内存槽
+
+    单帧拍摄和计划拍摄的图像直接读出到这块共享内存，输出队列中只传递描述（名称、形状、类型），
+    不再对整帧做序列化和管道传输。槽在下一次读出时被覆盖，接收端需要保留时自行拷贝。
+    每帧写入后在图像区之后记录序号并随描述发送，接收端读取前后核对，槽已被覆盖时拒绝读取。
+    acquire() 占用的槽在接收端按描述发回 release 之前不会再写入。
+    """
+
+    def __init__(self, slot_id=0):
+        self.slot_id = slot_id  # 同一进程内有多个槽时用于区分
+        self.shm = None
+        self.handoff = False  # SDK 在本进程的线程中运行时，随描述直接交出共享内存对象
+        self.lock = threading.Lock()
+        self.capacity = 0  # 图像区的字节数，序号紧随其后
+        self.sequence = 0  # 最近一次写入的帧序号
+        self.released = threading.Event()  # 接收端已读完槽内的帧
+        self.released.set()
+
+    def buffer(self, length):
+        """返回至少 length 字节的 ctypes 缓冲区，容量不足时换一块更大的共享内存；写入完成前槽内序号为 0"""
+        if self.shm is None or self.capacity < length:
+            self.close()
+            self.capacity = max(int(length), 1)
+            self.shm = shared_memory.SharedMemory(create=True, size=self.capacity + STAMP_SIZE)
+        self.stamp(0)
+        return (ctypes.c_ubyte * length).from_buffer(self.shm.buf)
+
+    def stamp(self, sequence):
+        self.shm.buf[self.capacity:self.capacity + STAMP_SIZE] = sequence.to_bytes(STAMP_SIZE, 'little')
+
+    def acquire(self, running, interval=0.1):
+        """等待接收端释放槽内的上一帧并占用该槽，running 被清除时返回 False"""
+        while not self.released.wait(interval):
+            if not running.is_set():
+                return False
+        if not running.is_set():
+            return False
+        self.released.clear()
+        return True
+
+    def release(self, sequence=None):
+        """接收端读完序号为 sequence 的帧，过期的释放忽略；sequence 为 None 时无条件释放"""
+        if sequence is None or sequence == self.sequence:
+            self.released.set()
+
+    def descriptor(self, w, h, b, c, gps_control):
+        """按 SDK 返回的帧信息生成描述，GPS 头很小，直接拷贝后随描述发送"""
+        offset = GPS_HEADER_SIZE if gps_control else 0
+        gps_data = None
+        if gps_control:
+            gps_data = np.frombuffer(self.shm.buf, dtype=np.uint8, count=GPS_HEADER_SIZE).copy()
+        shape = (h, w, c) if c == 3 else (h, w)
+        self.sequence += 1
+        self.stamp(self.sequence)
+        descriptor = {
+            'shm_name': self.shm.name,
+            'pid': os.getpid(),
+            'slot_id': self.slot_id,
+            'offset': offset,
+            'shape': shape,
+            'dtype': 'uint16' if b == 16 else 'uint8',
+            'bgr': c == 3,
+            'gps_data': gps_data,
+            'sequence': self.sequence,
+            'stamp_offset': self.capacity,
+            'release': not self.released.is_set(),  # 接收端读完后需发回 release_frame_slot
+        }
+        if self.handoff:
+            descriptor['shm'] = self.shm
+        return descriptor
+
+    def close(self):
+        if self.shm is None:
+            return
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+
+class FrameSlotReader:
+    """接收端按描述附加 SDK 进程的共享内存槽
+
+    每个槽保留一份附加，槽换成新名称时释放旧的附加。需在启动 SDK 进程前创建。
+    """
+
+    def __init__(self):
+        self.slots = {}
+        if os.name == 'posix':
+            # 先启动资源跟踪器，fork 出的 SDK 进程与本进程共用，槽的登记和删除才能对应
+            resource_tracker.ensure_running()
+
+    def attach(self, descriptor):
+        if descriptor.get('shm') is not None:
+            # 同一进程内的槽直接使用，由 SDK 线程负责释放
+            return descriptor['shm']
+        key = (descriptor.get('pid'), descriptor.get('slot_id', 0))
+        shm = self.slots.get(key)
+        if shm is None or shm.name.lstrip('/') != descriptor['shm_name'].lstrip('/'):
+            if shm is not None:
+                self.release(shm)
+            shm = shared_memory.SharedMemory(name=descriptor['shm_name'])
+            self.slots[key] = shm
+        return shm
+
+    def check(self, shm, descriptor):
+        """槽内的序号与描述不一致时说明该帧已被覆盖或正在被覆盖"""
+        if 'sequence' not in descriptor:
+            return
+        offset = descriptor['stamp_offset']
+        if int.from_bytes(shm.buf[offset:offset + STAMP_SIZE], 'little') != descriptor['sequence']:
+            raise FrameOverwrittenError(f"frame {descriptor['sequence']} in slot {descriptor.get('slot_id', 0)} was overwritten")
+
+    def view(self, descriptor) -> np.ndarray:
+        """共享内存中的零拷贝图像视图，在该 SDK 进程下一次读出前有效；帧已被覆盖时抛出 FrameOverwrittenError"""
+        shm = self.attach(descriptor)
+        self.check(shm, descriptor)
+        dtype = np.dtype(descriptor['dtype'])
+        shape = descriptor['shape']
+        img = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=descriptor['offset'])
+        if descriptor['bgr']:
+            img = img[:, :, ::-1]  # 将 BGR 转换为 RGB
+        return img
+
+    def read(self, descriptor) -> np.ndarray:
+        """拷贝出一份由调用方持有的图像，拷贝期间帧被覆盖时抛出 FrameOverwrittenError"""
+        img = self.view(descriptor).copy()
+        self.check(self.attach(descriptor), descriptor)
+        return img
+
+    def release(self, shm):
+        try:
+            shm.close()
+        except BufferError:
+            # 仍有视图在外部引用，由垃圾回收释放映射
+            pass
+
+    def close(self):
+        for shm in self.slots.values():
+            self.release(shm)
+        self.slots = {}
@@ -44,6 +44,9 @@ translations = {
             'gain': 'Gain:',
             'offset': 'Offset:',
             'usb_traffic': 'USB Traffic Limit:',
+            'auto_tune_usb': 'Auto',
+            'auto_tune_usb_tooltip': 'Try USB traffic values in continuous mode and pick the highest frame rate without dropped frames',
+            'usb_tune_step': 'USB traffic',
             'distributed_display': 'Distributed Display',
             'single_display': 'Single Display',
             'sequential_display': 'Sequential Display',
@@ -82,6 +85,8 @@ translations = {
             'set_temperature': 'Set Temperature:',
             'temperature': 'Temperature',
             'humidity': 'Humidity',
+            'cooler_power': 'Cooler Power',
+            'temperature_history_tooltip': 'Sensor temperature (solid) and setpoint (dashed) over the last 30 minutes, sampled by the SDK telemetry thread',
             'CFW_control': 'CFW Control',
             'CFW_position': 'CFW',
             'init_complete': 'Initialization Complete',
@@ -340,6 +345,7 @@ translations = {
             'command_not_found': 'order not found',
             'queue_size': 'Current command queue size:',
             'process_error': 'Process error:',
+            'frame_overwritten': 'Frame was overwritten before it was read',
             'file': 'File:',
             'line_number': 'Line Number:',
             'init_failed': 'Initialization Failed',
@@ -401,6 +407,11 @@ translations = {
             'open_camera': 'Open Camera',
             'get_resolution_failed': 'Get Resolution Failed',
             'get_resolution_success': 'Get Resolution Success',
+            'set_exposure_success': 'Set Exposure Success',
+            'set_gain_success': 'Set Gain Success',
+            'set_offset_success': 'Set Offset Success',
+            'set_depth_success': 'Set Depth Success',
+            'set_CFW_success': 'Set CFW Success',
             'set_exposure_failed': 'Set Exposure Failed',
             'set_gain_failed': 'Set Gain Failed',
             'set_offset_failed': 'Set Offset Failed',
@@ -418,6 +429,7 @@ translations = {
             'get_auto_exposure_is_available_success': 'Get Auto Exposure Is Available Success',
             'get_auto_exposure_limits_success': 'Get Auto Exposure Limits Success',
             'set_auto_exposure_failed': 'Set Auto Exposure Failed',
+            'set_auto_exposure_success': 'Set Auto Exposure Success',
             'get_exposure_value_success': 'Get Exposure Value Success',
             'get_auto_white_balance_is_available_success': 'Get Auto White Balance Is Available Success',
             'set_auto_white_balance_failed': 'Set Auto White Balance Failed',
@@ -434,9 +446,36 @@ translations = {
             'set_CFW_filter_success': 'Set CFW Filter Success',
             'set_CFW_filter_failed': 'Set CFW Filter Failed',
             'set_CFW_moving': 'CFW Moving ...',
+            'set_CFW_timeout': 'CFW move timed out',
+            'sdk_restarting': 'SDK process stopped responding, restarting',
+            'sdk_recovered': 'SDK process restarted and camera settings restored',
+            'sdk_restart_limit': 'SDK process restarted too many times, automatic recovery stopped',
+            'set_realtime_mode_success': 'Real-time preview mode set (applies when preview starts)',
+            'realtime_mode': 'Real-time preview mode',
+            'sdk_thread_hung': 'In-process SDK thread is not responding and cannot be restarted, restart the application or use the process backend',
+            'sdk_backend': 'SDK backend',
+            'usb_tune_need_live': 'USB traffic tuning requires the camera in continuous mode',
+            'usb_tune_busy': 'Preview or USB traffic tuning is running, stop it first',
+            'usb_tune_start': 'USB traffic tuning started, settings to test',
+            'usb_tune_success': 'USB traffic tuning finished',
+            'usb_tune_failed': 'USB traffic tuning failed',
+            'usb_tune_no_stable': 'USB traffic tuning found no setting without dropped frames',
+            'usb_tune_readout_mode': 'Best frame rate needs a different readout mode, select it and reinitialize the camera',
+            'plan_row_overhead': 'Row overhead',
+            'plan_row_setup': 'setup',
+            'plan_row_readout': 'readout',
+            'plan_row_frames': 'frames',
+            'plan_journal_failed': 'Failed to write plan journal',
+            'temperature_gate': 'temperature gate',
+            'temperature_gate_waiting': 'Waiting for sensor temperature to stabilize',
+            'temperature_gate_stable': 'Sensor temperature stable',
+            'temperature_gate_timeout': 'Sensor temperature did not stabilize in time',
+            'temperature_gate_no_setpoint': 'No cooler setpoint set, temperature gate skipped',
+            'sequence_stop_timeout': 'Previous sequence capture did not stop, new sequence not started',
             'get_external_trigger_number_success': 'Get External Trigger Number Success',
             'get_external_trigger_number_failed': 'Get External Trigger Number Failed',
             'get_external_trigger_name_success': 'Get External Trigger Name Success',
+            'external_trigger_timing': 'Trigger-to-frame latency (ms)',
             'get_external_trigger_name_failed': 'Get External Trigger Name Failed',
             'set_GPS_control_success': 'Set GPS Control Success',
             'set_GPS_control_failed': 'Set GPS Control Failed',
@@ -507,9 +546,44 @@ translations = {
             'confirm_execute_message': 'Are you sure you want to start the plan?',
             'continue_execute': 'Continue Execute',
             'continue_execute_message': 'There is a plan execution interruption, do you want to continue?',
+            'frames_done': 'frames done',
             'executing': 'Executing',
             'executed': 'Executed',
+            'execution_failed': 'Failed',
             'waiting': 'Waiting',
+            'remaining_time': 'Remaining',
+            'drift': 'Drift',
+            'schedule_report': 'Plan start time drift (ms)',
+            'barrier': 'Sync',
+            'barrier_tooltip': 'Start after all earlier rows of every camera have finished; adjacent sync rows with the same start time start together',
+            'group': 'Group',
+            'group_tooltip': 'Adjacent rows with the same non-zero group form a block that Optimize Order may reorder; 0 keeps the row in place',
+            'frame_count': 'Frames',
+            'temperature_gate': 'Temp. gate',
+            'temperature_gate_tooltip': 'Start exposing only after the sensor temperature has stayed within the tolerance of the setpoint for the hold time',
+            'current_setpoint': 'Current setpoint',
+            'gate_hold': 'Hold',
+            'gate_timeout': 'Timeout',
+            'no_timeout': 'None',
+            'frame_count_tooltip': 'Frames captured back to back with the camera configured once',
+            'repeat': 'Repeat',
+            'repeat_tooltip': 'Times to run this row, or the whole loop block for looped rows (the largest value in the block is used)',
+            'loop': 'Loop',
+            'loop_tooltip': 'Adjacent rows with the same non-zero loop run together as a block, repeated by Repeat; 0 repeats the row on its own',
+            'optimize_plan': 'Optimize Order',
+            'optimize_plan_tooltip': 'Reorder rows within groups to minimize filter wheel travel, readout mode and depth switches',
+            'optimize_saved': 'Estimated switching time saved',
+            'optimize_no_change': 'The order is already optimal, estimated switching time',
+            'plan_running': 'The plan is running, cancel it first',
+            'dry_run': 'Dry Run',
+            'dry_run_tooltip': 'Estimate the plan duration from measured readout, setup and filter wheel times without using the camera',
+            'dry_run_total': 'Estimated duration',
+            'save_to_disk': 'Save to disk',
+            'browse': 'Browse',
+            'file_name_template': 'File name',
+            'file_name_template_tooltip': 'Fields: {plan} {row} {iteration} {frame} {camera} {filter} {readout} {exposure} {gain} {offset} {depth} {date} {time}',
+            'plan_frame_saved': 'Plan frame saved',
+            'plan_frame_skipped': 'plan frame not displayed',
         },        
         'save_image': {
             'save_image_failed': 'Save Image Failed',
@@ -608,6 +682,9 @@ translations = {
             'gain': '增益:',
             'offset': '偏移量:',
             'usb_traffic': 'USB宽带限制:',
+            'auto_tune_usb': '自动',
+            'auto_tune_usb_tooltip': '在连续模式下试验不同的 USB 流量，选出不丢帧且帧率最高的值',
+            'usb_tune_step': 'USB 流量',
             'distributed_display': '分布式显示',
             'single_display': '单一显示',
             'sequential_display': '序列显示',
@@ -647,6 +724,8 @@ translations = {
             'set_temperature': '设置温度:',
             'temperature': '温度',
             'humidity': '湿度',
+            'cooler_power': '制冷功率',
+            'temperature_history_tooltip': '最近 30 分钟的传感器温度（实线）和设定温度（虚线），由 SDK 遥测线程采样',
             'CFW_control': '滤镜轮控制',
             'CFW_position': '滤镜轮',
             'init_complete': '初始化完成',
@@ -906,6 +985,7 @@ translations = {
             'command_not_found': '命令不存在',
             'queue_size': '当前命令队列大小为',
             'process_error': '进程异常:',
+            'frame_overwritten': '帧在读取前已被覆盖',
             'file': '文件:',
             'line_number': '行号:',
             'init_failed': '初始化失败',
@@ -1006,9 +1086,36 @@ translations = {
             'set_CFW_filter_failed': '设置滤光片失败',
             'close_camera_success': '关闭相机成功',
             'set_CFW_moving': '滤光片移动中...',
+            'set_CFW_timeout': '滤光片移动超时',
+            'sdk_restarting': 'SDK 进程无响应，正在重启',
+            'sdk_recovered': 'SDK 进程已重启并恢复相机设置',
+            'sdk_restart_limit': 'SDK 进程重启次数过多，已停止自动恢复',
+            'set_realtime_mode_success': '已设置预览实时模式（开始预览时生效）',
+            'realtime_mode': '预览实时模式',
+            'sdk_thread_hung': '进程内 SDK 线程无响应且无法重启，请重启程序或改用进程后端',
+            'sdk_backend': 'SDK 后端',
+            'usb_tune_need_live': 'USB 流量调优需要相机处于连续模式',
+            'usb_tune_busy': '预览或 USB 流量调优正在进行，请先停止',
+            'usb_tune_start': '开始 USB 流量调优，待测设置数',
+            'usb_tune_success': 'USB 流量调优完成',
+            'usb_tune_failed': 'USB 流量调优失败',
+            'usb_tune_no_stable': 'USB 流量调优没有找到不丢帧的设置',
+            'usb_tune_readout_mode': '最高帧率需要切换读出模式，请选择该模式并重新初始化相机',
+            'plan_row_overhead': '单行额外耗时',
+            'plan_row_setup': '配置',
+            'plan_row_readout': '读出',
+            'plan_row_frames': '帧数',
+            'plan_journal_failed': '写入计划执行日志失败',
+            'temperature_gate': '温度门限',
+            'temperature_gate_waiting': '等待传感器温度稳定',
+            'temperature_gate_stable': '传感器温度已稳定',
+            'temperature_gate_timeout': '传感器温度未能在限定时间内稳定',
+            'temperature_gate_no_setpoint': '未设置制冷目标温度，跳过温度门限',
+            'sequence_stop_timeout': '上一次序列拍摄未能停止，未开始新的序列',
             'get_external_trigger_number_success': '获取外部触发器数量成功',
             'get_external_trigger_number_failed': '获取外部触发器数量失败',
             'get_external_trigger_name_success': '获取外部触发器名称成功',
+            'external_trigger_timing': '触发到出帧耗时（毫秒）',
             'get_external_trigger_name_failed': '获取外部触发器名称失败',
             'set_GPS_control_success': '设置GPS控制成功',
             'set_GPS_control_failed': '设置GPS控制失败',
@@ -1080,9 +1187,44 @@ translations = {
             'confirm_execute_message': '您确定要开始计划吗？',
             'continue_execute': '继续执行',
             'continue_execute_message': '当前有计划执行中断，您要继续吗？',
+            'frames_done': '已完成帧数',
             'executing': '正在执行',
             'executed': '执行完成',
+            'execution_failed': '执行失败',
             'waiting': '等待执行',
+            'remaining_time': '剩余时间',
+            'drift': '延迟',
+            'schedule_report': '计划开始时间漂移（毫秒）',
+            'barrier': '同步',
+            'barrier_tooltip': '等待所有相机之前的行完成后开始，开始时间相同的相邻同步行同时开始',
+            'group': '分组',
+            'group_tooltip': '分组号相同（非 0）的相邻行组成一段，可由优化顺序重排；0 表示位置固定',
+            'frame_count': '帧数',
+            'temperature_gate': '温度门限',
+            'temperature_gate_tooltip': '传感器温度在设定值的容差内保持指定时间后才开始曝光',
+            'current_setpoint': '当前目标温度',
+            'gate_hold': '保持',
+            'gate_timeout': '超时',
+            'no_timeout': '不限',
+            'frame_count_tooltip': '相机只配置一次，连续拍摄的帧数',
+            'repeat': '重复',
+            'repeat_tooltip': '该行的执行次数，设置了循环号的行为整段的循环次数（取段内的最大值）',
+            'loop': '循环',
+            'loop_tooltip': '循环号相同（非 0）的相邻行组成一段，按重复次数整段循环；0 表示该行单独重复',
+            'optimize_plan': '优化顺序',
+            'optimize_plan_tooltip': '在分组内重排行，减少滤镜轮移动和读出模式、位深切换',
+            'optimize_saved': '预计节省切换时间',
+            'optimize_no_change': '当前顺序已是最优，预计切换时间',
+            'plan_running': '计划正在执行，请先取消',
+            'dry_run': '试运行',
+            'dry_run_tooltip': '按实测的读出、配置和滤镜轮耗时估算计划时长，不使用相机',
+            'dry_run_total': '预计耗时',
+            'save_to_disk': '直接保存',
+            'browse': '浏览',
+            'file_name_template': '文件名',
+            'file_name_template_tooltip': '可用字段：{plan} {row} {iteration} {frame} {camera} {filter} {readout} {exposure} {gain} {offset} {depth} {date} {time}',
+            'plan_frame_saved': '计划图像已保存',
+            'plan_frame_skipped': '未显示计划图像',
         },
         'save_image': {
             'save_image_failed': '图像保存失败',
@@ -0,0 +1,171 @@
+import argparse
+import heapq
+import json
+import os
+
+from .cfwManager import CFWManager
+from .plan_optimizer import PlanCostModel
+from .plan_scheduler import PlanScheduler, expand_steps
+
+# 没有实测记录时的耗时（秒）
+DEFAULT_TIMINGS = {
+    'readout': 1.0,     # 单帧读出
+    'init': 2.0,        # 打开相机或切换读出模式后重新初始化
+    'setup': 0.05,      # 只设置曝光、增益等参数
+}
+
+
+class PlanTimingCache:
+    """按相机记录计划行的实测耗时，保存在 plan_timing.json 中供试运行估算
+
+    readout 按 "读出模式编号/位深" 记录读出耗时，init 为打开或重新初始化相机的配置耗时，setup 为只改参数的配置耗时，
+    均为最近 20 次的滑动平均。多个 SDK 进程共用同一文件，写入前重新读取并合并。
+    """
+
+    def __init__(self, file_path="plan_timing.json"):
+        self.file_path = file_path
+
+    def load(self):
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def update(entry, key, value):
+        mean, count = entry.get(key, (0.0, 0))
+        count = min(count + 1, 20)
+        entry[key] = (mean + (value - mean) / count, count)
+
+    def record(self, camera, readout_mode, depth, timing, reinit):
+        data = self.load()
+        entry = data.setdefault(str(camera), {})
+        self.update(entry.setdefault('readout', {}), f"{readout_mode}/{depth}", timing['readout'])
+        self.update(entry, 'init' if reinit else 'setup', timing['setup'])
+        temp_path = f"{self.file_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False, indent=4)
+            os.replace(temp_path, self.file_path)
+        except OSError:
+            pass
+
+
+class PlanTimingModel:
+    """计划行的耗时模型：曝光时间加上实测的读出、配置和滤镜轮移动耗时，没有记录时取 DEFAULT_TIMINGS"""
+
+    def __init__(self, cache=None, cost_model=None, defaults=None):
+        self.timings = (cache if cache is not None else PlanTimingCache()).load()
+        self.cost_model = cost_model if cost_model is not None else PlanCostModel()
+        self.defaults = dict(DEFAULT_TIMINGS, **(defaults or {}))
+
+    def measured(self, camera, key, default):
+        value = self.timings.get(str(camera), {}).get(key)
+        return value[0] if value else default
+
+    def readout(self, row):
+        readout = self.timings.get(str(row['name']), {}).get('readout', {})
+        value = readout.get(f"{row['readout_mode']}/{row['depth']}")
+        return value[0] if value else self.defaults['readout']
+
+    def row_timing(self, previous, row):
+        """previous 为该相机上一行，None 表示需要打开相机；滤镜轮在配置期间移动，只计超出配置的部分；多帧行配置一次，曝光和读出按帧数累计"""
+        reinit = previous is None or previous['readout_mode'] != row['readout_mode']
+        key = 'init' if reinit else 'setup'
+        setup = self.measured(row['name'], key, self.defaults[key])
+        cfw = self.cost_model.cfw_time(row['name'], previous['CFW'] if previous else None, row['CFW'])
+        count = row.get('count', 1)
+        exposure = row['exposure'] / 1e6 * count
+        readout = self.readout(row) * count
+        return {'setup': setup, 'cfw_wait': max(cfw - setup, 0.0), 'exposure': exposure, 'readout': readout,
+                'duration': setup + max(cfw - setup, 0.0) + exposure + readout}
+
+
+def plan_rows(plan_data):
+    """把 plans.json 中保存的计划（各行加末尾的相机信息）转换为 SDK 使用的参数，间隔转换为秒"""
+    cameras = plan_data[-1]
+    rows = []
+    for row_data in plan_data[:-1]:
+        camera = cameras[row_data['name']]
+        hours, minutes, seconds = (int(value) for value in row_data.get('interval', '00:00:00').split(':'))
+        cfw = camera['CFW'][1].get(row_data.get('CFW', 'None'), 'None') if camera['CFW'][0] else 'None'
+        rows.append({
+            'name': row_data['name'],
+            'readout_mode': camera['readout_mode'].get(row_data['readout_mode'], row_data['readout_mode']),
+            'exposure': row_data['exposure'],
+            'depth': camera['depth'].get(row_data['depth'], row_data['depth']),
+            'CFW': None if cfw == 'None' else int(cfw, 16),
+            'interval': hours * 3600 + minutes * 60 + seconds,
+            'barrier': row_data.get('barrier', False),
+            'group': row_data.get('group', 0),
+            'count': row_data.get('count', 1),
+            'repeat': row_data.get('repeat', 1),
+            'loop': row_data.get('loop', row_data.get('group', 0)),
+        })
+    return rows
+
+
+def dry_run(rows, model=None):
+    """不连接相机，按耗时模型和 PlanScheduler 的调度规则模拟执行计划
+
+    行按循环段的重复次数展开为执行步骤，返回每个步骤的时间线（相对计划开始的秒数）和总耗时；
+    不同相机的行并行，同步行等待之前所有行完成。
+    """
+    model = model if model is not None else PlanTimingModel()
+    steps = expand_steps([row.get('loop', 0) for row in rows], [row.get('repeat', 1) for row in rows])
+    clock = [0.0]
+    scheduler = PlanScheduler(clock=lambda: clock[0], wall_clock=lambda: 0.0)
+    scheduler.start([rows[index]['interval'] for index, _, _ in steps], lanes=[rows[index]['name'] for index, _, _ in steps],
+                    barriers=[rows[index].get('barrier', False) for index, _, _ in steps])
+    last = {}  # 相机 -> 上一行
+    finishing = []  # (结束时刻, 行号)
+    timeline = []
+    while scheduler.active:
+        for step in scheduler.due():
+            index, iteration, _ = steps[step]
+            row = rows[index]
+            timing = model.row_timing(last.get(row['name']), row)
+            last[row['name']] = row
+            timing.update({'step': step, 'row': index, 'iteration': iteration, 'camera': row['name'], 'start': clock[0],
+                           'end': clock[0] + timing['duration'], 'wait': clock[0] - scheduler.records[step]['planned']})
+            timeline.append(timing)
+            heapq.heappush(finishing, (timing['end'], step))
+        events = [time for time in (scheduler.time_until_next(), finishing[0][0] - clock[0] if finishing else None) if time is not None]
+        if not events:
+            break
+        clock[0] += min(events)
+        while finishing and finishing[0][0] <= clock[0]:
+            scheduler.finished(heapq.heappop(finishing)[1])
+    timeline.sort(key=lambda item: item['step'])
+    total = max((item['end'] for item in timeline), default=0.0)
+    exposure = sum(item['exposure'] for item in timeline)
+    return {'timeline': timeline, 'total': total, 'exposure': exposure,
+            'overhead': sum(item['duration'] - item['exposure'] for item in timeline)}
+
+
+def format_timeline(result):
+    lines = [f"{'row':>4} {'iter':>4} {'camera':<20} {'start':>10} {'setup':>7} {'cfw':>7} {'exposure':>9} {'readout':>8} {'end':>10}"]
+    for item in result['timeline']:
+        lines.append(f"{item['row']:>4} {item['iteration'] + 1:>4} {item['camera']:<20} {item['start']:>10.1f} {item['setup']:>7.2f} {item['cfw_wait']:>7.2f} "
+                     f"{item['exposure']:>9.2f} {item['readout']:>8.2f} {item['end']:>10.1f}")
+    lines.append(f"total {result['total']:.1f}s, exposure {result['exposure']:.1f}s, overhead {result['overhead']:.1f}s")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Estimate the duration of a saved plan without connecting a camera.')
+    parser.add_argument('plan', help='plan name in plans.json')
+    parser.add_argument('--plans', default='plans.json')
+    parser.add_argument('--timing', default='plan_timing.json', help='measured readout and setup times')
+    parser.add_argument('--cfw', default='cfw_move_times.json', help='measured filter wheel move times')
+    args = parser.parse_args(argv)
+    with open(args.plans, 'r', encoding='utf-8') as file:
+        plan_data = json.load(file)[args.plan]
+    slots = {name: len(info['CFW'][1]) for name, info in plan_data[-1].items() if info['CFW'][0]}
+    model = PlanTimingModel(PlanTimingCache(args.timing), PlanCostModel(CFWManager(file_path=args.cfw), slots))
+    print(format_timeline(dry_run(plan_rows(plan_data), model)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+
+JOURNAL_FILE = "plan_journal.jsonl"
+
+
+def append_record(file_path, record):
+    """以追加方式写入一条记录并 fsync，多个 SDK 进程可同时写同一文件，每条记录一次写入；record 为 None 时只写入换行"""
+    line = ('' if record is None else json.dumps(record, ensure_ascii=False)) + '\n'
+    line = line.encode('utf-8')
+    fd = os.open(file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_file(file_path):
+    """把已写入的文件刷到磁盘，之后才在日志中记为完成"""
+    with open(file_path, 'rb+') as file:
+        os.fsync(file.fileno())
+
+
+def plan_signature(rows):
+    """计划各行参数的摘要，计划被修改后不再从日志恢复"""
+    return hashlib.sha1(json.dumps(rows, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class PlanJournal:
+    """计划执行日志，每行一条 JSON 记录，界面或 SDK 进程中途退出后据此继续执行
+
+    start 开始新的一次执行（覆盖旧日志），SDK 每完成一帧（直接写盘的帧在文件写完并刷盘后）追加一条 frame 记录，
+    计划正常结束时追加 end 记录。progress 返回最近一次未结束执行中各步骤已完成的帧，最后一行不完整时忽略。
+    """
+
+    def __init__(self, file_path=JOURNAL_FILE):
+        self.file_path = os.path.abspath(file_path)
+
+    def records(self):
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return []
+        if lines and not lines[-1].endswith('\n'):
+            # 补上换行，继续执行后追加的记录不会接在半行后面
+            append_record(self.file_path, None)
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # 写入中途退出留下的半行
+        return records
+
+    def start(self, plan, signature):
+        """开始新的一次执行，返回执行编号"""
+        run = uuid.uuid4().hex
+        temp_path = f"{self.file_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({'event': 'start', 'run': run, 'plan': plan, 'signature': signature, 'time': time.time()}, ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.file_path)
+        return run
+
+    def end(self, run):
+        append_record(self.file_path, {'event': 'end', 'run': run, 'time': time.time()})
+
+    def progress(self, plan, signature):
+        """同一计划最近一次未结束的执行：{'run', 'frames': {步骤: 已完成的帧号集合}, 'complete': 已完成的步骤集合, 'files': [已保存的文件]}
+
+        没有可继续的执行时返回 None。
+        """
+        records = self.records()
+        if not records or records[0].get('event') != 'start':
+            return None
+        start = records[0]
+        if start.get('plan') != plan or start.get('signature') != signature:
+            return None
+        run = start['run']
+        frames = {}
+        counts = {}
+        files = []
+        for record in records[1:]:
+            if record.get('run') != run:
+                continue
+            if record['event'] == 'end':
+                return None
+            if record['event'] == 'frame':
+                frames.setdefault(record['step'], set()).add(record['frame'])
+                counts[record['step']] = record['count']
+                if record.get('file'):
+                    files.append(record['file'])
+        complete = {step for step, done in frames.items() if len(done) >= counts[step]}
+        return {'run': run, 'frames': frames, 'complete': complete, 'files': files}
+
+
+def frame_record(journal, data, frame):
+    """SDK 完成一帧后追加的记录，journal 为计划行中的 {'path', 'run'}，file 由写盘线程补上"""
+    return {'event': 'frame', 'run': journal['run'], 'step': data.get('step', data.get('row')), 'row': data.get('row'),
+            'iteration': data.get('iteration', 0), 'frame': frame, 'count': data.get('count', 1), 'time': time.time()}
+
+
+def first_missing(frames, start=0):
+    """从 start 起第一个尚未完成的帧号；写盘线程可能乱序完成，继续执行时逐帧跳过已完成的帧，而不只是从第一个缺口开始"""
+    frame = start
+    while frame in frames:
+        frame += 1
+    return frame
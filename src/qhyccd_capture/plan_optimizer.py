@@ -0,0 +1,141 @@
+from .cfwManager import CFWManager
+
+# 没有实测记录时的切换耗时（秒）
+DEFAULT_COSTS = {
+    'readout_mode': 3.0,    # 切换读出模式需要重新初始化相机
+    'depth': 0.5,           # 切换位深
+    'slot': 1.0,            # 滤镜轮每经过一个孔位
+}
+EXACT_LIMIT = 10  # 不超过该行数时精确求解，否则用贪心加两两交换
+
+
+class PlanCostModel:
+    """计划中同一相机相邻两行之间的切换耗时估算（秒）
+
+    行为 {'name', 'readout_mode', 'depth', 'CFW'}，CFW 为孔位编号或 None。滤镜轮移动耗时取 CFWManager
+    记录的孔位间实测值，没有记录时按孔数乘以 costs['slot'] 估算；读出模式和位深切换按 costs 计算。
+    """
+
+    def __init__(self, cfw_manager=None, slots=None, costs=None):
+        self.cfw_manager = cfw_manager if cfw_manager is not None else CFWManager()
+        self.slots = slots or {}  # 相机名称 -> 滤镜轮孔数
+        self.costs = dict(DEFAULT_COSTS, **(costs or {}))
+
+    def cfw_time(self, camera, from_slot, to_slot):
+        if from_slot is None or to_slot is None or from_slot == to_slot:
+            return 0.0
+        slots = self.slots.get(camera)
+        estimate = self.cfw_manager.estimate(camera, from_slot, to_slot, slots)
+        if estimate is None:
+            distance = (to_slot - from_slot) % slots if slots else abs(to_slot - from_slot)
+            estimate = self.costs['slot'] * distance
+        return estimate
+
+    def transition(self, previous, row):
+        """从 previous 行切换到 row 行的耗时，previous 为 None（相机状态未知）时为 0"""
+        if previous is None:
+            return 0.0
+        cost = self.cfw_time(row['name'], previous['CFW'], row['CFW'])
+        if previous['readout_mode'] != row['readout_mode']:
+            cost += self.costs['readout_mode']
+        if previous['depth'] != row['depth']:
+            cost += self.costs['depth']
+        return cost
+
+    def total(self, rows):
+        """按给定顺序执行时各相机的切换耗时之和"""
+        last = {}
+        cost = 0.0
+        for row in rows:
+            cost += self.transition(last.get(row['name']), row)
+            last[row['name']] = row
+        return cost
+
+
+def best_order(rows, start, transition):
+    """从 start 状态出发依次经过所有行、切换耗时最小的顺序，返回 rows 的下标列表"""
+    count = len(rows)
+    if count <= 1:
+        return list(range(count))
+    if count <= EXACT_LIMIT:
+        # Held-Karp：best[(已经过的行集合, 最后一行)] = (耗时, 上一行)
+        best = {(1 << i, i): (transition(start, rows[i]), None) for i in range(count)}
+        for mask in range(1, 1 << count):
+            for last in range(count):
+                if (mask, last) not in best:
+                    continue
+                cost = best[(mask, last)][0]
+                for nxt in range(count):
+                    if mask & (1 << nxt):
+                        continue
+                    key = (mask | (1 << nxt), nxt)
+                    value = cost + transition(rows[last], rows[nxt])
+                    # 耗时相同时保留原顺序在前的方案
+                    if key not in best or value < best[key][0] - 1e-9:
+                        best[key] = (value, last)
+        full = (1 << count) - 1
+        last = min(range(count), key=lambda i: (best[(full, i)][0], i))
+        order = []
+        mask = full
+        while last is not None:
+            order.append(last)
+            previous = best[(mask, last)][1]
+            mask &= ~(1 << last)
+            last = previous
+        return order[::-1]
+    # 行数较多时先按最近邻排序，再做两两交换直到不再改善
+    remaining = list(range(count))
+    order = []
+    state = start
+    while remaining:
+        nxt = min(remaining, key=lambda i: (transition(state, rows[i]), i))
+        remaining.remove(nxt)
+        order.append(nxt)
+        state = rows[nxt]
+
+    def path_cost(sequence):
+        cost, state = 0.0, start
+        for i in sequence:
+            cost += transition(state, rows[i])
+            state = rows[i]
+        return cost
+
+    improved = True
+    current = path_cost(order)
+    while improved:
+        improved = False
+        for i in range(count - 1):
+            for j in range(i + 1, count):
+                candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                value = path_cost(candidate)
+                if value < current - 1e-9:
+                    order, current, improved = candidate, value, True
+    return order
+
+
+def optimize_plan(rows, groups, model):
+    """在可重排的分组内调整行的顺序，使滤镜轮移动、读出模式和位深切换的总耗时最小
+
+    groups[i] 为第 i 行的分组号，0 或 None 的行位置固定；分组号相同的相邻行组成一段，段内同一相机的行互换位置，
+    各相机在段内占用的位置不变，多相机并行的节奏不受影响。返回 (新顺序的原行号列表, 调整前耗时, 调整后耗时)。
+    """
+    order = list(range(len(rows)))
+    last = {}  # 相机 -> 按新顺序的最后一行
+    index = 0
+    while index < len(rows):
+        group = groups[index]
+        end = index + 1
+        if group:
+            while end < len(rows) and groups[end] == group:
+                end += 1
+        positions = {}
+        for position in range(index, end):
+            positions.setdefault(rows[position]['name'], []).append(position)
+        for camera, camera_positions in positions.items():
+            block = [rows[position] for position in camera_positions]
+            sequence = best_order(block, last.get(camera), model.transition) if group else range(len(block))
+            for position, i in zip(camera_positions, sequence):
+                order[position] = camera_positions[i]
+            last[camera] = rows[order[camera_positions[-1]]]
+        index = end
+    return order, model.total(rows), model.total([rows[i] for i in order])
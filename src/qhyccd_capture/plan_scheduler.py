@@ -0,0 +1,158 @@
+import heapq
+import time
+
+from .realtime import interval_stats
+
+
+class PlanScheduler:
+    """计划拍摄的绝对时间调度，不依赖界面
+
+    开始时按单调时钟确定每行的计划开始时刻：计划起点加上该行及之前各行的间隔之和，
+    定时器的误差和上一行的执行耗时都不会累积到后续行。待执行的行按计划时刻放在优先队列中。
+    每行属于一条通道（相机），不同通道的行并行执行，同一通道按行号顺序执行，到时且该通道的上一行已完成才派发；
+    上一行超时未完成时该行顺延，后续行的计划时刻不变。
+    同步行（barrier）等待之前所有行完成后才开始，计划时刻相同的相邻同步行作为一组同时派发，
+    之后的行不会越过尚未开始的同步行。
+    每行记录计划与实际开始时间（相对计划起点的秒数），report 汇总漂移分布。
+    """
+
+    def __init__(self, clock=time.monotonic, wall_clock=time.time):
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.queue = []  # (计划时刻, 行号)
+        self.records = {}
+        self.running = {}  # 通道 -> 执行中的行
+        self.origin = None
+        self.wall_origin = None
+
+    def start(self, intervals, first_row=0, lanes=None, barriers=None, done=None):
+        """intervals[i] 为第 i 行与上一行计划开始时间的间隔（秒），first_row 之前的行和 done 中的行（已完成）不执行，也不计间隔
+
+        lanes[i] 为第 i 行所属的通道（相机名称），None 时所有行按顺序执行；barriers[i] 为真时该行为同步行。
+        """
+        self.origin = self.clock()
+        self.wall_origin = self.wall_clock()
+        self.queue = []
+        self.records = {}
+        self.running = {}
+        offset = 0.0
+        for row in range(first_row, len(intervals)):
+            if done and row in done:
+                continue
+            offset += intervals[row]
+            self.add(row, offset, lanes[row] if lanes else None, bool(barriers[row]) if barriers else False)
+
+    def add(self, row, offset, lane=None, barrier=False):
+        """在计划起点之后 offset 秒加入一行"""
+        heapq.heappush(self.queue, (self.origin + offset, row))
+        self.records[row] = {'row': row, 'lane': lane, 'barrier': barrier, 'planned': offset,
+                             'planned_wall': self.wall_origin + offset, 'actual': None, 'finished': None}
+
+    @property
+    def active(self):
+        return self.origin is not None and (bool(self.queue) or bool(self.running))
+
+    @property
+    def running_rows(self):
+        return sorted(self.running.values())
+
+    def pending(self, now=None):
+        """尚未开始的行及距计划时刻的秒数，已过期（等待上一行）时为 0"""
+        now = self.clock() if now is None else now
+        return [(row, max(planned - now, 0.0)) for planned, row in sorted(self.queue)]
+
+    def in_group(self, row, other):
+        """两行是否属于同一组同步行"""
+        first, second = self.records[row], self.records.get(other)
+        return second is not None and first['barrier'] and second['barrier'] and first['planned'] == second['planned']
+
+    def barrier_ready(self, row):
+        """同步行之前的行（同组除外）是否都已完成"""
+        for other, record in self.records.items():
+            if other < row and record['finished'] is None and not self.in_group(row, other):
+                return False
+        return True
+
+    def due(self, now=None):
+        """取出所有可以开始的行并标记为执行中，按行号返回"""
+        now = self.clock() if now is None else now
+        started = []
+        blocked = set(self.running)  # 有行在执行或有更早的行在等待的通道
+        for planned, row in sorted(self.queue):
+            if planned > now:
+                break
+            record = self.records[row]
+            if record['barrier'] and not self.barrier_ready(row):
+                break  # 之后的行不越过同步行
+            if record['lane'] in blocked:
+                if record['barrier']:
+                    break
+                continue
+            self.queue.remove((planned, row))
+            self.running[record['lane']] = row
+            blocked.add(record['lane'])
+            record['actual'] = now - self.origin
+            started.append(row)
+        heapq.heapify(self.queue)
+        return started
+
+    def time_until_next(self, now=None):
+        """距离下一个尚未到达的计划时刻的秒数；剩下的行都已到时只在等待上一行时返回 None，由 finished 后重新调度"""
+        now = self.clock() if now is None else now
+        future = [planned for planned, _ in self.queue if planned > now]
+        if not future:
+            return None
+        return min(future) - now
+
+    def finished(self, row=None):
+        """标记执行中的行已完成，row 为 None 时取唯一执行中的行"""
+        if row is None:
+            if len(self.running) != 1:
+                return
+            row = next(iter(self.running.values()))
+        record = self.records.get(row)
+        if record is None or self.running.get(record['lane']) != row:
+            return  # 已取消或重复的完成通知
+        record['finished'] = self.clock() - self.origin
+        del self.running[record['lane']]
+        return row
+
+    def cancel(self):
+        self.queue = []
+        self.running = {}
+
+    def drift(self, row):
+        """实际开始时间相对计划的延迟（秒），尚未开始时返回 None"""
+        record = self.records.get(row)
+        if record is None or record['actual'] is None:
+            return None
+        return record['actual'] - record['planned']
+
+    def report(self):
+        """各行的计划和实际开始时间，以及漂移分布（毫秒）"""
+        rows = []
+        for row in sorted(self.records):
+            record = dict(self.records[row])
+            record['drift'] = self.drift(row)
+            rows.append(record)
+        drifts = [record['drift'] * 1000 for record in rows if record['drift'] is not None]
+        return {'wall_origin': self.wall_origin, 'rows': rows, 'drift_ms': interval_stats(drifts)}
+
+
+def expand_steps(loops, repeats):
+    """按循环段的重复次数展开计划行，返回执行步骤 [(行号, 第几次, 重复次数)]
+
+    循环号相同且非 0 的相邻行组成一段，整段按段内最大的重复次数循环执行（与段内顺序无关）；循环号为 0 的行按自身的重复次数连续执行。
+    """
+    steps = []
+    index = 0
+    while index < len(loops):
+        end = index + 1
+        if loops[index]:
+            while end < len(loops) and loops[end] == loops[index]:
+                end += 1
+        repeat = max(1, *(int(repeats[row] or 1) for row in range(index, end)))
+        for iteration in range(repeat):
+            steps.extend((row, iteration, repeat) for row in range(index, end))
+        index = end
+    return steps
@@ -0,0 +1,141 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+from astropy.io import fits
+
+from .language import translations
+from .plan_journal import append_record, sync_file
+from .save_video import apply_fits_header
+
+DEFAULT_TEMPLATE = "{plan}_{row:03d}_{iteration:03d}_{frame:04d}_{camera}_{filter}_{exposure}s_{date}_{time}"
+THUMBNAIL_SIZE = 256  # 缩略图长边的像素数
+
+
+def format_file_name(template, fields):
+    """按模板生成文件名（不含扩展名），模板有误时退回默认模板，去掉路径中不能使用的字符"""
+    try:
+        name = template.format(**fields)
+    except (KeyError, IndexError, ValueError):
+        name = DEFAULT_TEMPLATE.format(**fields)
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', name).strip('_') or 'plan'
+
+
+def thumbnail(image, size=THUMBNAIL_SIZE):
+    """隔行隔列抽取的小图，只用于界面显示"""
+    step = max(1, int(np.ceil(max(image.shape[:2]) / size)))
+    return np.ascontiguousarray(image[::step, ::step])
+
+
+class PlanWriter:
+    """计划拍摄的写盘线程池，在 SDK 进程内直接保存计划行的图像
+
+    submit 立即返回，图像在线程池中按格式写入，FITS 头由 FITS 头编辑器的内容加上计划行的参数组成。
+    排队的图像数不超过 max_pending，写盘跟不上时 submit 等待，内存占用有上限。
+    每个文件写完后发送 planFrame_saved，失败发送 error；带有执行日志记录时文件刷盘后再追加到日志。
+    """
+
+    def __init__(self, output_queue, language='en', num_threads=2, max_pending=4):
+        self.output_queue = output_queue
+        self.language = language
+        self.executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix='plan_writer')
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.max_pending = max_pending
+
+    def submit(self, image, save, fields, header, journal=None):
+        """save 为 {'path', 'template', 'save_format', 'fits_header'}，fields 为文件名模板的字段，header 为计划行的 FITS 关键字
+
+        journal 为 (日志路径, 记录)，文件写完后追加记录，记录中补上文件路径。
+        """
+        save_format = save.get('save_format', 'fits').lower()
+        file_path = os.path.join(save['path'], f"{format_file_name(save.get('template') or DEFAULT_TEMPLATE, fields)}.{save_format}")
+        self.pending.acquire()
+        self.executor.submit(self.write, image, file_path, save_format, save.get('fits_header'), header, fields.get('row'), journal)
+        return file_path
+
+    def write(self, image, file_path, save_format, fits_header, header, row, journal=None):
+        try:
+            os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+            if save_format == 'fits':
+                hdu = fits.PrimaryHDU(image)
+                apply_fits_header(hdu.header, fits_header, self.language)
+                for key, (value, comment) in header.items():
+                    hdu.header[key] = (value, comment)
+                hdu.writeto(file_path, overwrite=True)
+            else:
+                if image.ndim == 3:
+                    image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+                if not cv2.imwrite(file_path, image):
+                    raise OSError(file_path)
+            if journal is not None:
+                sync_file(file_path)
+                append_record(journal[0], dict(journal[1], file=file_path))
+            self.output_queue.put({"order": "planFrame_saved", "data": {'row': row, 'file': file_path}})
+        except Exception as e:
+            self.output_queue.put({"order": "error", "data": f"{translations[self.language]['save_image']['save_image_failed']}: {file_path}: {e}"})
+        finally:
+            self.pending.release()
+
+    def flush(self):
+        """等待已提交的图像全部写完"""
+        for _ in range(self.max_pending):
+            self.pending.acquire()
+        for _ in range(self.max_pending):
+            self.pending.release()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def plan_header(data, exposure_start, image, frame=0, telemetry=None):
+    """计划行参数对应的 FITS 关键字 {关键字: (值, 注释)}，frame 为该行的第几帧（从 0 开始），
+    telemetry 为遥测线程的最新样本，有值的项写入温度、制冷功率和湿度"""
+    labels = data.get('labels', {})
+    header = {
+        'DATE-OBS': (datetime.fromtimestamp(exposure_start, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3], 'UTC start of exposure'),
+        'EXPTIME': (data['exposure'] / 1e6, 'exposure time [s]'),
+        'GAIN': (data['gain'], 'sensor gain'),
+        'OFFSET': (data['offset'], 'sensor offset'),
+        'INSTRUME': (data['name'], 'camera'),
+        'READOUTM': (labels.get('readout_mode', str(data['readout_mode'])), 'readout mode'),
+        'BITDEPTH': (data['depth'], 'transfer bit depth'),
+    }
+    if data.get('CFW', 'None') != 'None':
+        header['FILTER'] = (labels.get('CFW', data['CFW']), 'filter name')
+    if data.get('plan'):
+        header['PLAN'] = (data['plan'], 'plan name')
+        header['PLANROW'] = (data.get('row', -1), 'plan row')
+        header['PLANITER'] = (data.get('iteration', 0), 'plan repeat iteration')
+        header['FRAME'] = (frame, 'frame index in plan row')
+        header['NFRAMES'] = (data.get('count', 1), 'frames in plan row')
+    for key, field, comment in (('CCD-TEMP', 'temperature', 'sensor temperature [C]'), ('SET-TEMP', 'setpoint', 'cooler setpoint [C]'),
+                                ('COOLPOWR', 'pwm', 'cooler power [%]'), ('HUMIDITY', 'humidity', 'camera humidity')):
+        if telemetry and telemetry.get(field) is not None:
+            header[key] = (round(telemetry[field], 2), comment)
+    return header
+
+
+def plan_fields(data, exposure_start, frame=0):
+    """文件名模板可用的字段"""
+    labels = data.get('labels', {})
+    start = datetime.fromtimestamp(exposure_start)
+    exposure = data['exposure'] / 1e6
+    return {
+        'plan': data.get('plan') or 'plan',
+        'row': data.get('row', 0),
+        'iteration': data.get('iteration', 0),
+        'frame': frame,
+        'camera': data['name'],
+        'filter': labels.get('CFW', data.get('CFW', 'None')),
+        'readout': labels.get('readout_mode', data['readout_mode']),
+        'exposure': f"{exposure:g}",
+        'gain': data['gain'],
+        'offset': data['offset'],
+        'depth': data['depth'],
+        'date': start.strftime('%Y%m%d'),
+        'time': start.strftime('%H%M%S'),
+    }
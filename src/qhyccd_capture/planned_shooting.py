@@ -1,19 +1,28 @@
 import os
 import json
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QTableWidget, QPushButton, QTableWidgetItem, QTimeEdit, QSpinBox, QDoubleSpinBox, QHeaderView, QInputDialog, QMessageBox
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QTableWidget, QPushButton, QTableWidgetItem, QTimeEdit, QSpinBox, QDoubleSpinBox, QHeaderView, QInputDialog, QMessageBox, QCheckBox, QLineEdit, QFileDialog, QLabel
 from PyQt5.QtCore import Qt, QTime, QTimer, pyqtSignal
 from functools import partial
 from .language import translations
+from .plan_scheduler import PlanScheduler, expand_steps
+from .plan_optimizer import PlanCostModel, optimize_plan
+from .plan_estimator import PlanTimingModel, dry_run, format_timeline, plan_rows
+from .plan_writer import DEFAULT_TEMPLATE
+from .plan_journal import PlanJournal, plan_signature
 
 class PlannedShootingDialog(QDialog):
     plan_running_signal = pyqtSignal(dict)  # 定义信号
+    plan_schedule_signal = pyqtSignal(dict)  # 计划结束时发送各行的计划与实际开始时间
 
     def __init__(self, parent=None,language='cn'):
         super().__init__(parent)
         self.language = language
         self.data_dict = {}
-        self.current_row = 0
-        self.running_row = 0
+        self.steps = []  # 展开重复后的执行步骤 [(行号, 第几次, 重复次数)]
+        self.journal = PlanJournal()  # 执行日志，中断或程序退出后据此继续
+        self.journal_run = None
+        self.frames_done = {}  # 继续执行时各步骤已完成的帧号
+        self.failed_steps = set()  # 本次执行中失败的步骤，有失败时日志不结束，再次执行时可以补拍
         
         self.setWindowTitle(translations[self.language]['planned_shooting']['window_title'])
         self.setGeometry(100, 100, 800, 600)
@@ -24,7 +33,7 @@ class PlannedShootingDialog(QDialog):
         self.planComboBox = QComboBox()
         self.planComboBox.addItem("None")  # 默认选项
         layout.addWidget(self.planComboBox)
-        self.label_text = [translations[self.language]['planned_shooting']['camera'], translations[self.language]['planned_shooting']['readout_mode'], translations[self.language]['planned_shooting']['interval'], translations[self.language]['planned_shooting']['exposure'], translations[self.language]['planned_shooting']['gain'], translations[self.language]['planned_shooting']['offset'], translations[self.language]['planned_shooting']['depth'], translations[self.language]['planned_shooting']['CFW'], translations[self.language]['planned_shooting']['status']]
+        self.label_text = [translations[self.language]['planned_shooting']['camera'], translations[self.language]['planned_shooting']['readout_mode'], translations[self.language]['planned_shooting']['interval'], translations[self.language]['planned_shooting']['exposure'], translations[self.language]['planned_shooting']['gain'], translations[self.language]['planned_shooting']['offset'], translations[self.language]['planned_shooting']['depth'], translations[self.language]['planned_shooting']['CFW'], translations[self.language]['planned_shooting']['status'], translations[self.language]['planned_shooting']['barrier'], translations[self.language]['planned_shooting']['group'], translations[self.language]['planned_shooting']['frame_count'], translations[self.language]['planned_shooting']['repeat'], translations[self.language]['planned_shooting']['temperature_gate'], translations[self.language]['planned_shooting']['loop']]
         self.table = QTableWidget()
         self.table.setColumnCount(len(self.label_text))
         self.table.setHorizontalHeaderLabels(self.label_text)
@@ -37,10 +46,65 @@ class PlannedShootingDialog(QDialog):
         tableControlLayout = QHBoxLayout()
         self.addButton = QPushButton(translations[self.language]['planned_shooting']['add_row'])
         self.removeButton = QPushButton(translations[self.language]['planned_shooting']['remove_row'])
+        self.optimizeButton = QPushButton(translations[self.language]['planned_shooting']['optimize_plan'])
+        self.optimizeButton.setToolTip(translations[self.language]['planned_shooting']['optimize_plan_tooltip'])
         tableControlLayout.addWidget(self.addButton)
         tableControlLayout.addWidget(self.removeButton)
+        tableControlLayout.addWidget(self.optimizeButton)
+        self.dryRunButton = QPushButton(translations[self.language]['planned_shooting']['dry_run'])
+        self.dryRunButton.setToolTip(translations[self.language]['planned_shooting']['dry_run_tooltip'])
+        tableControlLayout.addWidget(self.dryRunButton)
         layout.addLayout(tableControlLayout)
 
+        # 计划图像直接在 SDK 进程中写盘，界面只显示缩略图
+        outputLayout = QHBoxLayout()
+        self.saveToDiskCheckbox = QCheckBox(translations[self.language]['planned_shooting']['save_to_disk'])
+        self.outputPathEdit = QLineEdit(os.path.join(os.getcwd(), 'plan_output'))
+        self.browseButton = QPushButton(translations[self.language]['planned_shooting']['browse'])
+        self.templateEdit = QLineEdit(DEFAULT_TEMPLATE)
+        self.templateEdit.setToolTip(translations[self.language]['planned_shooting']['file_name_template_tooltip'])
+        self.outputFormatSelector = QComboBox()
+        self.outputFormatSelector.addItems(['fits', 'tiff', 'png'])
+        outputLayout.addWidget(self.saveToDiskCheckbox)
+        outputLayout.addWidget(self.outputPathEdit)
+        outputLayout.addWidget(self.browseButton)
+        outputLayout.addWidget(QLabel(translations[self.language]['planned_shooting']['file_name_template']))
+        outputLayout.addWidget(self.templateEdit)
+        outputLayout.addWidget(self.outputFormatSelector)
+        layout.addLayout(outputLayout)
+
+        # 勾选温度门限的行在传感器温度稳定后才开始曝光，由 SDK 进程的遥测线程判断
+        gateLayout = QHBoxLayout()
+        self.gateSetpoint = QDoubleSpinBox()
+        self.gateSetpoint.setRange(-51.0, 50.0)
+        self.gateSetpoint.setSingleStep(0.5)
+        self.gateSetpoint.setSuffix(' °C')
+        self.gateSetpoint.setSpecialValueText(translations[self.language]['planned_shooting']['current_setpoint'])  # 最小值表示使用当前目标温度
+        self.gateSetpoint.setValue(-51.0)
+        self.gateTolerance = QDoubleSpinBox()
+        self.gateTolerance.setRange(0.1, 10.0)
+        self.gateTolerance.setSingleStep(0.1)
+        self.gateTolerance.setValue(0.5)
+        self.gateTolerance.setPrefix('± ')
+        self.gateTolerance.setSuffix(' °C')
+        self.gateHold = QSpinBox()
+        self.gateHold.setRange(0, 3600)
+        self.gateHold.setValue(60)
+        self.gateHold.setSuffix(' s')
+        self.gateTimeout = QSpinBox()
+        self.gateTimeout.setRange(0, 86400)
+        self.gateTimeout.setValue(1800)
+        self.gateTimeout.setSuffix(' s')
+        self.gateTimeout.setSpecialValueText(translations[self.language]['planned_shooting']['no_timeout'])
+        gateLayout.addWidget(QLabel(translations[self.language]['planned_shooting']['temperature_gate']))
+        gateLayout.addWidget(self.gateSetpoint)
+        gateLayout.addWidget(self.gateTolerance)
+        gateLayout.addWidget(QLabel(translations[self.language]['planned_shooting']['gate_hold']))
+        gateLayout.addWidget(self.gateHold)
+        gateLayout.addWidget(QLabel(translations[self.language]['planned_shooting']['gate_timeout']))
+        gateLayout.addWidget(self.gateTimeout)
+        layout.addLayout(gateLayout)
+
         buttonsLayout = QHBoxLayout()
         self.startButton = QPushButton(translations[self.language]['planned_shooting']['start_plan'])
         self.cancelButton = QPushButton(translations[self.language]['planned_shooting']['cancel_plan'])
@@ -58,12 +122,20 @@ class PlannedShootingDialog(QDialog):
 
         self.addButton.clicked.connect(self.addRow)
         self.removeButton.clicked.connect(self.removeRow)
+        self.optimizeButton.clicked.connect(self.optimizePlan)
+        self.dryRunButton.clicked.connect(self.dryRunPlan)
+        self.browseButton.clicked.connect(self.browseOutputPath)
         self.saveButton.clicked.connect(self.savePlan)
         self.deleteButton.clicked.connect(self.deletePlan)
         self.planComboBox.currentIndexChanged.connect(self.loadPlan)
 
-        self.timer = QTimer(self)  # 创建定时器
-        self.timer.timeout.connect(self.updateCountdown)  # 连接定时器的超时信号
+        self.scheduler = PlanScheduler()
+        self.timer = QTimer(self)  # 单次定时到下一行的计划时刻
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.scheduleNext)
+        self.countdown_timer = QTimer(self)  # 每秒刷新剩余时间
+        self.countdown_timer.timeout.connect(self.updateCountdown)
 
         self.cancelButton.clicked.connect(self.cancelPlan)
 
@@ -130,6 +202,12 @@ class PlannedShootingDialog(QDialog):
                 "offset": self.table.cellWidget(row, 5).value(),
                 "depth": self.table.cellWidget(row, 6).currentText(),
                 "CFW": filter_selector.currentText(),
+                "barrier": self.table.cellWidget(row, 9).isChecked(),
+                "group": self.table.cellWidget(row, 10).value(),
+                "count": self.table.cellWidget(row, 11).value(),
+                "repeat": self.table.cellWidget(row, 12).value(),
+                "temperature_gate": self.table.cellWidget(row, 13).isChecked(),
+                "loop": self.table.cellWidget(row, 14).value(),
             }
             plan_data.append(row_data)
         camera_dict = {}
@@ -150,9 +228,43 @@ class PlannedShootingDialog(QDialog):
             "offset": self.table.cellWidget(row, 5).value(),
             "depth": self.data_dict[self.table.cellWidget(row, 0).currentText()]['depth'][self.table.cellWidget(row, 6).currentText()],
             "CFW": self.data_dict[self.table.cellWidget(row, 0).currentText()]['CFW'][1].get(self.table.cellWidget(row, 7).currentText(), 'None'),
+            "row": row,
+            "count": self.table.cellWidget(row, 11).value(),
+            "plan": self.planComboBox.currentText(),
+            "labels": {
+                "readout_mode": self.table.cellWidget(row, 1).currentText(),
+                "CFW": self.table.cellWidget(row, 7).currentText(),
+            },
+            "save": self.outputSettings(),
+            "temperature_gate": self.gateSettings() if self.table.cellWidget(row, 13).isChecked() else None,
         }
         return row_data
 
+    def outputSettings(self):
+        """直接写盘的设置，未勾选时返回 None，图像发回界面"""
+        if not self.saveToDiskCheckbox.isChecked():
+            return None
+        return {
+            "path": self.outputPathEdit.text().strip(),
+            "template": self.templateEdit.text().strip() or DEFAULT_TEMPLATE,
+            "save_format": self.outputFormatSelector.currentText(),
+        }
+
+    def gateSettings(self):
+        """温度门限的参数，设定值为 None 时 SDK 使用当前的制冷目标温度"""
+        setpoint = self.gateSetpoint.value()
+        return {
+            "setpoint": None if setpoint == self.gateSetpoint.minimum() else setpoint,
+            "tolerance": self.gateTolerance.value(),
+            "hold": self.gateHold.value(),
+            "timeout": self.gateTimeout.value(),
+        }
+
+    def browseOutputPath(self):
+        path = QFileDialog.getExistingDirectory(self, translations[self.language]['planned_shooting']['browse'], self.outputPathEdit.text())
+        if path:
+            self.outputPathEdit.setText(path)
+
     def applyPlanData(self, plan_data):
         self.table.setRowCount(0)  # 清空表格
         for key in plan_data[-1].keys():
@@ -230,6 +342,26 @@ class PlannedShootingDialog(QDialog):
             status_display.setFlags(Qt.ItemIsEnabled) 
             self.table.setItem(row_count, 8, status_display)
 
+            # 设置同步
+            barrier_checkbox = QCheckBox()
+            barrier_checkbox.setChecked(row_data.get("barrier", False))
+            barrier_checkbox.setToolTip(translations[self.language]['planned_shooting']['barrier_tooltip'])
+            self.table.setCellWidget(row_count, 9, barrier_checkbox)
+
+            # 设置可重排分组
+            group_input = QSpinBox()
+            group_input.setRange(0, 99)
+            group_input.setValue(row_data.get("group", 0))
+            group_input.setToolTip(translations[self.language]['planned_shooting']['group_tooltip'])
+            self.table.setCellWidget(row_count, 10, group_input)
+
+            # 设置帧数和重复次数，旧计划没有这两项时均为 1
+            self.table.setCellWidget(row_count, 11, self.countInput(row_data.get("count", 1)))
+            self.table.setCellWidget(row_count, 12, self.repeatInput(row_data.get("repeat", 1)))
+            self.table.setCellWidget(row_count, 13, self.gateInput(row_data.get("temperature_gate", False)))
+            # 旧计划由分组兼作循环段，没有 loop 时沿用分组号
+            self.table.setCellWidget(row_count, 14, self.loopInput(row_data.get("loop", row_data.get("group", 0))))
+
     def getPlanNames(self):
         # Retrieve a list of saved plan names for deletion
         all_plans = self.loadAllPlans()
@@ -300,6 +432,47 @@ class PlannedShootingDialog(QDialog):
         status_display = QTableWidgetItem("")
         status_display.setFlags(Qt.ItemIsEnabled) # type: ignore
         self.table.setItem(row, 8, status_display)
+
+        barrier_checkbox = QCheckBox()
+        barrier_checkbox.setToolTip(translations[self.language]['planned_shooting']['barrier_tooltip'])
+        self.table.setCellWidget(row, 9, barrier_checkbox)
+
+        group_input = QSpinBox()
+        group_input.setRange(0, 99)
+        group_input.setToolTip(translations[self.language]['planned_shooting']['group_tooltip'])
+        self.table.setCellWidget(row, 10, group_input)
+
+        self.table.setCellWidget(row, 11, self.countInput(1))
+        self.table.setCellWidget(row, 12, self.repeatInput(1))
+        self.table.setCellWidget(row, 13, self.gateInput(False))
+        self.table.setCellWidget(row, 14, self.loopInput(0))
+
+    def countInput(self, value):
+        count_input = QSpinBox()
+        count_input.setRange(1, 9999)
+        count_input.setValue(value)
+        count_input.setToolTip(translations[self.language]['planned_shooting']['frame_count_tooltip'])
+        return count_input
+
+    def gateInput(self, checked):
+        gate_checkbox = QCheckBox()
+        gate_checkbox.setChecked(checked)
+        gate_checkbox.setToolTip(translations[self.language]['planned_shooting']['temperature_gate_tooltip'])
+        return gate_checkbox
+
+    def repeatInput(self, value):
+        repeat_input = QSpinBox()
+        repeat_input.setRange(1, 999)
+        repeat_input.setValue(value)
+        repeat_input.setToolTip(translations[self.language]['planned_shooting']['repeat_tooltip'])
+        return repeat_input
+
+    def loopInput(self, value):
+        loop_input = QSpinBox()
+        loop_input.setRange(0, 99)
+        loop_input.setValue(value)
+        loop_input.setToolTip(translations[self.language]['planned_shooting']['loop_tooltip'])
+        return loop_input
     
     def updateTableOptions(self, data_dict):
         self.data_dict = data_dict
@@ -362,6 +535,51 @@ class PlannedShootingDialog(QDialog):
             else:
                 filter_selector.addItem("None")
 
+    def rowCostKeys(self, row):
+        """优化顺序时比较的行参数，滤镜取孔位编号"""
+        camera_name = self.table.cellWidget(row, 0).currentText()
+        cfw = self.data_dict[camera_name]['CFW'][1].get(self.table.cellWidget(row, 7).currentText(), 'None') if self.data_dict[camera_name]['CFW'][0] else 'None'
+        return {
+            "name": camera_name,
+            "readout_mode": self.table.cellWidget(row, 1).currentText(),
+            "depth": self.table.cellWidget(row, 6).currentText(),
+            "CFW": None if cfw == 'None' else int(cfw, 16),
+        }
+
+    def optimizePlan(self):
+        """在分组内重排行，减少滤镜轮移动和读出模式、位深切换，显示预计节省的时间"""
+        if self.scheduler.active:
+            QMessageBox.warning(self, translations[self.language]['planned_shooting']['optimize_plan'], translations[self.language]['planned_shooting']['plan_running'])
+            return
+        rows = [self.rowCostKeys(row) for row in range(self.table.rowCount())]
+        # 同步行位置固定；重排只在同一循环段内进行，循环段的组成不变
+        groups = [(self.table.cellWidget(row, 10).value(), self.table.cellWidget(row, 14).value()) if self.table.cellWidget(row, 10).value() and not self.table.cellWidget(row, 9).isChecked() else 0
+                  for row in range(self.table.rowCount())]
+        slots = {name: len(info['CFW'][1]) for name, info in self.data_dict.items() if info['CFW'][0]}
+        order, before, after = optimize_plan(rows, groups, PlanCostModel(slots=slots))
+        if order == list(range(len(rows))):
+            QMessageBox.information(self, translations[self.language]['planned_shooting']['optimize_plan'], f"{translations[self.language]['planned_shooting']['optimize_no_change']} ({before:.1f}s)")
+            return
+        plan_data = self.collectPlanData()
+        reordered = [dict(plan_data[i]) for i in order]
+        for position, row_data in enumerate(reordered):
+            # 间隔留在原位置，计划的时间节奏不变
+            row_data['interval'] = plan_data[position]['interval']
+        self.applyPlanData(reordered + [plan_data[-1]])
+        QMessageBox.information(self, translations[self.language]['planned_shooting']['optimize_plan'], f"{translations[self.language]['planned_shooting']['optimize_saved']}: {before - after:.1f}s ({before:.1f}s -> {after:.1f}s)")
+
+    def dryRunPlan(self):
+        """按实测耗时模拟执行当前计划，不连接相机，显示每行的时间线和总耗时"""
+        plan_data = self.collectPlanData()
+        slots = {name: len(info['CFW'][1]) for name, info in plan_data[-1].items() if info['CFW'][0]}
+        result = dry_run(plan_rows(plan_data), PlanTimingModel(cost_model=PlanCostModel(slots=slots)))
+        message = QMessageBox(self)
+        message.setWindowTitle(translations[self.language]['planned_shooting']['dry_run'])
+        message.setText(f"{translations[self.language]['planned_shooting']['dry_run_total']}: {QTime(0, 0).addSecs(int(result['total'] + 0.5)).toString('HH:mm:ss')} "
+                        f"({translations[self.language]['planned_shooting']['exposure']} {result['exposure']:.0f}s)")
+        message.setDetailedText(format_timeline(result))
+        message.exec_()
+
     def clearTable(self):
         self.planComboBox.setCurrentText("None")
         self.table.setRowCount(0)
@@ -370,71 +588,126 @@ class PlannedShootingDialog(QDialog):
         reply = QMessageBox.question(self, translations[self.language]['planned_shooting']['confirm_execute'], translations[self.language]['planned_shooting']['confirm_execute_message'], 
                                  QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            if self.current_row != 0 and self.current_row < self.table.rowCount()-1:
-                continue_reply = QMessageBox.question(self, translations[self.language]['planned_shooting']['continue_execute'], translations[self.language]['planned_shooting']['continue_execute_message'], 
+            # 日志中有同一计划未结束的执行时可以继续，已完成的帧不再拍摄
+            progress = self.journal.progress(self.planComboBox.currentText(), self.planSignature())
+            if progress is not None and progress['frames']:
+                done = sum(len(frames) for frames in progress['frames'].values())
+                continue_reply = QMessageBox.question(self, translations[self.language]['planned_shooting']['continue_execute'], f"{translations[self.language]['planned_shooting']['continue_execute_message']} ({translations[self.language]['planned_shooting']['frames_done']}: {done})", 
                                                   QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
                 if continue_reply == QMessageBox.Yes:
-                    for i in range(self.current_row, self.table.rowCount()):
-                        self.table.item(i, 8).setText('')
-                    self.executeRow(self.current_row)
+                    self.executePlan(progress)
                     return
-            self.current_row = 0  # 重置当前行
-            for i in range(self.table.rowCount()):
-                self.table.item(i, 8).setText('')
-            self.executeRow(self.current_row)  # 开始执行当前行
-
-    def executeRow(self, row):
-        if row < self.table.rowCount():
-            time = self.table.cellWidget(row, 2).time()  # 获取当前行的时间
-            countdown_seconds = time.hour() * 3600 + time.minute() * 60 + time.second()
-            
-            self.current_row = row
-            self.timer.start(1000)  # 每秒更新一次
-            self.remaining_time = countdown_seconds  # 设置剩余时间
+            self.executePlan()
+
+    def planSignature(self):
+        return plan_signature(self.collectPlanData()[:-1])
+
+    def rowInterval(self, row):
+        interval = self.table.cellWidget(row, 2).time()
+        return interval.hour() * 3600 + interval.minute() * 60 + interval.second()
+
+    def executePlan(self, progress=None):
+        """按循环段的重复次数展开计划行，按各步骤间隔确定绝对开始时刻；progress 为日志中的执行进度，已完成的步骤跳过"""
+        rows = range(self.table.rowCount())
+        self.steps = expand_steps([self.table.cellWidget(row, 14).value() for row in rows], [self.table.cellWidget(row, 12).value() for row in rows])
+        if progress is None:
+            try:
+                self.journal_run = self.journal.start(self.planComboBox.currentText(), self.planSignature())
+            except OSError:
+                self.journal_run = None  # 日志不可写时照常执行，只是不能继续
+            self.frames_done = {}
+            complete = set()
         else:
-            self.timer.stop()
-            self.current_row = row
-            self.plan_running_signal.emit({'end':True})  # 发送信号
+            self.journal_run = progress['run']
+            self.frames_done = progress['frames']
+            complete = progress['complete']
+        self.failed_steps = set()
+        for row in rows:
+            steps = [step for step, (other, _, _) in enumerate(self.steps) if other == row]
+            executed = bool(steps) and all(step in complete for step in steps)
+            self.table.item(row, 8).setText(translations[self.language]['planned_shooting']['executed'] if executed else '')
+        # 每台相机一条通道，不同相机的行并行执行
+        self.scheduler.start([self.rowInterval(row) for row, _, _ in self.steps],
+                             lanes=[self.table.cellWidget(row, 0).currentText() for row, _, _ in self.steps],
+                             barriers=[self.table.cellWidget(row, 9).isChecked() for row, _, _ in self.steps],
+                             done=complete)
+        self.countdown_timer.start(1000)
+        self.scheduleNext()
+
+    def stepText(self, step, text):
+        """重复执行的行在状态后显示当前是第几次"""
+        _, iteration, repeat = self.steps[step]
+        return f"{text} [{iteration + 1}/{repeat}]" if repeat > 1 else text
+
+    def scheduleNext(self):
+        """派发已到时的步骤，并把定时器设到下一个计划时刻"""
+        self.timer.stop()
+        for step in self.scheduler.due():
+            row, iteration, _ = self.steps[step]
+            self.table.item(row, 8).setText(f"{self.stepText(step, translations[self.language]['planned_shooting']['executing'])} ({translations[self.language]['planned_shooting']['drift']}: {self.scheduler.drift(step):+.3f}s)")
+            row_data = self.collectSingleRowData(row)
+            row_data['step'] = step
+            row_data['iteration'] = iteration
+            row_data['frames_done'] = sorted(self.frames_done.get(step, ()))  # 继续执行时 SDK 跳过这些帧
+            if self.journal_run is not None:
+                row_data['journal'] = {'path': self.journal.file_path, 'run': self.journal_run}
+            self.plan_running_signal.emit(row_data)  # 发送信号
+        if not self.scheduler.active:
+            self.finishPlan()
+            return
+        delay = self.scheduler.time_until_next()
+        if delay is not None:
+            # 剩下的步骤都在等待上一步时由 update_row_state 重新调度
+            self.timer.start(int(delay * 1000))
+        self.updateCountdown()
 
     def updateCountdown(self):
-        if self.remaining_time > 0:
-            self.remaining_time -= 1
-            # 更新表格中的时间
-            self.table.cellWidget(self.current_row, 2).setTime(QTime.fromString(QTime(0, 0).addSecs(self.remaining_time).toString("HH:mm:ss"), "HH:mm:ss"))
-            self.table.item(self.current_row, 8).setText(f'{translations[self.language]["planned_shooting"]["remaining_time"]}: {self.remaining_time}s')  # 更新状态为剩余时间
-        else:
-            self.timer.stop()  # 停止定时器
-            if self.current_row  == 0:
-                self.plan_running_signal.emit(self.collectSingleRowData(self.current_row))  # 发送信号
-                self.table.item(self.current_row, 8).setText(translations[self.language]['planned_shooting']['executing'])  # 更新状态为执行完成
-                self.executeRow(self.current_row+1)
-            elif self.current_row > 0 :
-                status_item = self.table.item(self.current_row-1, 8)  # 获取状态单元格
-                if status_item is None:  # 如果状态单元格不存在，创建一个新的 QTableWidgetItem
-                    status_item = QTableWidgetItem('')
-                    self.table.setItem(self.current_row-1, 8, status_item)
-                if status_item.text() == translations[self.language]['planned_shooting']['executed']:
-                    self.table.item(self.current_row, 8).setText(translations[self.language]['planned_shooting']['executing'])  # 更新状态为执行完成
-                    self.plan_running_signal.emit(self.collectSingleRowData(self.current_row))  # 发送信号
-                    self.executeRow(self.current_row+1)
-                else:
-                    self.table.item(self.current_row, 8).setText(translations[self.language]['planned_shooting']['waiting'])  # 更新状态为等待执行
-                    self.timer.start(1000)
-                    return
-            
-                
+        """只刷新状态显示，不参与计时；一行有多个待执行步骤时显示最近的一个"""
+        shown = {self.steps[step][0] for step in self.scheduler.running_rows}
+        for step, remaining in self.scheduler.pending():
+            row = self.steps[step][0]
+            if row in shown:
+                continue
+            shown.add(row)
+            if remaining > 0:
+                self.table.item(row, 8).setText(f'{self.stepText(step, translations[self.language]["planned_shooting"]["remaining_time"])}: {int(remaining + 0.999)}s')
+            else:
+                self.table.item(row, 8).setText(self.stepText(step, translations[self.language]['planned_shooting']['waiting']))  # 同一相机的上一行或同步前的行尚未完成
 
+    def finishPlan(self):
+        self.timer.stop()
+        self.countdown_timer.stop()
+        self.plan_running_signal.emit({'end':True})  # 发送信号
+        if self.journal_run is not None and not self.failed_steps:
+            try:
+                self.journal.end(self.journal_run)
+            except OSError:
+                pass
+        report = self.scheduler.report()
+        try:
+            # 保存最近一次计划的开始时间记录，便于统计整夜的漂移
+            with open("plan_schedule.json", "w", encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=4)
+        except OSError:
+            pass
+        self.plan_schedule_signal.emit(report)
 
     def cancelPlan(self):
         self.timer.stop()  # 停止定时器
+        self.countdown_timer.stop()
+        self.scheduler.cancel()  # 日志保留已完成的帧，再次执行时可以继续
         self.plan_running_signal.emit({'end':True})  # 发送信号
 
-        
-    def update_row_state(self):
-        if self.current_row > 0:
-            self.table.item(self.current_row-1, 8).setText(translations[self.language]['planned_shooting']['executed'])  # 更新状态为执行完成
-        else:
-            self.table.item(self.current_row, 8).setText(translations[self.language]['planned_shooting']['executed'])  # 更新状态为执行完成
-        if self.current_row >= self.table.rowCount():
-            self.current_row = 0
-
+    def update_row_state(self, step=None):
+        step = self.scheduler.finished(step)
+        if step is not None:
+            self.table.item(self.steps[step][0], 8).setText(self.stepText(step, translations[self.language]['planned_shooting']['executed']))  # 更新状态为执行完成
+            self.scheduleNext()
+
+    def update_row_failed(self, step=None):
+        """SDK 放弃了该步骤（滤镜轮、曝光或读出失败等），结束该步骤，同一相机的后续行继续执行"""
+        step = self.scheduler.finished(step)
+        if step is not None:
+            self.failed_steps.add(step)
+            self.table.item(self.steps[step][0], 8).setText(self.stepText(step, translations[self.language]['planned_shooting']['execution_failed']))
+            self.scheduleNext()
@@ -5,12 +5,17 @@ import ctypes
 from ctypes import *
 import queue
 import time
-from multiprocessing import Array
+from multiprocessing import Array, shared_memory
+from collections import deque
 from threading import Lock
 import psutil
 from .sharedMemoryManager import SharedMemoryManager
 from .language import translations
+from .qhyccd_dll import QHYCCD_SUCCESS
 from .save_video import SaveThread
+from .realtime import RealtimeMode, interval_stats
+from .status_channel import (StatusChannel, RECORD_PROGRESS, MEMORY_WARNING, RECORD_TIME_MODE_SUCCESS, RECORD_FRAME_MODE_SUCCESS,
+                             PREVIEW_PAUSE, PREVIEW_UPDATE_PARAMETERS, START_SAVE_VIDEO, STOP_SAVE_VIDEO)
 
 class PreviewThread(threading.Thread):  
     def __init__(self, camhandle, qhyccddll, image_w,image_h, image_c, image_b,shm1_name,shm2_name,output_buffer, language='en'):
@@ -28,6 +33,7 @@ class PreviewThread(threading.Thread):
         self.shm2_name = shm2_name
         self.shm_status = True
         self.output_buffer = output_buffer
+        self.status = StatusChannel(output_buffer)  # 逐帧的进度和提示经状态通道限流发送
         self.lock = Lock()
         self.language = language
         self.paused = False  # 新增一个属性来控制是否暂停
@@ -47,11 +53,59 @@ class PreviewThread(threading.Thread):
         self.record_start_time = 0
         self.record_frame_count = 0
         self.progress_bar_value = 0
-        
+        self.realtime = None  # 实时模式设置，启动前设置才生效
+        self.shm_ring = None  # 实时模式下常驻映射并锁定的双缓冲
+        self.frame_interval = deque(maxlen=1000)  # 预览帧间隔（毫秒）
+        self.last_frame_time = None
+
+    def set_realtime(self, config):
+        """config 为 RealtimeMode 的参数字典，None 为关闭"""
+        self.realtime = RealtimeMode(**config) if config else None
+
     def run(self):
+        if self.realtime is None:
+            self.capture_loop()
+            return
+        report = self.realtime.apply()
+        try:
+            # 双缓冲只映射一次，锁定在内存中
+            self.shm_ring = (shared_memory.SharedMemory(name=self.shm1_name), shared_memory.SharedMemory(name=self.shm2_name))
+            self.realtime.lock([shm.buf for shm in self.shm_ring])
+        except (FileNotFoundError, OSError) as e:
+            report['errors'].append(f"shm: {e}")
+            self.shm_ring = None
+        self.output_buffer.put({"order":"realtimeMode_success","data":report})
+        try:
+            self.capture_loop()
+        finally:
+            self.realtime.restore()
+            if self.shm_ring is not None:
+                for shm in self.shm_ring:
+                    shm.close()
+                self.shm_ring = None
+
+    def write_shared(self, img):
+        if self.shm_ring is not None:
+            shm = self.shm_ring[0] if self.shm_status else self.shm_ring[1]
+            with self.lock:
+                shm.buf[:self.image_size] = img.tobytes()
+            return
+        with SharedMemoryManager(name=self.shm1_name) as shm1, SharedMemoryManager(name=self.shm2_name) as shm2:
+            shm = shm1 if self.shm_status else shm2
+            with self.lock:
+                shm.buf[:self.image_size] = img.tobytes()
+
+    def timing_stats(self):
+        """预览帧间隔分布（毫秒）和实时模式的生效情况"""
+        return {'count': len(self.frame_interval), 'frame_interval': interval_stats(self.frame_interval),
+                'realtime': self.realtime.report if self.realtime is not None else None}
+
+    def capture_loop(self):
         while self.running:
             if not self.paused:  # 只有在不暂停的情况下才捕获帧
                 img,gps_data = self.capture_frame()
+                if self.realtime is not None:
+                    self.realtime.collect(idle=img is None)  # 优先在等待下一帧的空闲时刻回收
                 if img is not None:
                     if not self.burst_mode_state:
                         self.frame_times.append(time.time())
@@ -70,7 +124,7 @@ class PreviewThread(threading.Thread):
                             self.memory_state = False
                             
                         if not self.memory_state and self.save_thread is not None and self.save_thread_running and self.buffer_queue is not None and not self.memory_warning:
-                            self.output_buffer.put({"order":"tip","data":translations[self.language]['preview_thread']['memory_warning']})
+                            self.status.emit(MEMORY_WARNING, force=True)
                             self.memory_warning = True
                         if self.save_thread is not None and self.save_thread_running and self.buffer_queue is not None and self.memory_state:
                             self.buffer_queue.put(img)
@@ -79,58 +133,60 @@ class PreviewThread(threading.Thread):
                                     self.record_start_time = time.time()
                                 if time.time() - self.record_start_time >= self.record_time:
                                     self.stop_save_video()
-                                    self.output_buffer.put({"order":"tip","data":translations[self.language]['preview_thread']['record_time_mode_success']})
+                                    self.status.emit(RECORD_TIME_MODE_SUCCESS, force=True)
                                     self.output_buffer.put({"order":"record_end","data":''})
                                 else:
-                                    self.progress_bar_value = int((time.time() - self.record_start_time) / self.record_time * 100)
-                                    self.output_buffer.put({"order":"progress_bar_value","data":self.progress_bar_value})
+                                    self.update_progress(int((time.time() - self.record_start_time) / self.record_time * 100))
                             elif self.record_frame_mode:
                                 self.record_frame_count += 1
                                 if self.record_frame_count >= self.total_frames:
                                     self.stop_save_video()
-                                    self.output_buffer.put({"order":"tip","data":translations[self.language]['preview_thread']['record_frame_mode_success']})
+                                    self.status.emit(RECORD_FRAME_MODE_SUCCESS, force=True)
                                     self.output_buffer.put({"order":"record_end","data":''})
                                 else:
-                                    self.progress_bar_value = int(self.record_frame_count / self.total_frames * 100)
-                                    self.output_buffer.put({"order":"progress_bar_value","data":self.progress_bar_value})
+                                    self.update_progress(int(self.record_frame_count / self.total_frames * 100))
                         self.frame_captured = self.fps
-                        with SharedMemoryManager(name=self.shm1_name) as shm1, SharedMemoryManager(name=self.shm2_name) as shm2:
-                            shm = shm1 if self.shm_status else shm2
-                            with self.lock:
-                                shm.buf[:self.image_size] = img.tobytes()
+                        self.write_shared(img)
+                        now = time.perf_counter()
+                        if self.last_frame_time is not None:
+                            self.frame_interval.append((now - self.last_frame_time) * 1000)
+                        self.last_frame_time = now
                         self.output_buffer.put({"order":"preview_frame","data":{"fps":self.fps,"shm_status":self.shm_status,"image_size":self.image_size,"shape":(self.image_h,self.image_w,self.image_c,self.image_b),"gps_data":gps_data}})
                         self.shm_status = not self.shm_status
                     else:
-                        with SharedMemoryManager(name=self.shm1_name) as shm1, SharedMemoryManager(name=self.shm2_name) as shm2:
-                            shm = shm1 if self.shm_status else shm2
-                            with self.lock:
-                                shm.buf[:self.image_size] = img.tobytes()
-                            self.output_buffer.put({"order":"burst_mode_frame","data":{"shm_status":self.shm_status,"image_size":self.image_size,"shape":(self.image_h,self.image_w,self.image_c,self.image_b),"gps_data":gps_data}})
-                            self.shm_status = not self.shm_status
+                        self.write_shared(img)
+                        self.output_buffer.put({"order":"burst_mode_frame","data":{"shm_status":self.shm_status,"image_size":self.image_size,"shape":(self.image_h,self.image_w,self.image_c,self.image_b),"gps_data":gps_data}})
+                        self.shm_status = not self.shm_status
             else:
                 time.sleep(0.1)
+
+    def update_progress(self, value):
+        if value != self.progress_bar_value:
+            self.progress_bar_value = value
+            self.status.emit(RECORD_PROGRESS, value)
  
     def set_pause(self,pause):
         if pause:
             ret = self.qhyccddll.StopQHYCCDLive(self.camhandle)
-            if ret != 0:
+            if ret != QHYCCD_SUCCESS:
                 self.output_buffer.put({"order":"error","data":translations[self.language]['preview_thread']['set_pause_failed']})
                 return
             self.update_fps()
             self.paused = pause
         else:
             ret = self.qhyccddll.BeginQHYCCDLive(self.camhandle)
-            if ret != 0:
+            if ret != QHYCCD_SUCCESS:
                 self.output_buffer.put({"order":"error","data":translations[self.language]['preview_thread']['set_pause_failed']})
                 return
             self.paused = pause
-        self.output_buffer.put({"order":"tip","data":translations[self.language]['preview_thread']['set_pause_success']})
+        self.status.emit(PREVIEW_PAUSE)
 
     def update_GPS_control(self,data):
         self.GPS_control = data
 
     def update_fps(self):
         self.frame_times.clear()
+        self.last_frame_time = None  # 暂停前后的间隔不计入抖动统计
 
     def capture_frame(self):
         try:
@@ -151,7 +207,7 @@ class PreviewThread(threading.Thread):
                 # 获取图像帧
                 ret = self.qhyccddll.GetQHYCCDLiveFrame(self.camhandle, byref(w), byref(h), byref(b), byref(c), temp_buffer)
                 # 检查返回值
-                if ret == -1 or c.value != self.image_c:
+                if ret != QHYCCD_SUCCESS or c.value != self.image_c:
                     time.sleep(0.001)  # 等待一小段时间
                     return None, None  
                 # 解析GPS数据
@@ -196,6 +252,7 @@ class PreviewThread(threading.Thread):
         self.output_buffer.put({"order":"stop_preview_success","data":''})
         self.update_fps()
         self.join()  # 等待线程结束
+        self.status.flush()
 
     def update_image_parameters(self, image_w, image_h, image_c, image_b):
         """更新图像参数的方法"""
@@ -207,7 +264,7 @@ class PreviewThread(threading.Thread):
         self.output_buffer.put({"order":"updateSharedImageData_success","data":(image_w,image_h,image_c,image_b)})
         if self.paused:
             self.set_pause(False)
-            self.output_buffer.put({"order":"tip","data":f"{translations[self.language]['preview_thread']['preview_update_parameters_success']}: {image_w}x{image_h}x{image_c}x{image_b}"})
+            self.status.emit(PREVIEW_UPDATE_PARAMETERS, f"{image_w}x{image_h}x{image_c}x{image_b}")
 
     def start_burst_mode(self,data):
         if not self.burst_mode_state:
@@ -215,19 +272,19 @@ class PreviewThread(threading.Thread):
         state,min_value,max_value = data
         
         ret = self.qhyccddll.SetQHYCCDBurstModeStartEnd(self.camhandle,min_value,max_value)
-        if ret != 0:
+        if ret != QHYCCD_SUCCESS:
             self.output_buffer.put({"order":"error","data":f"{translations[self.language]['preview_thread']['set_burst_mode_start_end_failed']}: {state}"})
             return
         self.output_buffer.put({"order":"tip","data":f"{translations[self.language]['preview_thread']['set_burst_mode_start_end_success']}: {state}"})
         
-        ret = self.qhyccddll.SetQHYCCDBurstIDLE(self.camhandle,True)
-        if ret != 0:
+        ret = self.qhyccddll.SetQHYCCDBurstIDLE(self.camhandle)
+        if ret != QHYCCD_SUCCESS:
             self.output_buffer.put({"order":"error","data":f"{translations[self.language]['preview_thread']['set_burst_mode_idle_failed']}: {ret}"})
             return
         self.output_buffer.put({"order":"tip","data":f"{translations[self.language]['preview_thread']['set_burst_mode_idle_success']}: {ret}"})
         time.sleep(0.2)
         ret = self.qhyccddll.ReleaseQHYCCDBurstIDLE(self.camhandle)
-        if ret != 0:
+        if ret != QHYCCD_SUCCESS:
             self.output_buffer.put({"order":"error","data":f"{translations[self.language]['preview_thread']['release_burst_mode_idle_failed']}: {ret}"})
             return
         self.output_buffer.put({"order":"tip","data":f"{translations[self.language]['preview_thread']['release_burst_mode_idle_success']}: {ret}"})
@@ -236,19 +293,19 @@ class PreviewThread(threading.Thread):
         state,min_value,max_value = data
         if state:
             ret = self.qhyccddll.SetQHYCCDBurstModeStartEnd(self.camhandle,min_value,max_value)
-            if ret != 0:
+            if ret != QHYCCD_SUCCESS:
                 self.output_buffer.put({"order":"error","data":f"{translations[self.language]['preview_thread']['set_burst_mode_start_end_failed']}: {state}"})
                 return
             self.output_buffer.put({"order":"tip","data":f"{translations[self.language]['preview_thread']['set_burst_mode_start_end_success']}: {state}"})
             
             ret = self.qhyccddll.SetQHYCCDBurstModePatchNumber(self.camhandle,32001)
-            if ret != 0:
+            if ret != QHYCCD_SUCCESS:
                 self.output_buffer.put({"order":"error","data":f"{translations[self.language]['preview_thread']['set_burst_mode_patch_number_failed']}: {state}"})
                 return
             self.output_buffer.put({"order":"tip","data":f"{translations[self.language]['preview_thread']['set_burst_mode_patch_number_success']}: {state}"})
             
             ret = self.qhyccddll.EnableQHYCCDBurstMode(self.camhandle,True)
-            if ret != 0:
+            if ret != QHYCCD_SUCCESS:
                 self.output_buffer.put({"order":"error","data":f"{translations[self.language]['preview_thread']['set_burst_mode_failed']}: {state}"})
                 return
             self.output_buffer.put({"order":"tip","data":f"{translations[self.language]['preview_thread']['set_burst_mode_success']}: {state}"})
@@ -256,7 +313,7 @@ class PreviewThread(threading.Thread):
         else:
             self.burst_mode_state = False
             ret = self.qhyccddll.EnableQHYCCDBurstMode(self.camhandle,False)
-            if ret != 0:
+            if ret != QHYCCD_SUCCESS:
                 self.output_buffer.put({"order":"error","data":f"{translations[self.language]['preview_thread']['set_burst_mode_failed']}: {state}"})
                 return
             self.output_buffer.put({"order":"tip","data":f"{translations[self.language]['preview_thread']['set_burst_mode_success']}: {state}"})
@@ -271,7 +328,7 @@ class PreviewThread(threading.Thread):
         self.save_thread = SaveThread(self.output_buffer,self.buffer_queue, data['path'], data['file_name'], data['save_format'], data['save_mode'], self.fps,self.language,data['jpeg_quality'],data['tiff_compression'],data['fits_header'])
         self.save_thread_running = True
         self.save_thread.start()
-        self.output_buffer.put({"order":"tip","data":translations[self.language]['preview_thread']['start_save_video_success']})
+        self.status.emit(START_SAVE_VIDEO, force=True)
         
     def stop_save_video(self):
         if self.save_thread is not None:
@@ -290,6 +347,7 @@ class PreviewThread(threading.Thread):
         self.record_frame_count = 0
         self.progress_bar_value = 0
         self.memory_warning = False
+        self.status.flush()
         self.output_buffer.put({"order":"record_end","data":''})
-        self.output_buffer.put({"order":"tip","data":translations[self.language]['preview_thread']['stop_save_video_success']})
+        self.status.emit(STOP_SAVE_VIDEO, force=True)
     
\ No newline at end of file
@@ -16,10 +16,11 @@ import pickle
 import csv
 from threading import Lock
 from astropy.stats import sigma_clipped_stats
-import multiprocessing
 from multiprocessing import shared_memory
 from datetime import datetime, timedelta
 import pytz
+from collections import deque
+import pyqtgraph as pg
 
 # Import custom modules
 from .save_video import SaveThread
@@ -32,8 +33,13 @@ from .auto_exposure import AutoExposureDialog
 from .auto_white_balance import AutoWhiteBalanceDialog
 from .astrometry import AstrometrySolver, AstrometryDialog
 from .planned_shooting import PlannedShootingDialog
-from .qhyccd_sdk import QHYCCDSDK
+from .sdk_pool import SDKWorkerPool
+from .sdk_supervisor import ReplayQueue, SDKSupervisor
+from .sdk_thread import create_queue
+from .frame_slot import FrameOverwrittenError, FrameSlotReader
+from .telemetry import TelemetryRing
 from .accept_sdk_data import AcceptSDKData
+from .status_channel import RECORD_PROGRESS, format_status
 
 class CameraControlWidget(QWidget):
     def __init__(self, napari_viewer):
@@ -70,8 +76,25 @@ class CameraControlWidget(QWidget):
 
     def release_qhyccd_resource(self):
         self.sdk_input_queue.put({"order":"stop", "data":''})
+        if self.sdk_pool is not None:
+            self.sdk_pool.stop()
+        self.frame_slot_reader.close()
+        self.close_telemetry_ring()
         self.memory_monitor_thread.stop()
     
+    def on_status(self, data, camera_id=None):
+        # 状态事件只在显示时翻译
+        if data['code'] == RECORD_PROGRESS:
+            self.progress_bar.setValue(data['args'][0])
+            return
+        text = format_status(self.language, data)
+        self.append_text(text if camera_id is None else f"[{camera_id}] {text}")
+
+    def on_sdk_recovered(self, data):
+        # 崩溃时正在进行的操作不会再有回复，恢复可操作状态
+        self.CFW_filter_selector.setEnabled(True)
+        self.append_text(f"{translations[self.language]['qhyccd_sdk']['sdk_recovered']}: {data['reason']}, {data['recovery_time']:.2f}s")
+
     def stop_qhyccd_process_success(self):
         self.qhyccd_process = None
         self.preview_state = False
@@ -88,6 +111,15 @@ class CameraControlWidget(QWidget):
         
         self.sdk_input_queue = None
         self.sdk_output_queue = None
+        # 计划拍摄中非当前相机的行交给各相机独占的 SDK 进程执行
+        self.sdk_pool = None
+        # 单帧和计划拍摄结果通过 SDK 进程的共享内存槽接收
+        self.frame_slot_reader = FrameSlotReader()
+        # SDK 遥测线程的环形缓冲区，温度、湿度和制冷功率直接从中读取，不再定时发命令查询
+        self.telemetry_ring = None
+        self.telemetry_history_seconds = 1800
+        # 曝光进度推送频率（次/秒）
+        self.exposure_progress_rate = 4
         
         # 初始化相机状态
         self.init_state = False
@@ -156,6 +188,7 @@ class CameraControlWidget(QWidget):
         
         self.planned_shooting_dialog = PlannedShootingDialog(self,language=self.language) # 创建计划拍摄对话框
         self.planned_shooting_dialog.plan_running_signal.connect(self.on_plan_running)
+        self.planned_shooting_dialog.plan_schedule_signal.connect(self.on_plan_schedule_report)
         
         self.temperature_update_timer = QTimer(self)
         self.temperature_update_timer.timeout.connect(self.update_current_temperature)
@@ -209,11 +242,19 @@ class CameraControlWidget(QWidget):
         
     def init_sdk(self):
         if self.sdk_input_queue is None:
-            self.sdk_input_queue = multiprocessing.Queue()
+            # 记录下发的相机配置，SDK 进程崩溃或卡死重启后重放
+            self.sdk_input_queue = ReplayQueue(create_queue(self.sdk_backend))
         if self.sdk_output_queue is None:
-            self.sdk_output_queue = multiprocessing.Queue()
-        self.qhyccd_process = QHYCCDSDK(self.sdk_input_queue, self.sdk_output_queue,self.language)
+            self.sdk_output_queue = create_queue(self.sdk_backend)
+        self.qhyccd_process = SDKSupervisor(self.sdk_input_queue, self.sdk_output_queue, self.language, backend=self.sdk_backend)
         self.qhyccd_process.start()
+        if self.sdk_backend != 'process':
+            self.append_text(f"{translations[self.language]['qhyccd_sdk']['sdk_backend']}: {self.sdk_backend}")
+        # 曝光进度由 SDK 进程推送，不再逐次查询剩余曝光时间
+        self.sdk_input_queue.put({'order':'set_exposure_progress_rate', 'data':self.exposure_progress_rate})
+        if self.realtime_mode:
+            self.sdk_input_queue.put({'order':'set_realtime_mode', 'data':self.realtime_mode})
+        self.sdk_pool = SDKWorkerPool(self.sdk_output_queue, self.language, progress_rate=self.exposure_progress_rate, backend=self.sdk_backend)
         self.accept_sdk_data = AcceptSDKData(self.sdk_output_queue)
         self.accept_sdk_data.data_signal.connect(self.on_sdk_data_received)
         self.accept_sdk_data.start()
@@ -256,6 +297,13 @@ class CameraControlWidget(QWidget):
         self.state_label.setStyleSheet("""
             QScrollBar:vertical { width: 2px; }
         """)  # 设置垂直滚动条的宽度为2像素
+        # 日志区只保留最近的行，新消息先缓存，由定时器批量写入
+        self.log_max_lines = 1000
+        self.state_label.document().setMaximumBlockCount(self.log_max_lines)
+        self.pending_log = deque(maxlen=self.log_max_lines)
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.flush_log)
+        self.log_timer.start(200)
         
         # 将控件添加到水平布局中
         h_layout.addWidget(QLabel(translations[self.language]['qhyccd_capture']['status']))
@@ -528,11 +576,17 @@ class CameraControlWidget(QWidget):
         control_layout.addRow(QLabel(translations[self.language]['qhyccd_capture']['offset']), self.offset)
 
         # USB 传输设置
+        usb_traffic_layout = QHBoxLayout()
         self.usb_traffic = QSpinBox()
         # self.usb_traffic.setSuffix(' MB/s')
         self.usb_traffic.setRange(1, 500)  # 设置 USB 输范围
         self.usb_traffic.valueChanged.connect(self.update_usb_traffic)
-        control_layout.addRow(QLabel(translations[self.language]['qhyccd_capture']['usb_traffic']), self.usb_traffic)
+        usb_traffic_layout.addWidget(self.usb_traffic)
+        self.auto_tune_usb_button = QPushButton(translations[self.language]['qhyccd_capture']['auto_tune_usb'])
+        self.auto_tune_usb_button.setToolTip(translations[self.language]['qhyccd_capture']['auto_tune_usb_tooltip'])
+        self.auto_tune_usb_button.clicked.connect(self.auto_tune_usb)
+        usb_traffic_layout.addWidget(self.auto_tune_usb_button)
+        control_layout.addRow(QLabel(translations[self.language]['qhyccd_capture']['usb_traffic']), usb_traffic_layout)
         
         # 添加图像显示方式选择框
         self.display_mode_selector = QComboBox()
@@ -827,10 +881,21 @@ class CameraControlWidget(QWidget):
         grid_layout = QGridLayout()
         self.current_temperature_label = QLabel(translations[self.language]['qhyccd_capture']['temperature'])
         self.current_humidity_label = QLabel(translations[self.language]['qhyccd_capture']['humidity'])
+        self.current_cooler_power_label = QLabel(translations[self.language]['qhyccd_capture']['cooler_power'])
         grid_layout.addWidget(self.current_temperature_label,0,0)
         grid_layout.addWidget(self.current_humidity_label,0,1)
+        grid_layout.addWidget(self.current_cooler_power_label,1,0)
         temperature_layout.addRow(grid_layout)
         
+        # 温度历史曲线，横轴为距当前的秒数
+        self.temperature_plot = pg.PlotWidget()
+        self.temperature_plot.setBackground('k')
+        self.temperature_plot.setFixedHeight(120)
+        self.temperature_plot.setToolTip(translations[self.language]['qhyccd_capture']['temperature_history_tooltip'])
+        self.temperature_curve = self.temperature_plot.plot(pen=pg.mkPen('r', width=2))
+        self.setpoint_curve = self.temperature_plot.plot(pen=pg.mkPen('w', width=1, style=Qt.DashLine))
+        temperature_layout.addRow(self.temperature_plot)
+        
         self.temperature_control_box.setLayout(temperature_layout)
         self.scroll_layout.addWidget(self.temperature_control_box)
         
@@ -922,26 +987,30 @@ class CameraControlWidget(QWidget):
         self.show_GPS_control_checkbox.setEnabled(False)
     
     def append_text(self, text, is_error=False):
-        try:
-            self.state_label.moveCursor(QTextCursor.End)
-            # 创建一个 QTextCursor 对象
-            cursor = self.state_label.textCursor()
-            # 向 QTextEdit 添加文本
-            now_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            # 设置文本颜色
-            if is_error:
-                cursor.insertHtml(f'<br><span style="color:red;">{text}</span>')  # 红色文本，使用 <br> 作为 HTML 中的换行
-                print(f"\033[91m{now_time}: {text}\033[0m")  # 控制台输出红色文本
-            else:
-                cursor.insertHtml(f"<br>{text}")  # 默认颜色文本，使用 <br> 作为 HTML 中的换行
-                print(f"{now_time}: {text}")  # 控制台输出默认颜色文本
+        now_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # 设置文本颜色
+        if is_error:
+            self.pending_log.append(f'<span style="color:red;">{text}</span>')  # 红色文本
+            print(f"\033[91m{now_time}: {text}\033[0m")  # 控制台输出红色文本
+        else:
+            self.pending_log.append(text)
+            print(f"{now_time}: {text}")  # 控制台输出默认颜色文本
 
+    def flush_log(self):
+        """把缓存的日志一次写入日志区，每条一段，超过 log_max_lines 的旧段落由文档自动删除"""
+        if not self.pending_log:
+            return
+        try:
+            self.state_label.setUpdatesEnabled(False)
+            while self.pending_log:
+                self.state_label.append(self.pending_log.popleft())
             # 自动滚动到底部
             self.state_label.moveCursor(QTextCursor.End)
             self.state_label.moveCursor(QTextCursor.StartOfLine)  # 滚动到最左边
         except Exception as e:
-            self.append_text(f"{translations[self.language]['debug']['append_text_failed']}: {e}", is_error=True)
+            print(f"{translations[self.language]['debug']['append_text_failed']}: {e}")
+        finally:
+            self.state_label.setUpdatesEnabled(True)
 
     def show_settings_dialog(self):
         try:
@@ -950,12 +1019,18 @@ class CameraControlWidget(QWidget):
             self.append_text(f"{translations[self.language]['debug']['show_settings_dialog_failed']}: {e}")
         
     def load_settings(self):
+        self.realtime_mode = None
+        self.sdk_backend = 'process'
         try:
             if os.path.exists(self.settings_file):
                 with open(self.settings_file, 'r') as f:
                     settings = json.load(f)
                     self.qhyccd_path = settings.get("qhyccd_path", "")
                     self.language = settings.get("language", "en")
+                    # 预览实时模式，如 {"cpus": [2, 3], "priority": 50}，不设置为普通模式
+                    self.realtime_mode = settings.get("realtime_mode")
+                    # "thread" 在本进程内运行 SDK，延迟更低，但 SDK 崩溃会导致整个程序退出
+                    self.sdk_backend = settings.get("sdk_backend", "process")
             else:
                 self.qhyccd_path = ""
                 self.language = "en"  # 默认语言
@@ -980,7 +1055,9 @@ class CameraControlWidget(QWidget):
                 self.memory_progress_bar.setStyleSheet(f"QProgressBar::chunk {{ background-color: rgb(255, {255 - red_value}, 0); }}")
     
     def on_sdk_data_received(self, data):
-        if data['order'] == 'init_qhyccd_resource_success':
+        if 'camera_id' in data:
+            self.on_worker_data_received(data)
+        elif data['order'] == 'init_qhyccd_resource_success':
             self.init_qhyccdResource_success(data['data'])
         elif data['order'] == 'readCameraName_success':
             self.read_camera_name_success(data['data'])
@@ -1034,6 +1111,12 @@ class CameraControlWidget(QWidget):
             self.update_exposure_time_success(data['data'])
         elif data['order'] == 'setUsbTraffic_success':
             self.update_usb_traffic_success(data['data'])
+        elif data['order'] == 'usb_tune_step':
+            self.on_usb_tune_step(data['data'])
+        elif data['order'] == 'autoTuneUSB_success':
+            self.on_auto_tune_usb_success(data['data'])
+        elif data['order'] == 'autoTuneUSB_failed':
+            self.auto_tune_usb_button.setEnabled(True)
         elif data['order'] == 'error':
             self.append_text(data['data'], is_error=True)
         elif data['order'] == 'start_preview_success':
@@ -1042,8 +1125,12 @@ class CameraControlWidget(QWidget):
             self.data_received(data['data'])
         elif data['order'] == 'tip':
             self.append_text(data['data'])
+        elif data['order'] == 'status':
+            self.on_status(data['data'])
         elif data['order'] == 'singleCapture_success':
             self.on_capture_finished(data['data'])
+        elif data['order'] == 'exposure_progress':
+            self.on_exposure_progress(data['data'])
         elif data['order'] == 'setDepth_success':
             self.on_set_depth_success(data['data'])
         elif data['order'] == 'stop_preview_success':
@@ -1054,12 +1141,26 @@ class CameraControlWidget(QWidget):
             self.update_image_buffer_size_success(data['data'])
         elif data['order'] == 'getTemperature_success':
             self.get_temperature_success(data['data'])
+        elif data['order'] == 'telemetry_ring':
+            self.on_telemetry_ring(data['data'])
         elif data['order'] == 'stop_success':
             self.stop_qhyccd_process_success()
+        elif data['order'] == 'realtimeMode_success':
+            self.append_text(f"{translations[self.language]['qhyccd_sdk']['realtime_mode']}: {data['data']}", bool(data['data']['errors']))
+        elif data['order'] == 'sdk_recovered':
+            self.on_sdk_recovered(data['data'])
         elif data['order'] == 'runPlan_success':
             self.on_plan_success(data['data'])
+        elif data['order'] == 'runPlan_frame':
+            self.on_plan_frame(data['data'])
+        elif data['order'] == 'runPlan_failed':
+            self.planned_shooting_dialog.update_row_failed(data['data']['plan_row'])
+        elif data['order'] == 'planFrame_saved':
+            self.on_plan_frame_saved(data['data'])
         elif data['order'] == 'setCFWFilter_success':
             self.on_set_CFW_filter_success(data['data'])
+        elif data['order'] == 'setCFWFilter_failed':
+            self.on_set_CFW_filter_success(data['data'])
         elif data['order'] == 'burst_mode_frame':
             self.on_burst_mode_frame(data['data'])
         elif data['order'] == 'stopExternalTrigger_success':
@@ -1072,8 +1173,6 @@ class CameraControlWidget(QWidget):
             self.stop_recording_success(data['data'])
         elif data['order'] == 'save_end':
             self.on_save_thread_finished()
-        elif data['order'] == 'progress_bar_value':
-            self.progress_bar.setValue(data['data'])
            
     def init_qhyccdResource(self,file_path=None):
         if self.sdk_input_queue is None:
@@ -1316,6 +1415,18 @@ class CameraControlWidget(QWidget):
         if self.sdk_input_queue is not None:
             self.sdk_input_queue.put({'order':'get_planned_shooting_data', 'data':''})
                
+    def on_exposure_progress(self, data, camera_id=None):
+        if data['state'] == 'done':
+            return
+        if data['source'] == 'single' and not self.capture_in_progress:
+            return
+        text = f"{translations[self.language]['qhyccd_capture']['capturing']} {data['elapsed']:.1f}/{data['exposure']:.1f}s"
+        if data['count']:
+            text += f" [{data['index'] + 1}/{data['count']}]"
+        if camera_id is not None:
+            text += f" ({camera_id})"
+        self.capture_status_label.setText(text)
+
     def end_capture(self):
         if self.capture_status_label.text().startswith(translations[self.language]["qhyccd_capture"]["capturing"]):
             self.capture_status_label.setText(translations[self.language]["qhyccd_capture"]["capture_complete"])
@@ -1604,7 +1715,7 @@ class CameraControlWidget(QWidget):
             self.toggle_temperature_control_box()
             self.show_temperature_control_checkbox.setEnabled(True)
             self.update_current_temperature()
-            self.temperature_update_timer.start(5000)  # 每5秒更新一次温度
+            self.temperature_update_timer.start(1000)  # 每秒从遥测缓冲区刷新一次温度
         else:
             self.temperature_control_box.setVisible(False)
             self.show_temperature_control_checkbox.hide()
@@ -1618,7 +1729,7 @@ class CameraControlWidget(QWidget):
     def update_camera_humidity_success(self,has_humidity_control):
         self.has_humidity_control = has_humidity_control
         if self.has_humidity_control:
-            self.humidity_update_timer.start(5000)  # 每5秒更新一次湿度
+            self.humidity_update_timer.start(1000)  # 每秒从遥测缓冲区刷新一次湿度
             self.current_humidity_label.setVisible(True)
         else:
             self.humidity_update_timer.stop()
@@ -2040,10 +2151,10 @@ class CameraControlWidget(QWidget):
             self.sdk_input_queue.put({'order':'singleCapture', 'data':(self.image_w, self.image_h, self.image_c,self.camera_bit,)})
             
     def on_capture_finished(self, data):
-        imgdata_np = data['img']
         gps_data = data['gps_data']
         if not self.capture_in_progress :
             return
+        imgdata_np = self.frame_slot_reader.read(data)
 
         if self.bayer_conversion != "None" and imgdata_np.ndim == 2:
             imgdata_np = self.convert_bayer(imgdata_np, self.bayer_conversion)
@@ -2212,6 +2323,29 @@ class CameraControlWidget(QWidget):
     def update_usb_traffic_success(self,data):
         if self.camera_mode == translations[self.language]["qhyccd_capture"]["continuous_mode"]:
             self.sdk_input_queue.put({'order':'clear_fps_data', 'data':''})
+
+    def auto_tune_usb(self):
+        if self.sdk_input_queue is None or not self.camera_state:
+            return
+        if self.camera_mode != translations[self.language]["qhyccd_capture"]["continuous_mode"]:
+            self.append_text(translations[self.language]['qhyccd_sdk']['usb_tune_need_live'], True)
+            return
+        if self.preview_state:
+            self.append_text(translations[self.language]['qhyccd_sdk']['usb_tune_busy'], True)
+            return
+        # 调优期间相机被调优线程占用，结束后再允许操作
+        self.auto_tune_usb_button.setEnabled(False)
+        self.sdk_input_queue.put({'order':'auto_tune_usb', 'data':{}})
+
+    def on_usb_tune_step(self, data):
+        self.append_text(f"{translations[self.language]['qhyccd_capture']['usb_tune_step']} {data['traffic']:g}: {data['fps']:.2f} fps, "
+                         f"drops {data['drops']}, failures {data['failures']}", data['drops'] > 0 or data['error'] is not None)
+
+    def on_auto_tune_usb_success(self, data):
+        self.auto_tune_usb_button.setEnabled(True)
+        self.usb_traffic.blockSignals(True)
+        self.usb_traffic.setValue(int(data['best']['traffic']))
+        self.usb_traffic.blockSignals(False)
          
     def show_roi_component(self):
         # 检查是否存在以QHY开头的图片
@@ -2475,10 +2609,42 @@ class CameraControlWidget(QWidget):
         return img
         # return cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)  # 将BGR转换为RGB
 
+    def on_telemetry_ring(self,data):
+        # SDK 进程重启后会发来新的环形缓冲区，已退出的进程迟到的描述不再附加
+        if self.qhyccd_process is not None and data['pid'] != self.qhyccd_process.sdk_pid():
+            return
+        self.close_telemetry_ring()
+        self.telemetry_ring = TelemetryRing.attach(data)
+
+    def close_telemetry_ring(self):
+        # 线程后端交出的是 SDK 持有的对象，由 SDK 负责释放
+        if self.telemetry_ring is not None and not self.telemetry_ring.owner:
+            self.telemetry_ring.close()
+        self.telemetry_ring = None
+
     def update_current_temperature(self):
-        """更新当前温度显示"""
-        if self.sdk_input_queue is not None:
-            self.sdk_input_queue.put({"order":"get_temperature",'data':''})
+        """从遥测缓冲区更新当前温度、制冷功率和温度曲线，没有缓冲区时向 SDK 查询"""
+        if self.telemetry_ring is None:
+            if self.sdk_input_queue is not None:
+                self.sdk_input_queue.put({"order":"get_temperature",'data':''})
+            return
+        if self.qhyccd_process is not None and self.telemetry_ring.pid != self.qhyccd_process.sdk_pid():
+            # 缓冲区属于已退出的 SDK 进程，数据不再更新，重新获取
+            self.close_telemetry_ring()
+            if self.sdk_input_queue is not None:
+                self.sdk_input_queue.put({"order":"get_telemetry_ring",'data':''})
+            return
+        latest = self.telemetry_ring.latest()
+        if latest is None:
+            return
+        if latest['temperature'] is not None:
+            self.get_temperature_success(latest['temperature'])
+        if latest['pwm'] is not None:
+            self.current_cooler_power_label.setText(f'{translations[self.language]["qhyccd_capture"]["cooler_power"]}: {latest["pwm"]:.1f} %')
+        history = self.telemetry_ring.history(self.telemetry_history_seconds)
+        seconds = history['time'] - latest['time']
+        self.temperature_curve.setData(seconds, history['temperature'], connect='finite')
+        self.setpoint_curve.setData(seconds, history['setpoint'], connect='finite')
               
     def get_temperature_success(self,data):
         self.current_temperature_label.setText(f'{translations[self.language]["qhyccd_capture"]["temperature"]}: {data:.2f} °C')
@@ -2489,9 +2655,14 @@ class CameraControlWidget(QWidget):
             self.sdk_input_queue.put({"order":"set_temperature","data":value})
                 
     def update_current_humidity(self):
-        """更新当前湿度显示"""
-        if self.sdk_input_queue is not None:
-            self.sdk_input_queue.put({"order":"get_humidity_data",'data':''})
+        """从遥测缓冲区更新当前湿度显示，没有缓冲区时向 SDK 查询"""
+        if self.telemetry_ring is None:
+            if self.sdk_input_queue is not None:
+                self.sdk_input_queue.put({"order":"get_humidity_data",'data':''})
+            return
+        latest = self.telemetry_ring.latest()
+        if latest is not None and latest['humidity'] is not None:
+            self.update_camera_humidity_text(latest['humidity'])
           
     def update_camera_humidity_text(self,data):
         if self.has_humidity_control:
@@ -3041,12 +3212,66 @@ class CameraControlWidget(QWidget):
         self.planned_shooting_dialog.updateTableOptions(data)
 
     def on_plan_running(self,data):
-        if self.sdk_input_queue is not None:
+        if self.sdk_input_queue is None:
+            return
+        if data.get('save'):
+            data['save']['fits_header'] = self.fits_header_dialog.get_table_data()
+        if 'name' in data and not (self.camera_state and data['name'] == self.camera_name):
+            # 每台相机的行在各自的进程中执行，不同相机的行并行曝光，不关闭当前相机
+            self.sdk_pool.sdk_path = self.settings_dialog.qhyccd_path_label.text().strip()
+            self.sdk_pool.put(data['name'], 'run_plan', data)
+        else:
+            if 'end' in data:
+                # 其他相机的进程在计划期间保持相机打开，计划结束时关闭
+                for camera_id in list(self.sdk_pool.workers.keys()):
+                    self.sdk_pool.put(camera_id, 'release_plan_cameras', '')
+                if not self.camera_state:
+                    return  # 当前没有连接的相机，无需恢复
             self.sdk_input_queue.put({'order':'run_plan', 'data':data})
+
+    def on_worker_data_received(self, data):
+        camera_id = data['camera_id']
+        if data['order'] == 'runPlan_success':
+            self.on_plan_success(data['data'])
+        elif data['order'] == 'runPlan_frame':
+            self.on_plan_frame(data['data'])
+        elif data['order'] == 'runPlan_failed':
+            self.planned_shooting_dialog.update_row_failed(data['data']['plan_row'])
+        elif data['order'] == 'planFrame_saved':
+            self.on_plan_frame_saved(data['data'])
+        elif data['order'] == 'exposure_progress':
+            self.on_exposure_progress(data['data'], camera_id)
+        elif data['order'] == 'error':
+            self.append_text(f"[{camera_id}] {data['data']}", is_error=True)
+        elif data['order'] == 'tip':
+            self.append_text(f"[{camera_id}] {data['data']}")
+        elif data['order'] == 'status':
+            self.on_status(data['data'], camera_id)
         
-    def on_plan_success(self,image_data):
-        self.planned_shooting_dialog.update_row_state()
-        self.viewer.add_image(image_data, name='Plan Shooting')
+    def on_plan_schedule_report(self,report):
+        if report['drift_ms'] is not None:
+            stats = report['drift_ms']
+            self.append_text(f"{translations[self.language]['planned_shooting']['schedule_report']}: p50 {stats['p50']:.1f}, p99 {stats['p99']:.1f}, max {stats['max']:.1f}")
+
+    def on_plan_success(self,frame):
+        self.planned_shooting_dialog.update_row_state(frame.get('plan_row'))
+        self.on_plan_frame(frame)
+
+    def on_plan_frame(self,frame):
+        # 直接写盘的行只发回缩略图；计划图像共用一个图层，不随行数累积
+        try:
+            img = frame['thumbnail'] if 'thumbnail' in frame else self.frame_slot_reader.read(frame)
+        except FrameOverwrittenError:
+            # 界面落后一帧以上时槽已写入后续的帧，跳过显示，不显示错误的图像
+            self.append_text(f"{translations[self.language]['qhyccd_sdk']['frame_overwritten']}: {translations[self.language]['planned_shooting']['plan_frame_skipped']} {frame.get('frame', 0) + 1}/{frame.get('count', 1)}", True)
+            return
+        if 'Plan Shooting' in self.viewer.layers:
+            self.viewer.layers['Plan Shooting'].data = img
+        else:
+            self.viewer.add_image(img, name='Plan Shooting')
+
+    def on_plan_frame_saved(self,data):
+        self.append_text(f"{translations[self.language]['planned_shooting']['plan_frame_saved']}: {data['file']}")
         
     def toggle_external_trigger_enabled(self,state):
         if self.sdk_input_queue is not None:
@@ -3059,7 +3284,7 @@ class CameraControlWidget(QWidget):
                 self.sdk_input_queue.put({'order':'set_external_trigger', 'data':(self.trigger_interface_selector.currentText(), self.use_trigger_output_checkbox.isChecked(), (self.image_w, self.image_h, self.image_c, self.camera_bit))})
             else:
                 self.sdk_input_queue.put({'order':'stop_external_trigger', 'data':''})
-                self.temperature_update_timer.start(5000)
+                self.temperature_update_timer.start(1000)
 
     def stop_external_trigger_success(self,data):
         self.on_set_resolution_clicked()
@@ -0,0 +1,92 @@
+from ctypes import POINTER, c_bool, c_char_p, c_double, c_uint8, c_uint16, c_uint32, c_void_p
+
+# SDK 函数的通用返回值
+QHYCCD_SUCCESS = 0
+QHYCCD_ERROR = 0xFFFFFFFF
+
+# 包内用到的全部 libqhyccd 函数原型：函数名 -> (restype, argtypes)，与 qhyccd.h 一致
+PROTOTYPES = {
+    # 资源与枚举
+    'InitQHYCCDResource': (c_uint32, []),
+    'ReleaseQHYCCDResource': (c_uint32, []),
+    'ScanQHYCCD': (c_uint32, []),
+    'GetQHYCCDId': (c_uint32, [c_uint32, c_char_p]),
+    'OpenQHYCCD': (c_void_p, [c_char_p]),
+    'CloseQHYCCD': (c_uint32, [c_void_p]),
+    'InitQHYCCD': (c_uint32, [c_void_p]),
+    'OutputQHYCCDDebug': (None, [c_char_p]),
+
+    # 读出模式与帧模式
+    'GetQHYCCDNumberOfReadModes': (c_uint32, [c_void_p, POINTER(c_uint32)]),
+    'GetQHYCCDReadModeName': (c_uint32, [c_void_p, c_uint32, c_char_p]),
+    'GetQHYCCDReadModeResolution': (c_uint32, [c_void_p, c_uint32, POINTER(c_uint32), POINTER(c_uint32)]),
+    'SetQHYCCDReadMode': (c_uint32, [c_void_p, c_uint32]),
+    'SetQHYCCDStreamMode': (c_uint32, [c_void_p, c_uint8]),
+
+    # 芯片信息
+    'GetQHYCCDChipInfo': (c_uint32, [c_void_p, POINTER(c_double), POINTER(c_double), POINTER(c_uint32), POINTER(c_uint32),
+                                     POINTER(c_double), POINTER(c_double), POINTER(c_uint32)]),
+    'GetQHYCCDEffectiveArea': (c_uint32, [c_void_p, POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32)]),
+
+    # 参数，IsQHYCCDControlAvailable 可用时返回 QHYCCD_SUCCESS
+    'IsQHYCCDControlAvailable': (c_uint32, [c_void_p, c_uint32]),
+    'GetQHYCCDParam': (c_double, [c_void_p, c_uint32]),
+    'SetQHYCCDParam': (c_uint32, [c_void_p, c_uint32, c_double]),
+    'GetQHYCCDParamMinMaxStep': (c_uint32, [c_void_p, c_uint32, POINTER(c_double), POINTER(c_double), POINTER(c_double)]),
+    'GetQHYCCDHumidity': (c_uint32, [c_void_p, POINTER(c_double)]),
+
+    # 图像格式
+    'SetQHYCCDDebayerOnOff': (c_uint32, [c_void_p, c_bool]),
+    'SetQHYCCDBinMode': (c_uint32, [c_void_p, c_uint32, c_uint32]),
+    'SetQHYCCDResolution': (c_uint32, [c_void_p, c_uint32, c_uint32, c_uint32, c_uint32]),
+    'Bits16ToBits8': (None, [c_void_p, POINTER(c_uint8), POINTER(c_uint8), c_uint32, c_uint32, c_uint16, c_uint16]),
+
+    # 单帧，GetQHYCCDExposureRemaining 没有进行中的曝光时返回 QHYCCD_ERROR
+    'ExpQHYCCDSingleFrame': (c_uint32, [c_void_p]),
+    'GetQHYCCDExposureRemaining': (c_uint32, [c_void_p]),
+    'GetQHYCCDSingleFrame': (c_uint32, [c_void_p, POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32),
+                                        POINTER(c_uint8)]),
+    'CancelQHYCCDExposingAndReadout': (c_uint32, [c_void_p]),
+
+    # 连续模式，GetQHYCCDLiveFrame 帧未就绪时返回 QHYCCD_ERROR
+    'BeginQHYCCDLive': (c_uint32, [c_void_p]),
+    'GetQHYCCDLiveFrame': (c_uint32, [c_void_p, POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32),
+                                      POINTER(c_uint8)]),
+    'StopQHYCCDLive': (c_uint32, [c_void_p]),
+
+    # 滤镜轮，IsQHYCCDCFWPlugged 已连接时返回 QHYCCD_SUCCESS
+    'IsQHYCCDCFWPlugged': (c_uint32, [c_void_p]),
+    'SendOrder2QHYCCDCFW': (c_uint32, [c_void_p, c_char_p, c_uint32]),
+
+    # 连拍模式
+    'EnableQHYCCDBurstMode': (c_uint32, [c_void_p, c_bool]),
+    'SetQHYCCDBurstModeStartEnd': (c_uint32, [c_void_p, c_uint16, c_uint16]),
+    'SetQHYCCDBurstModePatchNumber': (c_uint32, [c_void_p, c_uint32]),
+    'SetQHYCCDBurstIDLE': (c_uint32, [c_void_p]),
+    'ReleaseQHYCCDBurstIDLE': (c_uint32, [c_void_p]),
+
+    # 外触发
+    'GetQHYCCDTrigerInterfaceNumber': (c_uint32, [c_void_p, POINTER(c_uint32)]),
+    'GetQHYCCDTrigerInterfaceName': (c_uint32, [c_void_p, c_uint32, c_char_p]),
+    'SetQHYCCDTrigerInterface': (c_uint32, [c_void_p, c_uint32]),
+    'SetQHYCCDTrigerFunction': (c_uint32, [c_void_p, c_bool]),
+    'SetQHYCCDTrigerMode': (c_uint32, [c_void_p, c_uint32]),
+    'EnableQHYCCDTrigerOut': (c_uint32, [c_void_p]),
+    'EnableQHYCCDTrigerOutA': (c_uint32, [c_void_p]),
+    'SendSoftTriger2QHYCCDCam': (c_uint32, [c_void_p]),
+    'SetQHYCCDTrigerFilterOnOff': (c_uint32, [c_void_p, c_bool]),
+    'SetQHYCCDTrigerFilterTime': (c_uint32, [c_void_p, c_uint32]),
+}
+
+
+def bind_prototypes(qhyccddll):
+    """为已加载的 SDK 设置全部函数原型，旧版本 SDK 中不存在的函数跳过"""
+    for name, (restype, argtypes) in PROTOTYPES.items():
+        try:
+            function = getattr(qhyccddll, name)
+        except AttributeError:
+            continue
+        function.restype = restype
+        function.argtypes = argtypes
+    return qhyccddll
+
@@ -8,16 +8,50 @@ import time
 import multiprocessing
 import sys
 import threading
+import queue
 
 from .control_id import CONTROL_ID
 from .previewThread import PreviewThread
 from .captureFrame import CaptureThread
+from .sequenceCapture import SequenceCaptureThread
+from .exposureProgress import ExposureProgressThread
+from .cfwManager import CFWManager
+from .plan_estimator import PlanTimingCache
+from .plan_writer import PlanWriter, plan_fields, plan_header, thumbnail
+from .plan_journal import append_record, first_missing, frame_record
+from .telemetry import TelemetryRing, TelemetryThread
+from .usbTuner import USBTrafficTuner, USBTuningCache, traffic_candidates
+from .status_channel import (StatusChannel, QUEUE_SIZE, GET_TEMPERATURE, GET_HUMIDITY, GET_EXPOSURE_VALUE, SET_EXPOSURE_TIME,
+                             SET_GAIN, SET_OFFSET, SET_USB_TRAFFIC, SET_WHITE_BALANCE)
 from .language import translations
 from .externalTriggerThread import ExternalTriggerThread
 from .save_video import SaveThread
+from .simulator import is_simulator_path, load_simulator
+from .qhyccd_dll import QHYCCD_ERROR, QHYCCD_SUCCESS, bind_prototypes
+from .frame_slot import FrameSlot
+
+SEQUENCE_STOP_TIMEOUT = 5.0  # 开始新序列前等待上一次序列线程结束的时间（秒）
+
+# USB 流量调优期间拒绝的命令及其失败应答：调优线程独占相机句柄，结束时恢复的参数也会覆盖期间的设置
+USB_TUNE_BLOCKED_ORDERS = {
+    'init_camera': 'initCamera_failed',
+    'singleCapture': 'singleCapture_failed',
+    'sequence_capture': 'sequenceCapture_failed',
+    'run_plan': 'runPlan_failed',
+    'start_preview': 'start_preview_failed',
+    'set_exposure_time': 'setExposureTime_failed',
+    'set_gain': 'setGain_failed',
+    'set_offset': 'setOffset_failed',
+    'set_usb_traffic': 'setUsbTraffic_failed',
+    'set_camera_depth': 'setDepth_failed',
+    'set_resolution': 'setResolution_failed',
+    'set_camera_pixel_bin': 'setCameraPixelBin_failed',
+}
 
 
 class QHYCCDSDK(multiprocessing.Process):
+    own_process = True  # 独占进程，实时模式可接管垃圾回收
+
     def __init__(self, input_queue, output_queue,language):
         super().__init__()  # 初始化父类
         self.daemon = True
@@ -25,23 +59,53 @@ class QHYCCDSDK(multiprocessing.Process):
         self.output_queue = output_queue  # 发送结果的队列
         self.image_buffer = None
         self.camhandle = 0  # 相机句柄
+        self.camera_initialized = False  # 当前相机已完成 InitQHYCCD，遥测只采样初始化后的相机
         self.qhyccddll = None  # 相机库
         self.language = language  # 语言
         self.qhyccd_resource_path = None
         self.preview_thread = None
+        self.realtime_config = None  # 预览线程的实时调度设置，None 为普通模式
         self.last_order = None
         self.last_data = None
         self.capture_thread = None
         self.shm1 = None
         self.shm2 = None
+        self.frame_slot = FrameSlot()  # 单帧和计划拍摄结果的共享内存槽
+        self.sequence_thread = None
+        self.sequence_slots = [FrameSlot(1), FrameSlot(2)]  # 序列拍摄轮流使用的共享内存槽
+        self.plan_slot = FrameSlot(3)  # 多帧计划行与 frame_slot 轮流使用，界面读取上一帧时下一帧读出到另一块
+        self.exposure_progress = None  # 曝光进度推送线程，在进程内启动
+        self.status = None  # 高频提示的状态通道，在进程内创建
+        self.cfw_manager = CFWManager()  # 滤镜轮移动监视，记录孔位间移动耗时
+        self.plan_row = None  # 等待滤镜轮到位的计划行
+        self.plan_row_id = 0
+        self.plan_cameras = {}  # 计划执行期间保持打开的相机：名称 -> 句柄和已设置的参数
+        self.plan_timing = PlanTimingCache()  # 计划行实测的读出和配置耗时，供试运行估算
+        self.plan_writer = None  # 计划拍摄的写盘线程池，在进程内创建
+        self.telemetry = None  # 遥测采样线程，在进程内启动
+        self.telemetry_ring = None  # 遥测样本的共享环形缓冲区，在进程内创建
+        self.telemetry_handoff = False  # 线程后端直接交出环形缓冲区对象
+        self.temperature_setpoint = None  # 最近一次设置的制冷目标温度，温度门限的默认设定值
+        self.resolution = None  # 最近一次设置的 ROI (x, y, w, h)
+        self.usb_tuner = None  # USB 流量调优线程
+        self.usb_tune_request = None
+        self.usb_tuning = USBTuningCache()  # 按相机和主机缓存的调优结果
         self.is_running = True
+        self.stopped = False
+        # 心跳由命令循环更新，监视进程据此判断是否卡死；grace 为当前命令预计的额外阻塞时间
+        self.heartbeat = multiprocessing.Value('d', 0.0, lock=False)
+        self.heartbeat_grace = multiprocessing.Value('d', 0.0, lock=False)
+        self.heartbeat_seq = multiprocessing.Value('i', 0, lock=False)
+        self.command_seq = multiprocessing.Value('q', 0, lock=False)  # 最近取出的命令序号，监视线程换成命令队列的计数
         self.external_trigger_thread = None
+        self.external_trigger_timing = None
         self.GPS_control = False
         self.init_command_map()
     
     def init_command_map(self):
         self.command_map = {
             'stop': self.stop,      # 停止进程
+            'heartbeat': self.heartbeat_reply,                       # 确认心跳序号
             'init_qhyccd_resource': self.init_qhyccd_resource,     # 初始化相机资源
             'read_camera_name': self.read_camera_name,               # 读取相机名称
             'open_camera': self.open_camera,                         # 打开相机
@@ -63,6 +127,9 @@ class QHYCCDSDK(multiprocessing.Process):
             'get_planned_shooting_data': self.get_planned_shooting_data, # 获取计划拍摄数据
             'get_cfw_info': self.get_cfw_info,                         # 获取滤镜轮信息
             'run_plan': self.run_plan,                                 # 运行计划
+            'run_plan_exposure': self.run_plan_exposure,               # 滤镜轮到位后继续计划拍摄（内部命令）
+            'run_plan_frame': self.run_plan_frame,                     # 读出计划行的下一帧（内部命令）
+            'release_plan_cameras': self.release_plan_cameras,         # 关闭计划中打开的相机
             'get_is_temperature_control': self.get_is_temperature_control, # 获取是否温度控制
             'get_temperature': self.get_temperature,                   # 获取温度
             'set_temperature': self.set_temperature,                   # 设置温度
@@ -75,16 +142,24 @@ class QHYCCDSDK(multiprocessing.Process):
             'get_auto_white_balance_values': self.get_auto_white_balance_values, # 获取自动白平衡值 
             'set_exposure_time': self.set_exposure_time,               # 设置曝光时间
             'setCFWFilter': self.set_CFW_filter,                         # 设置滤镜轮
+            'get_cfw_move_times': self.get_cfw_move_times,               # 获取孔位间移动耗时记录
             'set_offset': self.set_offset,                               # 设置偏移
             'set_gain': self.set_gain,                                   # 设置增益
             'set_usb_traffic': self.set_usb_traffic,                     # 设置USB流量
+            'auto_tune_usb': self.auto_tune_usb,                         # 连续模式下自动选择 USB 流量（及读出模式、位深）
+            'usb_tune_done': self.usb_tune_done,                         # 调优线程结束后应用并缓存结果（内部命令）
             'set_white_balance': self.set_white_balance,                 # 设置白平衡
             'stop_preview': self.stop_preview,                           # 停止预览
             'start_preview': self.start_preview,                         # 开始预览
             'set_preview_pause': self.update_preview_pause,             # 设置预览暂停
+            'set_realtime_mode': self.set_realtime_mode,                 # 设置预览线程的实时调度，下次开始预览时生效
+            'get_preview_timing': self.get_preview_timing,               # 获取预览帧间隔分布
             'update_shared_image_data': self.update_shared_image_data, # 更新共享图像数据
             'clear_fps_data': self.clear_fps_data,                       # 清除FPS数据
             'singleCapture': self.single_capture,                       # 单次捕获
+            'sequence_capture': self.sequence_capture,                   # 序列拍摄，曝光与处理流水线并行
+            'release_frame_slot': self.release_frame_slot,               # 接收端读完序列拍摄的一帧，释放共享内存槽
+            'set_exposure_progress_rate': self.set_exposure_progress_rate, # 订阅曝光进度，0 为取消
             'cancel_capture': self.cancel_capture,                       # 取消捕获
             'get_image_buffer_size': self.get_image_buffer_size,         # 获取图像缓冲区大小
             'set_image_buffer': self.set_image_buffer,                   # 设置图像缓冲区
@@ -93,20 +168,38 @@ class QHYCCDSDK(multiprocessing.Process):
             'start_burst_mode': self.start_burst_mode,                   # 开始连拍模式
             'send_soft_trigger': self.send_soft_trigger,                   # 发送软触发
             'stop_external_trigger': self.stop_external_trigger,           # 停止外部触发
+            'get_external_trigger_timing': self.get_external_trigger_timing, # 获取触发到出帧的耗时分布
             'set_GPS_control': self.set_GPS_control,                       # 设置GPS控制
             'get_humidity_data': self.get_humidity_data,                 # 获取湿度
+            'set_telemetry_rate': self.set_telemetry_rate,               # 设置遥测采样频率（次/秒），0 为停止采样
+            'get_telemetry_ring': self.get_telemetry_ring,               # 获取遥测环形缓冲区的描述
             'start_save_video': self.start_save_video,                   # 保存视频
             'stop_save_video': self.stop_save_video,                       # 停止保存视频
         }
 
     def run(self):
         try:
+            self.exposure_progress = ExposureProgressThread(self.output_queue)
+            self.exposure_progress.start()
+            self.status = StatusChannel(self.output_queue)
+            self.plan_writer = PlanWriter(self.output_queue, self.language)
+            self.telemetry_ring = TelemetryRing()
+            self.telemetry_ring.handoff = self.telemetry_handoff
+            self.telemetry = TelemetryThread(ring=self.telemetry_ring)
+            self.telemetry.start()
+            self.get_telemetry_ring('')
             # 进程运行的主循环
             while self.is_running:
-                data = self.input_queue.get()  # 从输入队列获取数据
+                self.beat()
+                try:
+                    data = self.input_queue.get(timeout=1.0)  # 从输入队列获取数据
+                except queue.Empty:
+                    continue
                 if data is None:  # 检查是否为退出信号
                     self.is_running = False  # 设置运行标志为False
                     continue
+                if 'seq' in data:
+                    self.command_seq.value = data['seq']
                 if data['order'] == 'end':
                     self.is_running = False  # 确保能够响应结束命令
                     break
@@ -114,12 +207,35 @@ class QHYCCDSDK(multiprocessing.Process):
                 if order not in self.command_map:
                     self._report_error(translations[self.language]['qhyccd_sdk']['command_not_found'],sys._getframe().f_lineno)
                 if self.input_queue.qsize() >= 3:
-                    self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['queue_size']} {self.input_queue.qsize()}"})
+                    self.status.emit(QUEUE_SIZE, self.input_queue.qsize())
+                if order in USB_TUNE_BLOCKED_ORDERS and self.usb_tuner is not None and self.usb_tuner.is_alive():
+                    self.reject_during_usb_tune(order, data['data'])
+                    continue
                 self.command_map[order](data['data'])
         except Exception as e:
             self._report_error(f"{translations[self.language]['qhyccd_sdk']['process_error']}: order: {order}, error: {e}")
+            # 异常退出时保留队列中的命令，由监视进程重启后继续处理
+            self.stop('crash')
         finally:
             self.stop(None)
+
+    def beat(self, grace=0.0):
+        self.heartbeat.value = time.monotonic()
+        self.heartbeat_grace.value = grace
+
+    def heartbeat_reply(self, data):
+        self.heartbeat_seq.value = data
+
+    def reject_during_usb_tune(self, order, data):
+        """调优期间拒绝使用相机句柄的命令，发送失败应答，调用方不必等到超时"""
+        message = translations[self.language]['qhyccd_sdk']['usb_tune_busy']
+        if order == 'run_plan' and isinstance(data, dict) and 'name' in data:
+            self.plan_row_failed(data, message)
+            return
+        self._report_error(message,sys._getframe().f_lineno)
+        # 计划结束时重新初始化相机，失败应答与初始化相同
+        failure = 'initCamera_failed' if order == 'run_plan' else USB_TUNE_BLOCKED_ORDERS[order]
+        self.output_queue.put({"order":failure,"data":None})
          
     def _report_error(self, message, line_number=None):
         error_location = f"{translations[self.language]['qhyccd_sdk']['file']   }: {__file__}, {translations[self.language]['qhyccd_sdk']['line_number']}: {line_number if line_number is not None else sys._getframe().f_lineno}"  # 获取当前文件名和行号
@@ -160,6 +276,8 @@ class QHYCCDSDK(multiprocessing.Process):
                     self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
             # 设置函数的参数和返回值类型
             file_path = lib_path
+        elif is_simulator_path(file_path):
+            self.qhyccddll = load_simulator(file_path)
         else:
             self.qhyccddll = cdll.LoadLibrary(file_path)
 
@@ -167,141 +285,9 @@ class QHYCCDSDK(multiprocessing.Process):
             self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
             return
 
-        # 获取机 ID
-        self.qhyccddll.GetQHYCCDId.argtypes = [ctypes.c_uint32, ctypes.c_char_p] 
-
-        # 通过相机 ID 打开相机
-        self.qhyccddll.OpenQHYCCD.argtypes = [ctypes.c_char_p] 
-        self.qhyccddll.OpenQHYCCD.restype = ctypes.c_void_p 
-
-        # 关闭相机
-        self.qhyccddll.CloseQHYCCD.argtypes = [ctypes.c_void_p] 
-
-        # 读模式
-        self.qhyccddll.GetQHYCCDNumberOfReadModes.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint32)] 
-        self.qhyccddll.GetQHYCCDReadModeName.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.c_char_p]   
-        self.qhyccddll.GetQHYCCDReadModeResolution.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.POINTER(ctypes.c_uint32), 
-                                                        ctypes.POINTER(ctypes.c_uint32)] 
-        self.qhyccddll.SetQHYCCDReadMode.argtypes = [ctypes.c_void_p, ctypes.c_uint32] 
-
-        # 设置帧模式或实时流模式
-        self.qhyccddll.SetQHYCCDStreamMode.argtypes = [ctypes.c_void_p, ctypes.c_uint32] 
-
-        # 初始化相机
-        self.qhyccddll.InitQHYCCD.argtypes = [ctypes.c_void_p] 
-
-        # 获取相机芯片信息
-        self.qhyccddll.GetQHYCCDChipInfo.argtypes = [ctypes.c_void_p,       
-                                            ctypes.POINTER(ctypes.c_double), ctypes.POINTER(ctypes.c_double),
-                                            ctypes.POINTER(ctypes.c_uint32), ctypes.POINTER(ctypes.c_uint32),
-                                            ctypes.POINTER(ctypes.c_double), ctypes.POINTER(ctypes.c_double),
-                                            ctypes.POINTER(ctypes.c_uint32)] 
-
-        # 判断参数是否可用
-        self.qhyccddll.IsQHYCCDControlAvailable.argtypes = [ctypes.c_void_p, ctypes.c_uint32] 
-        self.qhyccddll.IsQHYCCDControlAvailable.restype = ctypes.c_bool 
-
-        
-        # 获参数值
-        self.qhyccddll.GetQHYCCDParam.argtypes = [ctypes.c_void_p, ctypes.c_uint32] 
-        self.qhyccddll.GetQHYCCDParam.restype = ctypes.c_double 
-
-        # 设置参数
-        self.qhyccddll.SetQHYCCDParam.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.c_double] 
-
-        # 获取参数值的范围
-        self.qhyccddll.GetQHYCCDParamMinMaxStep.argtypes = [ctypes.c_void_p, ctypes.c_uint32, 
-                                                    ctypes.POINTER(ctypes.c_double),ctypes.POINTER(ctypes.c_double),
-                                                    ctypes.POINTER(ctypes.c_double)] 
-        self.qhyccddll.GetQHYCCDParamMinMaxStep.restype = ctypes.c_double 
-
-        # 设置去马赛克（Debayer）开关，仅对彩色相机有效
-        self.qhyccddll.SetQHYCCDDebayerOnOff.argtypes = [ctypes.c_void_p, ctypes.c_bool] 
-
-        # 设置 bin 模式
-        self.qhyccddll.SetQHYCCDBinMode.argtypes = [ctypes.c_void_p, ctypes.c_uint32] 
-
-        # 设置分辨率和 ROI
-        self.qhyccddll.SetQHYCCDResolution.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.c_uint32, ctypes.c_uint32, 
-                                                ctypes.c_uint32]
-
-        # 启动单帧模式曝光
-        self.qhyccddll.ExpQHYCCDSingleFrame.argtypes = [ctypes.c_void_p] 
-        
-        # 获取已曝光时长
-        self.qhyccddll.GetQHYCCDExposureRemaining.argtypes = [ctypes.c_void_p] 
-        # self.qhyccddll.GetQHYCCDExposureRemaining.restype = ctypes.c_double
-        
-        # 获取单帧数据
-        self.qhyccddll.GetQHYCCDSingleFrame.argtypes = [ctypes.c_void_p, 
-                                                ctypes.POINTER(ctypes.c_uint32), ctypes.POINTER(ctypes.c_uint32),
-                                                ctypes.POINTER(ctypes.c_uint32), ctypes.POINTER(ctypes.c_uint32),
-                                                ctypes.POINTER(ctypes.c_uint8)]
-
-        # 取消单次曝光，相机将不输出帧数据
-        self.qhyccddll.CancelQHYCCDExposingAndReadout.argtypes = [ctypes.c_void_p] 
-
-        # 启动实时流式
-        self.qhyccddll.BeginQHYCCDLive.argtypes = [ctypes.c_void_p] 
-
-        # 获取实时帧数据
-        self.qhyccddll.GetQHYCCDLiveFrame.argtypes = [ctypes.c_void_p, 
-                                                ctypes.POINTER(ctypes.c_uint32), ctypes.POINTER(ctypes.c_uint32),
-                                                ctypes.POINTER(ctypes.c_uint32), ctypes.POINTER(ctypes.c_uint32),
-                                                ctypes.POINTER(ctypes.c_uint8)] 
-
-        # 停止实时流模式
-        self.qhyccddll.StopQHYCCDLive.argtypes = [ctypes.c_void_p] 
-
-        # 转换图像数据（从16位转换为8位）
-        self.qhyccddll.Bits16ToBits8.argtypes = [ctypes.c_void_p, 
-                                            ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8),
-                                            ctypes.c_uint32, ctypes.c_uint32, ctypes.c_uint16, ctypes.c_uint16]
-        
-        # 判断滤镜轮是否连接
-        self.qhyccddll.IsQHYCCDCFWPlugged.argtypes = [ctypes.c_void_p] 
-        self.qhyccddll.IsQHYCCDCFWPlugged.restype = ctypes.c_bool 
-        
-        # EXPORTC uint32_t STDCALL SendOrder2QHYCCDCFW(qhyccd_handle *handle,char *order,uint32_t length);
-        # 发送命令到滤镜轮
-        self.qhyccddll.SendOrder2QHYCCDCFW.argtypes = [ctypes.c_void_p,ctypes.c_char_p,ctypes.c_uint32] 
-
-        # 获取湿度
-        self.qhyccddll.GetQHYCCDHumidity.argtypes = [ctypes.c_void_p,ctypes.POINTER(ctypes.c_double)] 
+        # 设置全部函数原型，避免 ctypes 按 int 猜测参数和返回值
+        bind_prototypes(self.qhyccddll)
 
-        # 获取相机有效扫描范围
-        self.qhyccddll.GetQHYCCDEffectiveArea.argtypes = [ctypes.c_void_p,ctypes.POINTER(ctypes.c_uint32), 
-                                                        ctypes.POINTER(ctypes.c_uint32), ctypes.POINTER(ctypes.c_uint32), 
-                                                        ctypes.POINTER(ctypes.c_uint32)] 
-        
-        # 输出Debug
-        self.qhyccddll.OutputQHYCCDDebug.argtypes = [ctypes.c_char_p]
-        
-        
-        
-        # 启动连续曝光
-        self.qhyccddll.EnableQHYCCDBurstMode.argtypes = [ctypes.c_void_p,ctypes.c_bool]
-        self.qhyccddll.SetQHYCCDBurstModeStartEnd.argtypes = [ctypes.c_void_p,ctypes.c_uint32,ctypes.c_uint32]
-        self.qhyccddll.SetQHYCCDBurstModePatchNumber.argtypes = [ctypes.c_void_p,ctypes.c_uint32]
-        self.qhyccddll.SetQHYCCDBurstIDLE.argtypes = [ctypes.c_void_p]
-        self.qhyccddll.ReleaseQHYCCDBurstIDLE.argtypes = [ctypes.c_void_p]
-        
-        
-        # 设置外触发接口
-        self.qhyccddll.GetQHYCCDTrigerInterfaceNumber.argtypes = [ctypes.c_void_p,ctypes.POINTER(ctypes.c_uint32)]
-        self.qhyccddll.GetQHYCCDTrigerInterfaceName.argtypes = [ctypes.c_void_p,ctypes.c_uint32,ctypes.c_char_p]
-        self.qhyccddll.SetQHYCCDTrigerInterface.argtypes = [ctypes.c_void_p,ctypes.c_uint32]
-        self.qhyccddll.SetQHYCCDTrigerFunction.argtypes = [ctypes.c_void_p,ctypes.c_bool]
-        self.qhyccddll.EnableQHYCCDTrigerOut.argtypes = [ctypes.c_void_p]
-        self.qhyccddll.SetQHYCCDTrigerMode.argtypes = [ctypes.c_void_p,ctypes.c_uint32]
-        self.qhyccddll.EnableQHYCCDTrigerOutA.argtypes = [ctypes.c_void_p]
-        self.qhyccddll.SendSoftTriger2QHYCCDCam.argtypes = [ctypes.c_void_p]
-        self.qhyccddll.SetQHYCCDTrigerFilterOnOff.argtypes = [ctypes.c_void_p,ctypes.c_bool]
-        self.qhyccddll.SetQHYCCDTrigerFilterTime.argtypes = [ctypes.c_void_p,ctypes.c_uint32]
-        
-        self.qhyccddll.SendSoftTriger2QHYCCDCam.argtypes = [ctypes.c_void_p]
-        
-        
         # 初始化QHYCCD资源
         ret = self.qhyccddll.InitQHYCCDResource() 
         if ret != 0:
@@ -315,6 +301,7 @@ class QHYCCDSDK(multiprocessing.Process):
     def releaseQHYCCDResource(self,data,state=False):
         if self.qhyccddll is None:
             return
+        self.detach_telemetry()
         ret = self.qhyccddll.ReleaseQHYCCDResource() 
         if ret != 0:
             self._report_error(translations[self.language]['qhyccd_sdk']['release_resource_failed'],sys._getframe().f_lineno)
@@ -325,20 +312,46 @@ class QHYCCDSDK(multiprocessing.Process):
                 self.output_queue.put({"order":"releaseResource_success","data":None})
     
     def stop(self, data):
+        if self.stopped:
+            return
         try:
-            if self.camhandle > 0:
+            if self.sequence_thread is not None:
+                self.sequence_thread.stop()
+                self.sequence_thread = None
+            self.stop_usb_tuner()
+            if self.exposure_progress is not None:
+                self.exposure_progress.stop()
+            if self.telemetry is not None:
+                self.telemetry.stop()
+                self.telemetry.join(2.0)
+            if self.telemetry_ring is not None:
+                self.telemetry_ring.close()
+                self.telemetry_ring = None
+            if self.status is not None:
+                self.status.flush()
+            self.release_plan_cameras('')
+            if self.plan_writer is not None:
+                self.plan_writer.shutdown()
+            self.cfw_manager.cancel()
+            if self.camhandle:
                 self.close_camera(False)
             if self.qhyccddll is not None:
                 self.releaseQHYCCDResource('')
                 self.qhyccddll = None
             # self.cleanup_shared_memory(self.shm1)
             # self.cleanup_shared_memory(self.shm2)
-            self.clear_buffer(self.input_queue)
-            self.clear_buffer(self.output_queue)
-            self.output_queue.put({"order":"stop_success","data":None})
+            self.frame_slot.close()
+            self.plan_slot.close()
+            for slot in self.sequence_slots:
+                slot.close()
+            if data != 'crash':
+                self.clear_buffer(self.input_queue)
+                self.clear_buffer(self.output_queue)
+                self.output_queue.put({"order":"stop_success","data":None})
             # self.input_queue.close()
             # self.output_queue.close()
         finally:
+            self.stopped = True
             self.is_running = False
             
     def clear_buffer(self,buffer):
@@ -394,10 +407,14 @@ class QHYCCDSDK(multiprocessing.Process):
         if self.qhyccddll is None:
             self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
             return
-        camera_info = {}
         max_buffer_size = 0
         location_info = self.read_location_info()
-        for camera_name in list(self.camera_ids.keys()):
+        # 保留其他相机的缓存记录，多个工作进程各自只探测自己的相机
+        camera_info = dict(location_info) if location_info is not None else {}
+        camera_names = list(self.camera_ids.keys())
+        if data in self.camera_ids:
+            camera_names = [data]
+        for camera_name in camera_names:
             if location_info is not None and camera_name in list(location_info.keys()):
                 if location_info[camera_name] is not None and max_buffer_size < location_info[camera_name]:
                     max_buffer_size = location_info[camera_name]
@@ -406,12 +423,12 @@ class QHYCCDSDK(multiprocessing.Process):
                 continue
             camera_id = self.camera_ids[camera_name]
             camhandle = self.qhyccddll.OpenQHYCCD(camera_id) 
-            if camhandle <= 0:
+            if not camhandle:
                 self._report_error(translations[self.language]['qhyccd_sdk']['open_camera_failed'],sys._getframe().f_lineno)
                 continue
             readModeNum = ctypes.c_uint32()
             ret = self.qhyccddll.GetQHYCCDNumberOfReadModes(camhandle,byref(readModeNum)) 
-            if ret < 0:
+            if ret != QHYCCD_SUCCESS:
                 self._report_error(translations[self.language]['qhyccd_sdk']['get_read_mode_number_failed'],sys._getframe().f_lineno)
                 continue
             for index in range(readModeNum.value):
@@ -449,7 +466,7 @@ class QHYCCDSDK(multiprocessing.Process):
                 try:
                     if not self.qhyccddll.IsQHYCCDControlAvailable(camhandle, CONTROL_ID.CAM_IS_COLOR.value): 
                         is_color_value = self.qhyccddll.GetQHYCCDParam(camhandle, CONTROL_ID.CAM_IS_COLOR.value) 
-                        if is_color_value == 4294967295.0:
+                        if is_color_value == QHYCCD_ERROR:
                             self._report_error(translations[self.language]['qhyccd_sdk']['get_camera_is_color_failed'],sys._getframe().f_lineno)
                             is_color_camera = self.is_color_camera_by_name(camera_name)
                         else:
@@ -487,13 +504,14 @@ class QHYCCDSDK(multiprocessing.Process):
         camera_id = self.camera_ids[camera_name]
         self.camera_name = camera_name
         ret = self.qhyccddll.OpenQHYCCD(camera_id) 
-        if ret is None or ret <= 0:
+        if not ret:
             self._report_error(translations[self.language]['qhyccd_sdk']['open_camera_failed'],sys._getframe().f_lineno)
-        self.camhandle = ret
+        self.camhandle = ret or 0
+        self.camera_initialized = False
         self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['open_camera_success']}:{camera_name}"})
         readModeNum = ctypes.c_uint32()
         ret = self.qhyccddll.GetQHYCCDNumberOfReadModes(self.camhandle,byref(readModeNum)) 
-        if ret < 0:
+        if ret != QHYCCD_SUCCESS:
             self._report_error(translations[self.language]['qhyccd_sdk']['get_read_mode_number_failed'],sys._getframe().f_lineno)
             return
         '''获取相机读取模式名称'''
@@ -528,7 +546,7 @@ class QHYCCDSDK(multiprocessing.Process):
             return
         readModeNum = ctypes.c_uint32()
         ret = self.qhyccddll.GetQHYCCDNumberOfReadModes(self.camhandle,byref(readModeNum)) 
-        if ret < 0:
+        if ret != QHYCCD_SUCCESS:
             self._report_error(translations[self.language]['qhyccd_sdk']['get_read_mode_number_failed'],sys._getframe().f_lineno)
             return
         '''获取相机读取模式名称'''
@@ -573,7 +591,7 @@ class QHYCCDSDK(multiprocessing.Process):
         self.readout_mode = readout_mode
         self.camera_mode = camera_mode
         self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['prepare_to_init_camera']}:{camera_name}..."})
-        if self.camhandle > 0:
+        if self.camhandle:
             self.close_camera(False)
         if self.qhyccddll is not None:
             self.releaseQHYCCDResource('')
@@ -582,9 +600,10 @@ class QHYCCDSDK(multiprocessing.Process):
         
         camera_id = self.camera_ids[camera_name]
         ret = self.qhyccddll.OpenQHYCCD(camera_id) 
-        if ret <= 0:
+        if not ret:
             self._report_error(translations[self.language]['qhyccd_sdk']['open_camera_failed'],sys._getframe().f_lineno)
-        self.camhandle = ret
+        self.camhandle = ret or 0
+        self.camera_initialized = False
         
         readout_id = self.readout_mode_name_dict[readout_mode]
         ret = self.qhyccddll.SetQHYCCDReadMode(self.camhandle, readout_id) 
@@ -605,6 +624,7 @@ class QHYCCDSDK(multiprocessing.Process):
         ret = self.qhyccddll.InitQHYCCD(self.camhandle) 
         if ret != 0:
             self._report_error(translations[self.language]['qhyccd_sdk']['init_camera_failed'],sys._getframe().f_lineno)
+        self.camera_initialized = ret == 0
         self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['init_camera_success']}"})
         camera_param = {}
         # 判断相机是否是彩色相机
@@ -626,6 +646,8 @@ class QHYCCDSDK(multiprocessing.Process):
         camera_param['burst_mode'] = self.get_burst_mode_is_available('')
         camera_param['GPS_control'] = self.get_GPS_control('')
         self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['init_camera_success']}:{camera_name}"})
+        # 初始化完成后才登记遥测，采样不与初始化并发
+        self.update_telemetry_camera()
         self.output_queue.put({"order":"initCamera_success","data":camera_param})
         
     def set_camera_depth(self, depth):
@@ -675,6 +697,7 @@ class QHYCCDSDK(multiprocessing.Process):
             self.preview_thread = None
         if self.GPS_control:
             self.set_GPS_control(False)
+        self.detach_telemetry()
         ret = self.qhyccddll.CloseQHYCCD(self.camhandle) 
         if ret != 0:
             self._report_error(translations[self.language]['qhyccd_sdk']['close_camera_failed'],sys._getframe().f_lineno)
@@ -682,6 +705,7 @@ class QHYCCDSDK(multiprocessing.Process):
             self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['close_camera_success']}"})
             self.output_queue.put({"order":"closeCamera_success","data":None})
             self.camhandle = 0
+            self.camera_initialized = False
                 
     def get_is_color_camera(self,data):
         if self.qhyccddll is None:
@@ -691,7 +715,7 @@ class QHYCCDSDK(multiprocessing.Process):
         try:
             if not self.qhyccddll.IsQHYCCDControlAvailable(self.camhandle, CONTROL_ID.CAM_IS_COLOR.value): 
                 is_color_value = self.qhyccddll.GetQHYCCDParam(self.camhandle, CONTROL_ID.CAM_IS_COLOR.value) 
-                if is_color_value == 4294967295.0:
+                if is_color_value == QHYCCD_ERROR:
                     self._report_error(translations[self.language]['qhyccd_sdk']['get_camera_is_color_failed'],sys._getframe().f_lineno)
                     self.is_color_camera = self.is_color_camera_by_name(self.camera_name)
                 else:
@@ -842,6 +866,7 @@ class QHYCCDSDK(multiprocessing.Process):
         if ret != 0:
             self._report_error(translations[self.language]['qhyccd_sdk']['set_resolution_failed'],sys._getframe().f_lineno)
         else:
+            self.resolution = (startX, startY, sizeX, sizeY)
             self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['set_resolution_success']}:{startX}*{startY}*{sizeX}*{sizeY}"})
   
     def getParamlimit(self,data_id,camhandle = None):
@@ -855,7 +880,7 @@ class QHYCCDSDK(multiprocessing.Process):
         step = ctypes.c_double() # 步长
         
         ret = self.qhyccddll.GetQHYCCDParamMinMaxStep(camhandle, data_id,byref(minValue),byref(maxValue),byref(step)) 
-        if ret == -1:
+        if ret == QHYCCD_ERROR:
             self._report_error(translations[self.language]['qhyccd_sdk']['get_param_limit_failed'],sys._getframe().f_lineno)
         return minValue.value,maxValue.value,step.value
 
@@ -869,7 +894,7 @@ class QHYCCDSDK(multiprocessing.Process):
             self.camera_depth_options[f"{i}bit"] = i
         updated_items = list(self.camera_depth_options.keys())  # 获取新的选项列表
         ret = self.qhyccddll.SetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_TRANSFERBIT.value, self.camera_depth_options[updated_items[0]]) 
-        if ret == -1:
+        if ret == QHYCCD_ERROR:
             self._report_error(translations[self.language]['qhyccd_sdk']['set_camera_depth_failed'],sys._getframe().f_lineno)
             return -1
         self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['get_camera_depth_success']}:{self.camera_depth_options}"})
@@ -901,9 +926,10 @@ class QHYCCDSDK(multiprocessing.Process):
             return
         startX,startY,sizeX,sizeY = data
         ret = self.qhyccddll.SetQHYCCDResolution(self.camhandle, startX, startY, sizeX, sizeY) 
-        if ret == -1:
+        if ret == QHYCCD_ERROR:
             self._report_error(translations[self.language]['qhyccd_sdk']['set_resolution_failed'],sys._getframe().f_lineno)
             return -1
+        self.resolution = (startX, startY, sizeX, sizeY)
         self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['set_resolution_success']}:{startX}*{startY}*{sizeX}*{sizeY}"})
         self.output_queue.put({"order":"setResolution_success","data":f"{startX}*{startY}*{sizeX}*{sizeY}"})
 
@@ -938,14 +964,14 @@ class QHYCCDSDK(multiprocessing.Process):
                 camhandle = self.camhandle
             else:
                 camhandle = self.qhyccddll.OpenQHYCCD(camera_name[i]) 
-                if camhandle <= 0:
+                if not camhandle:
                     continue
             plan_data['ids'] = camhandle
             
             # 设置读出模式
             readModeNum = ctypes.c_uint32()
             ret = self.qhyccddll.GetQHYCCDNumberOfReadModes(camhandle,byref(readModeNum)) 
-            if ret < 0:
+            if ret != QHYCCD_SUCCESS:
                 self._report_error(translations[self.language]['qhyccd_sdk']['get_readout_mode_num_failed'],sys._getframe().f_lineno)
   
             '''获取相机读取模式名称'''
@@ -994,7 +1020,7 @@ class QHYCCDSDK(multiprocessing.Process):
                         CFW_number_ids[f"CFW:{j}"] = hex_str
             if i != self.camera_name:
                 ret = self.qhyccddll.CloseQHYCCD(camhandle) 
-                if ret<0:
+                if ret != QHYCCD_SUCCESS:
                     continue
             plan_data['CFW'] = [is_CFW_control,CFW_number_ids]
             plan_data['connection'] = True
@@ -1015,7 +1041,8 @@ class QHYCCDSDK(multiprocessing.Process):
             readout_mode = self.readout_mode
             camera_mode = self.camera_mode
             self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['prepare_to_init_camera']}:{camera_name}..."})
-            if self.camhandle > 0:
+            self.release_plan_cameras('')
+            if self.camhandle:
                 self.close_camera(False)
             if self.qhyccddll is not None:
                 self.releaseQHYCCDResource('')
@@ -1024,9 +1051,10 @@ class QHYCCDSDK(multiprocessing.Process):
             
             camera_id = self.camera_ids[camera_name]
             ret = self.qhyccddll.OpenQHYCCD(camera_id) 
-            if ret <= 0:
+            if not ret:
                 self._report_error(translations[self.language]['qhyccd_sdk']['open_camera_failed'],sys._getframe().f_lineno)
-            self.camhandle = ret
+            self.camhandle = ret or 0
+            self.camera_initialized = False
             
             readout_id = self.readout_mode_name_dict[readout_mode]
             ret = self.qhyccddll.SetQHYCCDReadMode(self.camhandle, readout_id) 
@@ -1046,6 +1074,7 @@ class QHYCCDSDK(multiprocessing.Process):
             ret = self.qhyccddll.InitQHYCCD(self.camhandle) 
             if ret != 0:
                 self._report_error(translations[self.language]['qhyccd_sdk']['init_camera_failed'],sys._getframe().f_lineno)
+            self.camera_initialized = ret == 0
             self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['init_camera_success']}"})
            
             camera_param = {}
@@ -1065,139 +1094,363 @@ class QHYCCDSDK(multiprocessing.Process):
             camera_param['readout_w'] = readout_w.value
             camera_param['readout_h'] = readout_h.value
             self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['init_camera_success']}:{camera_name}"})
+            self.update_telemetry_camera()
             self.output_queue.put({"order":"initCamera_success","data":camera_param})
             return
         
-        if data['name'] in self.camera_ids.keys():
-            if self.camhandle != 0:
-                if self.preview_thread is not None:
-                    self.preview_thread.set_pause(True)
-                ret = self.qhyccddll.CloseQHYCCD(self.camhandle) 
-                self.camhandle = 0
-                if ret<0:
-                    self._report_error(translations[self.language]['qhyccd_sdk']['close_camera_failed'],sys._getframe().f_lineno)
-                    return
-            camhandle = self.qhyccddll.OpenQHYCCD(self.camera_ids[data['name']]) 
-            if camhandle <= 0:
-                self._report_error(translations[self.language]['qhyccd_sdk']['open_camera_failed'],sys._getframe().f_lineno)
-                return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['open_camera']}{data['name']}"})
-        # 设置读出模式
-        readout_mode_index = data['readout_mode']
-        ret = self.qhyccddll.SetQHYCCDReadMode(camhandle, readout_mode_index) 
-        if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['set_readout_mode_failed'],sys._getframe().f_lineno)
-            return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_readout_mode_success']}:{readout_mode_index}"})
-        # 设置单帧模式
-        ret = self.qhyccddll.SetQHYCCDStreamMode(camhandle, 0) 
-        if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['set_stream_mode_failed'],sys._getframe().f_lineno)
-            return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_stream_mode_success']}"})
-        # 初始化相机
-        ret = self.qhyccddll.InitQHYCCD(camhandle) 
-        if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['init_camera_failed'],sys._getframe().f_lineno)
-            return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['init_camera_success']}"})
-        # 获取当前读出模式分辨率
-        image_w = ctypes.c_uint32()
-        image_h = ctypes.c_uint32()
-        ret = self.qhyccddll.GetQHYCCDReadModeResolution(camhandle, readout_mode_index,byref(image_w), byref(image_h)) 
-        if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['get_resolution_failed'],sys._getframe().f_lineno)
+        if data['name'] not in self.camera_ids.keys():
+            self.plan_row_failed(data, f"{translations[self.language]['qhyccd_sdk']['open_camera_failed']}: {data['name']}")
             return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['get_resolution_success']}:{image_w.value}*{image_h.value}"})
-        # 设置分辨率
-        ret = self.qhyccddll.SetQHYCCDResolution(camhandle, 0, 0, image_w.value, image_h.value) 
-        if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['set_resolution_failed'],sys._getframe().f_lineno)
+        start = time.perf_counter()
+        camera = self.open_plan_camera(data['name'])
+        if camera is None:
+            self.plan_row_failed(data)
             return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_resolution_success']}:{image_w.value}*{image_h.value}"})
-        # 设置曝光    
-        ret = self.qhyccddll.SetQHYCCDParam(camhandle, CONTROL_ID.CONTROL_EXPOSURE.value, data['exposure']) 
-        if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['set_exposure_failed'],sys._getframe().f_lineno)
+        camhandle = camera['camhandle']
+        settings = camera['settings']
+        readout_mode_index = data['readout_mode']
+        reinit = settings.get('readout_mode') != readout_mode_index
+        if reinit:
+            # 切换读出模式需要重新初始化，初始化会重置其他参数；初始化期间停止采样该相机
+            settings.clear()
+            self.update_telemetry_camera()
+            # 设置读出模式
+            ret = self.qhyccddll.SetQHYCCDReadMode(camhandle, readout_mode_index) 
+            if ret != 0:
+                self.plan_row_failed(data, translations[self.language]['qhyccd_sdk']['set_readout_mode_failed'])
+                self.close_plan_camera(data['name'])
+                return
+            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_readout_mode_success']}:{readout_mode_index}"})
+            # 设置单帧模式
+            ret = self.qhyccddll.SetQHYCCDStreamMode(camhandle, 0) 
+            if ret != 0:
+                self.plan_row_failed(data, translations[self.language]['qhyccd_sdk']['set_stream_mode_failed'])
+                self.close_plan_camera(data['name'])
+                return
+            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_stream_mode_success']}"})
+            # 初始化相机
+            ret = self.qhyccddll.InitQHYCCD(camhandle) 
+            if ret != 0:
+                self.plan_row_failed(data, translations[self.language]['qhyccd_sdk']['init_camera_failed'])
+                self.close_plan_camera(data['name'])
+                return
+            settings['readout_mode'] = readout_mode_index
+            self.update_telemetry_camera()
+            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['init_camera_success']}"})
+        # 滤镜轮在后台移动，期间配置分辨率、曝光等参数，到位后由命令循环继续曝光，其他命令不被阻塞
+        self.abort_plan_row()
+        self.plan_row_id += 1
+        row_id = self.plan_row_id
+        self.plan_row = {'id': row_id, 'camhandle': camhandle, 'data': data, 'waiting': set(), 'cfw_wait': 0.0, 'gate_wait': 0.0}
+        if data.get('temperature_gate'):
+            # 温度门限与滤镜轮移动同时等待
+            gate = self.start_temperature_gate(camhandle, data['temperature_gate'], lambda result: self.on_plan_gate(row_id, result))
+            if gate is not None:
+                self.plan_row['gate'] = gate
+                self.plan_row['waiting'].add('gate')
+        if data['CFW'] != 'None':
+            self.plan_row['waiting'].add('cfw')
+            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_CFW_moving']}:{data['CFW']}"})
+            self.cfw_manager.move(self.qhyccddll, camhandle, int(data['CFW'], 16), data['name'], lambda result: self.on_plan_CFW_moved(row_id, result), use_order=False)
+        image_size = self.configure_plan_row(camhandle, data, readout_mode_index, settings)
+        if image_size is None:
+            self.abort_plan_row()
+            self.plan_row_failed(data)
+            self.close_plan_camera(data['name'])
+            return
+        self.plan_row['image_size'] = image_size
+        self.plan_row['configured'] = time.perf_counter()
+        self.plan_row['setup'] = self.plan_row['configured'] - start
+        self.plan_row['reinit'] = reinit
+        if not self.plan_row['waiting']:
+            self.run_plan_exposure({'row': row_id, 'ok': True, 'duration': 0.0, 'error': None, 'wait': None})
+
+    def open_plan_camera(self, camera_name):
+        """计划执行期间每台相机只打开一次，记录已设置的参数，后续行只设置变化的参数"""
+        camera = self.plan_cameras.get(camera_name)
+        if camera is not None:
+            return camera
+        if self.camhandle != 0:
+            if self.preview_thread is not None:
+                self.preview_thread.set_pause(True)
+            self.detach_telemetry()
+            ret = self.qhyccddll.CloseQHYCCD(self.camhandle) 
+            self.camhandle = 0
+            self.camera_initialized = False
+            if ret != QHYCCD_SUCCESS:
+                self._report_error(translations[self.language]['qhyccd_sdk']['close_camera_failed'],sys._getframe().f_lineno)
+                return
+        camhandle = self.qhyccddll.OpenQHYCCD(self.camera_ids[camera_name]) 
+        if not camhandle:
+            self._report_error(translations[self.language]['qhyccd_sdk']['open_camera_failed'],sys._getframe().f_lineno)
             return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_exposure_success']}:{data['exposure']}us"})
-        # 设置增益
-        ret = self.qhyccddll.SetQHYCCDParam(camhandle, CONTROL_ID.CONTROL_GAIN.value, data['gain']) 
-        if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['set_gain_failed'],sys._getframe().f_lineno)
+        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['open_camera']}{camera_name}"})
+        camera = {'camhandle': camhandle, 'settings': {}}
+        self.plan_cameras[camera_name] = camera
+        return camera
+
+    def close_plan_camera(self, camera_name):
+        camera = self.plan_cameras.pop(camera_name, None)
+        if camera is None or self.qhyccddll is None:
+            return
+        self.detach_telemetry()
+        ret = self.qhyccddll.CloseQHYCCD(camera['camhandle']) 
+        self.update_telemetry_camera()
+        if ret != QHYCCD_SUCCESS:
+            self._report_error(translations[self.language]['qhyccd_sdk']['close_camera_failed'],sys._getframe().f_lineno)
             return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_gain_success']}:{data['gain']}"})
-        # 设置偏移
-        ret = self.qhyccddll.SetQHYCCDParam(camhandle, CONTROL_ID.CONTROL_OFFSET.value, data['offset']) 
-        if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['set_offset_failed'],sys._getframe().f_lineno)
+        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['close_camera_success']}:{camera_name}"})
+
+    def release_plan_cameras(self, data):
+        """计划结束时关闭计划中打开的所有相机，等待图像写完"""
+        self.abort_plan_row()
+        if self.plan_writer is not None:
+            self.plan_writer.flush()
+        for camera_name in list(self.plan_cameras.keys()):
+            self.close_plan_camera(camera_name)
+
+    def update_telemetry_camera(self):
+        """遥测采样计划中已初始化的相机，没有时采样当前连接的相机；未完成 InitQHYCCD 的句柄不登记"""
+        if self.telemetry is None:
             return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_offset_success']}:{data['offset']}"})
-        # 设置位数
-        ret = self.qhyccddll.SetQHYCCDParam(camhandle, CONTROL_ID.CONTROL_TRANSFERBIT.value, data['depth']) 
-        if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['set_depth_failed'],sys._getframe().f_lineno)
+        camhandles = [camera['camhandle'] for camera in self.plan_cameras.values() if 'readout_mode' in camera['settings']]
+        if camhandles:
+            camhandle = camhandles[0]
+        else:
+            camhandle = self.camhandle if self.camera_initialized else 0
+        self.telemetry.set_camera(self.qhyccddll, camhandle)
+
+    def detach_telemetry(self):
+        """关闭句柄前停止采样，等待进行中的采样结束"""
+        if self.telemetry is not None:
+            self.telemetry.set_camera(None, 0)
+
+    def start_temperature_gate(self, camhandle, gate, callback):
+        """按 {'tolerance', 'hold', 'timeout', 'setpoint'} 登记温度门限；gate 给出设定值时先设置制冷目标，
+        否则使用最近一次设置的目标温度。没有设定值时不等待，返回 None"""
+        setpoint = gate.get('setpoint')
+        if setpoint is not None:
+            ret = self.qhyccddll.SetQHYCCDParam(camhandle, CONTROL_ID.CONTROL_COOLER.value, setpoint) 
+            if ret != 0:
+                self._report_error(translations[self.language]['qhyccd_sdk']['set_temperature_failed'],sys._getframe().f_lineno)
+            else:
+                self.temperature_setpoint = setpoint
+                self.telemetry.setpoint = setpoint
+        else:
+            setpoint = self.temperature_setpoint
+        if setpoint is None:
+            self.output_queue.put({"order":"tip","data":translations[self.language]['qhyccd_sdk']['temperature_gate_no_setpoint']})
             return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_depth_success']}:{data['depth']}"})
-        order = 'None'
-        if data['CFW'] != 'None':
-            order = ord(data['CFW'])
-            ret = self.qhyccddll.SetQHYCCDParam(camhandle, CONTROL_ID.CONTROL_CFWPORT.value, order) 
+        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['temperature_gate_waiting']}: {setpoint:.1f}±{gate['tolerance']:.1f}°C, {gate['hold']:.0f}s"})
+        return self.telemetry.wait_stable(setpoint, gate['tolerance'], gate['hold'], gate.get('timeout', 0), callback)
+
+    def configure_plan_row(self, camhandle, data, readout_mode_index, settings):
+        """设置计划行的分辨率、曝光、增益、偏移和位数，与上一行相同的参数跳过，返回图像宽高，失败返回 None"""
+        if 'image_size' not in settings:
+            # 获取当前读出模式分辨率
+            image_w = ctypes.c_uint32()
+            image_h = ctypes.c_uint32()
+            ret = self.qhyccddll.GetQHYCCDReadModeResolution(camhandle, readout_mode_index,byref(image_w), byref(image_h)) 
             if ret != 0:
-                self._report_error(translations[self.language]['qhyccd_sdk']['set_CFW_failed'],sys._getframe().f_lineno)
+                self._report_error(translations[self.language]['qhyccd_sdk']['get_resolution_failed'],sys._getframe().f_lineno)
                 return
-            while True:
-                is_exposing_done = self.qhyccddll.GetQHYCCDParam(camhandle, CONTROL_ID.CONTROL_CFWPORT.value) 
-                if is_exposing_done == order:
-                    break
-                else:
-                    self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_CFW_moving']}:{is_exposing_done}"})
-                    time.sleep(0.1)
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_CFW_success']}:{order}"})
-        # 开始曝光
-        ret = self.qhyccddll.ExpQHYCCDSingleFrame(camhandle) 
+            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['get_resolution_success']}:{image_w.value}*{image_h.value}"})
+            # 设置分辨率
+            ret = self.qhyccddll.SetQHYCCDResolution(camhandle, 0, 0, image_w.value, image_h.value) 
+            if ret != 0:
+                self._report_error(translations[self.language]['qhyccd_sdk']['set_resolution_failed'],sys._getframe().f_lineno)
+                return
+            settings['image_size'] = (image_w.value, image_h.value)
+            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_resolution_success']}:{image_w.value}*{image_h.value}"})
+        # 设置曝光、增益、偏移和位数
+        for key, control, name, unit in (('exposure', CONTROL_ID.CONTROL_EXPOSURE, 'exposure', 'us'),
+                                         ('gain', CONTROL_ID.CONTROL_GAIN, 'gain', ''),
+                                         ('offset', CONTROL_ID.CONTROL_OFFSET, 'offset', ''),
+                                         ('depth', CONTROL_ID.CONTROL_TRANSFERBIT, 'depth', '')):
+            if settings.get(key) == data[key]:
+                continue
+            ret = self.qhyccddll.SetQHYCCDParam(camhandle, control.value, data[key]) 
+            if ret != 0:
+                self._report_error(translations[self.language]['qhyccd_sdk'][f'set_{name}_failed'],sys._getframe().f_lineno)
+                return
+            settings[key] = data[key]
+            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk'][f'set_{name}_success']}:{data[key]}{unit}"})
+        return settings['image_size']
+
+    def on_plan_CFW_moved(self, row_id, result):
+        # 在滤镜轮监视线程中回调，交回命令循环继续曝光
+        result['row'] = row_id
+        result['wait'] = 'cfw'
+        self.input_queue.put({"order":"run_plan_exposure","data":result})
+
+    def on_plan_gate(self, row_id, result):
+        # 在遥测线程中回调，交回命令循环继续曝光
+        result['row'] = row_id
+        result['wait'] = 'gate'
+        self.input_queue.put({"order":"run_plan_exposure","data":result})
+
+    def abort_plan_row(self):
+        """放弃等待中的计划行并停止滤镜轮监视，相机由 release_plan_cameras 关闭"""
+        row = self.plan_row
+        self.plan_row = None
+        if row is None:
+            return
+        self.cfw_manager.cancel()
+        if row.get('gate') is not None:
+            self.telemetry.cancel(row['gate'])
+        if row.get('exposing'):
+            # 多帧行的下一帧已在曝光
+            self.qhyccddll.CancelQHYCCDExposingAndReadout(row['camhandle']) 
+            self.exposure_progress.end('plan')
+
+    def plan_row_failed(self, data, error=None):
+        """计划行无法完成时通知界面，该步骤记为失败，调度继续同一相机的后续行；error 为 None 时错误已经报告过"""
+        if error is not None:
+            self._report_error(error,sys._getframe(1).f_lineno)
+        self.output_queue.put({"order":"runPlan_failed","data":{'plan_row': data.get('step', data.get('row')), 'name': data['name'], 'error': error}})
+
+    def run_plan_exposure(self, result):
+        row = self.plan_row
+        if row is None or row['id'] != result['row'] or 'image_size' not in row:
+            return  # 已放弃的计划行
+        data = row['data']
+        wait = result.get('wait', 'cfw')
+        if not result['ok']:
+            self.abort_plan_row()
+            if wait == 'gate':
+                self.plan_row_failed(data, f"{translations[self.language]['qhyccd_sdk']['temperature_gate_timeout']}: {result['duration']:.0f}s")
+                return
+            message = 'set_CFW_timeout' if result['error'] == 'timeout' else 'set_CFW_failed'
+            self.plan_row_failed(data, f"{translations[self.language]['qhyccd_sdk'][message]}: {data['CFW']}")
+            return
+        if wait == 'cfw':
+            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['set_CFW_success']}:{data['CFW']} ({result['duration']:.2f}s)"})
+            # 配置完成后等待滤镜轮到位的时间
+            row['cfw_wait'] = time.perf_counter() - row['configured']
+        elif wait == 'gate':
+            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['temperature_gate_stable']}:{result['temperature']:.1f}°C ({result['duration']:.1f}s)"})
+            row['gate_wait'] = result['duration']
+            row['gate'] = None
+        row['waiting'].discard(wait)
+        if row['waiting']:
+            return  # 滤镜轮或温度尚未就绪
+        # 配置完成到开始曝光的等待，滤镜轮和温度门限同时等待时取较长者
+        row['wait'] = time.perf_counter() - row['configured']
+        row['count'] = max(1, int(data.get('count', 1)))
+        row['frames_done'] = set(data.get('frames_done', ()))  # 从日志继续时跳过已完成的帧
+        row['frame'] = min(first_missing(row['frames_done']), row['count'] - 1)
+        row['shot'] = 0
+        row['exposure_total'] = 0.0
+        row['readout_total'] = 0.0
+        if self.start_plan_frame(row):
+            self.run_plan_frame({'row': row['id']})
+
+    def start_plan_frame(self, row):
+        """开始计划行下一帧的曝光，失败时放弃该行"""
+        data = row['data']
+        self.beat(data['exposure'] / 1e6)
+        self.exposure_progress.begin('plan', data['exposure'] / 1e6)
+        row['exposure_start'] = time.perf_counter()
+        row['exposure_wall'] = time.time()
+        ret = self.qhyccddll.ExpQHYCCDSingleFrame(row['camhandle']) 
         if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['exposure_failed'],sys._getframe().f_lineno)
-            return  # 如果启动失败，直接返回避免进一步阻塞
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['exposure_success']}"})
-        image_w = image_w.value
-        image_h = image_h.value
+            self.exposure_progress.end('plan')
+            self.plan_row = None
+            self.plan_row_failed(data, translations[self.language]['qhyccd_sdk']['exposure_failed'])
+            self.close_plan_camera(data['name'])
+            return False
+        row['exposing'] = True
+        if row['shot'] == 0:
+            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['exposure_success']}"})
+        return True
+
+    def run_plan_frame(self, data):
+        """读出计划行的一帧（内部命令）
+
+        还有剩余帧时读出后立即开始下一帧曝光，本帧的转换、写盘和发送与下一帧的曝光重叠；
+        每帧之间交回命令循环，放弃计划行的命令可以及时处理。最后一帧发送 runPlan_success，之前的帧发送 runPlan_frame。
+        """
+        row = self.plan_row
+        if row is None or row['id'] != data['row'] or not row.get('exposing'):
+            return  # 已放弃的计划行
+        camhandle = row['camhandle']
+        data = row['data']
+        exposure_start = row['exposure_start']
+        exposure_wall = row['exposure_wall']
+        image_w, image_h = row['image_size']
         image_c = 1
         image_b = data['depth']
-        length = image_w * image_h * image_c * (image_b // 8)
-        # 获取单帧图像数据
+        # 获取单帧图像数据，读出前命令循环阻塞约一个曝光时间
         w = ctypes.c_uint32()
         h = ctypes.c_uint32()
         b = ctypes.c_uint32()
         c = ctypes.c_uint32()
         length = int(image_h * image_w * image_c * (image_b // 8))
+        row['exposing'] = False
 
-        imgdata = (ctypes.c_ubyte * length)()
-      
-        ret = self.qhyccddll.GetQHYCCDSingleFrame(camhandle, byref(w), byref(h), byref(b), byref(c), imgdata) 
+        if data.get('save'):
+            # 直接写盘时读出到独立的缓冲区交给写盘线程，界面只收到缩略图和文件信息
+            buffer = np.empty(length, dtype=np.uint8)
+            ret = self.qhyccddll.GetQHYCCDSingleFrame(camhandle, byref(w), byref(h), byref(b), byref(c), (ctypes.c_ubyte * length).from_buffer(buffer)) 
+        else:
+            # 直接读出到共享内存槽，队列中只发送描述；下一帧已在曝光，相邻两帧使用不同的槽。
+            # 命令循环不能等待界面读完，槽内的帧序号由界面读取时核对，已被覆盖的帧拒绝读取
+            slot = self.plan_slot if row['frame'] % 2 else self.frame_slot
+            with slot.lock:
+                imgdata = slot.buffer(length)
+                ret = self.qhyccddll.GetQHYCCDSingleFrame(camhandle, byref(w), byref(h), byref(b), byref(c), imgdata) 
+                del imgdata
+                if ret == 0:
+                    frame = slot.descriptor(w.value, h.value, b.value, c.value, False)
+        self.exposure_progress.end('plan')
         if ret != 0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['get_single_frame_failed'],sys._getframe().f_lineno)
+            self.plan_row = None
+            self.plan_row_failed(data, translations[self.language]['qhyccd_sdk']['get_single_frame_failed'])
+            self.close_plan_camera(data['name'])
             return  # 如果获取失败，直接返回避免进一步阻塞
+        exposure = data['exposure'] / 1e6
+        row['exposure_total'] += exposure
+        row['readout_total'] += max(time.perf_counter() - exposure_start - exposure, 0.0)
+        index = row['frame']
+        row['shot'] += 1
+        row['frame'] = first_missing(row['frames_done'], index + 1)
+        last = row['frame'] >= row['count']
+        # 下一帧无法开始时该行已记为失败，本帧照常保存和发送
+        failed = not last and not self.start_plan_frame(row)
+        journal = data.get('journal')
+        record = frame_record(journal, data, index) if journal else None
+        if data.get('save'):
+            shape = (h.value, w.value, c.value) if c.value == 3 else (h.value, w.value)
+            image = buffer.view(np.uint16 if b.value == 16 else np.uint8)[:int(np.prod(shape))].reshape(shape)
+            if c.value == 3:
+                image = image[:, :, ::-1]  # 将 BGR 转换为 RGB
+            file_path = self.plan_writer.submit(image, data['save'], plan_fields(data, exposure_wall, index), plan_header(data, exposure_wall, image, index, self.telemetry.latest),
+                                                (journal['path'], record) if journal else None)
+            frame = {'thumbnail': thumbnail(image), 'file': file_path, 'shape': shape, 'name': data['name']}
+        elif journal:
+            # 只发回界面的帧读出后即记为完成
+            try:
+                append_record(journal['path'], record)
+            except OSError as e:
+                self._report_error(f"{translations[self.language]['qhyccd_sdk']['plan_journal_failed']}: {e}",sys._getframe().f_lineno)
+        frame['plan_row'] = data.get('step', data.get('row'))  # 计划的执行步骤，多台相机并行时据此确认完成的步骤
+        frame['frame'] = index
+        frame['count'] = row['count']
+        if not last:
+            self.output_queue.put({"order":"runPlan_frame","data":frame})
+            if not failed:
+                self.input_queue.put({"order":"run_plan_frame","data":{'row': row['id']}})
+            return
+        self.plan_row = None
+        readout = row['readout_total']
+        # 每行的额外耗时（打开和配置相机、等待滤镜轮、读出）与曝光时间分开统计，多帧时为各帧之和
+        frames = row['shot']
+        frame['timing'] = {'setup': row['setup'], 'cfw_wait': row['cfw_wait'], 'gate_wait': row['gate_wait'], 'readout': readout, 'exposure': row['exposure_total'],
+                           'overhead': row['setup'] + row['wait'] + readout, 'frames': frames}
+        self.plan_timing.record(data['name'], data['readout_mode'], data['depth'], dict(frame['timing'], readout=readout / frames), row['reinit'])
         self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['get_single_frame_success']}"})
-
-        img_size = w.value * h.value * c.value * (b.value // 8)
-            
-        # 将临时缓冲区转换为 numpy 数组
-        img = np.ctypeslib.as_array(imgdata, shape=(img_size,))
-        
-        # 根据通道数处理图像
-        if c.value == 3:  # 彩色图像
-            img = img.reshape((h.value, w.value, c.value))
-            img = img[:, :, ::-1]  # 将 BGR 转换为 RGB
-        else:  # 灰度或其他格式
-            img = img.reshape((h.value, w.value)) if b.value != 16 else img.view(np.uint16).reshape((h.value, w.value))
-
-        ret = self.qhyccddll.CloseQHYCCD(camhandle) 
-        if ret<0:
-            self._report_error(translations[self.language]['qhyccd_sdk']['close_camera_failed'],sys._getframe().f_lineno)
-            return
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['close_camera_success']}:{data['name']}"})
-        self.output_queue.put({"order":"runPlan_success","data":img})
+        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['run_plan_success']}{translations[self.language]['qhyccd_sdk']['plan_row_overhead']}:{frame['timing']['overhead']:.3f}s ({translations[self.language]['qhyccd_sdk']['plan_row_setup']} {row['setup']:.3f}s, CFW {row['cfw_wait']:.3f}s, {translations[self.language]['qhyccd_sdk']['temperature_gate']} {row['gate_wait']:.1f}s, {translations[self.language]['qhyccd_sdk']['plan_row_readout']} {readout:.3f}s, {translations[self.language]['qhyccd_sdk']['plan_row_frames']} {frames})"})
+        self.output_queue.put({"order":"runPlan_success","data":frame})
         
     def get_is_temperature_control(self,data):
         if self.qhyccddll is None:
@@ -1212,7 +1465,7 @@ class QHYCCDSDK(multiprocessing.Process):
             self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
             return
         current_temp = self.qhyccddll.GetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_CURTEMP.value) 
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['get_temperature_success']}: {current_temp}"})
+        self.status.emit(GET_TEMPERATURE, current_temp)
         self.output_queue.put({"order":"getTemperature_success","data":current_temp})
         
     def set_temperature(self,data):
@@ -1223,7 +1476,11 @@ class QHYCCDSDK(multiprocessing.Process):
         if ret != 0:
             self._report_error(translations[self.language]['qhyccd_sdk']['set_temperature_failed'],sys._getframe().f_lineno)
             return
+        self.temperature_setpoint = data
+        if self.telemetry is not None:
+            self.telemetry.setpoint = data
         self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['set_temperature_success']}: {data}"})
+        self.output_queue.put({"order":"setTemperature_success","data":data})
         
     def get_auto_exposure_is_available(self,data):
         if self.qhyccddll is None:
@@ -1322,7 +1579,7 @@ class QHYCCDSDK(multiprocessing.Process):
             self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
             return
         exposure_value = self.qhyccddll.GetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_EXPOSURE.value) 
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['get_exposure_value_success']}: {exposure_value}"})
+        self.status.emit(GET_EXPOSURE_VALUE, exposure_value)
         self.output_queue.put({"order":"getExposureValue_success","data":exposure_value})
         
     def get_auto_white_balance_is_available(self,data):
@@ -1363,7 +1620,7 @@ class QHYCCDSDK(multiprocessing.Process):
             return
         ret = self.qhyccddll.SetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_EXPOSURE.value, data) 
         if ret == 0:
-            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['set_exposure_time_success']}: {data}"})
+            self.status.emit(SET_EXPOSURE_TIME, data)
             self.output_queue.put({"order":"setExposureTime_success","data":data})
         else:
             self._report_error(translations[self.language]['qhyccd_sdk']['set_exposure_time_failed'],sys._getframe().f_lineno)
@@ -1375,7 +1632,7 @@ class QHYCCDSDK(multiprocessing.Process):
             return
         ret = self.qhyccddll.SetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_GAIN.value, data) 
         if ret == 0:
-            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['set_gain_success']}: {data}"})
+            self.status.emit(SET_GAIN, data)
             self.output_queue.put({"order":"setGain_success","data":data})
         else:
             self._report_error(translations[self.language]['qhyccd_sdk']['set_gain_failed'],sys._getframe().f_lineno)
@@ -1387,7 +1644,7 @@ class QHYCCDSDK(multiprocessing.Process):
             return
         ret = self.qhyccddll.SetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_OFFSET.value, data) 
         if ret == 0:    
-            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['set_offset_success']}: {data}"})
+            self.status.emit(SET_OFFSET, data)
             self.output_queue.put({"order":"setOffset_success","data":data})
         else:
             self._report_error(translations[self.language]['qhyccd_sdk']['set_offset_failed'],sys._getframe().f_lineno)
@@ -1399,11 +1656,78 @@ class QHYCCDSDK(multiprocessing.Process):
             return  
         ret = self.qhyccddll.SetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_USBTRAFFIC.value, data) 
         if ret == 0:
-            self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['set_usb_traffic_success']}: {data}"})
+            self.status.emit(SET_USB_TRAFFIC, data)
             self.output_queue.put({"order":"setUsbTraffic_success","data":data})
         else:
             self._report_error(translations[self.language]['qhyccd_sdk']['set_usb_traffic_failed'],sys._getframe().f_lineno)
             return
+
+    def auto_tune_usb(self, data):
+        """data 为 {'traffic': [...], 'readout_modes': [...], 'depths': [...], 'duration': 秒, 'use_cache': bool, 'apply': bool}，均可省略
+
+        默认只在当前读出模式和位深下扫描 USB 流量。相机、主机、扫描范围、ROI 和曝光都相同时直接使用缓存的结果。
+        """
+        if self.qhyccddll is None:
+            self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
+            return
+        data = data or {}
+        if getattr(self, 'stream_and_capture_mode_dict', {}).get(getattr(self, 'camera_mode', None)) != 1:
+            self._report_error(translations[self.language]['qhyccd_sdk']['usb_tune_need_live'],sys._getframe().f_lineno)
+            self.output_queue.put({"order":"autoTuneUSB_failed","data":None})
+            return
+        if (self.preview_thread is not None and self.preview_thread.is_alive()) or (self.usb_tuner is not None and self.usb_tuner.is_alive()):
+            self._report_error(translations[self.language]['qhyccd_sdk']['usb_tune_busy'],sys._getframe().f_lineno)
+            self.output_queue.put({"order":"autoTuneUSB_failed","data":None})
+            return
+        modes = list(data.get('readout_modes') or [self.readout_mode])
+        depths = [int(depth) for depth in data['depths']] if data.get('depths') else [None]
+        traffic = [float(value) for value in data['traffic']] if data.get('traffic') else traffic_candidates(self.getParamlimit(CONTROL_ID.CONTROL_USBTRAFFIC.value))
+        signature = {'readout_modes': modes, 'depths': depths, 'traffic': traffic, 'resolution': list(self.resolution) if self.resolution else None,
+                     'exposure': self.qhyccddll.GetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_EXPOSURE.value), 'gps': bool(self.GPS_control)}
+        self.usb_tune_request = {'signature': signature, 'apply': data.get('apply', True)}
+        if data.get('use_cache', True):
+            entry = self.usb_tuning.get(self.camera_name, signature)
+            if entry is not None:
+                self.usb_tune_done({'results': entry['results'], 'best': entry['best'], 'canceled': False, 'error': None, 'cached': True})
+                return
+        candidates = [(mode, depth, value) for mode in modes for depth in depths for value in traffic]
+        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['usb_tune_start']}: {len(candidates)}"})
+        self.usb_tuner = USBTrafficTuner(self.camhandle, self.qhyccddll, candidates, self.readout_mode_name_dict, self.readout_mode, self.resolution,
+                                         self.GPS_control, self.output_queue, lambda result: self.input_queue.put({'order': 'usb_tune_done', 'data': result}),
+                                         duration=float(data.get('duration', 2.0)))
+        self.usb_tuner.start()
+
+    def usb_tune_done(self, result):
+        self.usb_tuner = None
+        request = self.usb_tune_request
+        if request is None:
+            return
+        self.usb_tune_request = None
+        best = result['best']
+        if result['error'] is not None or result['canceled'] or best is None:
+            message = translations[self.language]['qhyccd_sdk']['usb_tune_no_stable' if best is None and result['error'] is None else 'usb_tune_failed']
+            self._report_error(f"{message}: {result['error']}" if result['error'] else message, sys._getframe().f_lineno)
+            self.output_queue.put({"order":"autoTuneUSB_failed","data":result})
+            return
+        if not result.get('cached'):
+            self.usb_tuning.put(self.camera_name, {'signature': request['signature'], 'best': best, 'results': result['results'],
+                                                   'time': time.strftime('%Y-%m-%dT%H:%M:%S')})
+        if request['apply']:
+            if best['depth'] is not None:
+                self.set_camera_depth(best['depth'])
+            self.set_usb_traffic(best['traffic'])
+            if best['readout_mode'] != self.readout_mode:
+                # 切换读出模式需要重新初始化相机，交由界面处理
+                self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['usb_tune_readout_mode']}: {best['readout_mode']}"})
+        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['usb_tune_success']}: {best['traffic']:g}, {best['fps']:.2f} fps"})
+        self.output_queue.put({"order":"autoTuneUSB_success","data":{'camera': self.usb_tuning.key(self.camera_name), 'best': best,
+                                                                   'results': result['results'], 'cached': bool(result.get('cached'))}})
+
+    def stop_usb_tuner(self):
+        if self.usb_tuner is not None:
+            self.usb_tuner.stop()
+            self.usb_tuner.join(5)
+            self.usb_tuner = None
             
     def set_white_balance(self,data):
         if self.qhyccddll is None:
@@ -1422,49 +1746,62 @@ class QHYCCDSDK(multiprocessing.Process):
         if ret != 0:
             self._report_error(f"{translations[self.language]['debug']['set_qhyccd_blue_gain_failed']}: {ret}",sys._getframe().f_lineno)
             blue = -1
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['set_white_balance_success']}: r={red}, g={green}, b={blue}"})
+        self.status.emit(SET_WHITE_BALANCE, red, green, blue)
         self.output_queue.put({"order":"setWhiteBalance_success","data":(red, green, blue)})
             
     def set_CFW_filter(self, data):
-        # 创建并启动线程
-        thread = threading.Thread(target=self._set_CFW_filter_thread, args=(data,))
-        thread.start()
-
-    def _set_CFW_filter_thread(self, data):
         if self.qhyccddll is None:
             self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
             return
         CFW_id = data
-        order = self.CFW_number_ids[CFW_id].encode('utf-8')
-        ret = self.qhyccddll.SendOrder2QHYCCDCFW(self.camhandle, c_char_p(order), len(order))  
-        if ret == 0:
-            while True:
-                is_moving_done = self.qhyccddll.GetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_CFWPORT.value)  
-                if is_moving_done == ord(order):
-                    break
-                else:
-                    time.sleep(0.1)
-            self.output_queue.put({"order": "tip", "data": f"{translations[self.language]['qhyccd_sdk']['set_CFW_filter_success']}: {CFW_id}"})
+        # 由滤镜轮管理在后台等待到位，命令循环不被阻塞
+        self.cfw_manager.move(self.qhyccddll, self.camhandle, int(self.CFW_number_ids[CFW_id], 16), self.camera_name,
+                              lambda result: self.on_CFW_filter_moved(CFW_id, result))
+
+    def on_CFW_filter_moved(self, CFW_id, result):
+        if result['ok']:
+            self.output_queue.put({"order": "tip", "data": f"{translations[self.language]['qhyccd_sdk']['set_CFW_filter_success']}: {CFW_id} ({result['duration']:.2f}s)"})
             self.output_queue.put({"order": "setCFWFilter_success", "data": CFW_id})
         else:
-            self._report_error(translations[self.language]['qhyccd_sdk']['set_CFW_filter_failed'], sys._getframe().f_lineno)
+            message = 'set_CFW_timeout' if result['error'] == 'timeout' else 'set_CFW_filter_failed'
+            self._report_error(translations[self.language]['qhyccd_sdk'][message], sys._getframe().f_lineno)
+            self.output_queue.put({"order": "setCFWFilter_failed", "data": CFW_id})
+
+    def get_cfw_move_times(self, data):
+        """孔位间移动耗时记录，{相机: {"起始->目标": (平均秒数, 次数)}}"""
+        self.output_queue.put({"order": "getCFWMoveTimes_success", "data": self.cfw_manager.move_times})
     
     def start_preview(self, data):
         w, h, c, depth, exposure_time, gain, offset, debayer_mode = data
         self.preview_thread = PreviewThread(self.camhandle, self.qhyccddll, w, h, c, depth, self.shm1_name, self.shm2_name, self.output_queue,self.language)
+        self.preview_thread.set_realtime(dict(self.realtime_config, own_process=self.own_process) if self.realtime_config else None)
         self.preview_thread.handle_start()
         
     def stop_preview(self,data):
         if self.preview_thread is not None:
             self.preview_thread.handle_stop()
         
+    def set_realtime_mode(self, data):
+        """data 为 {'cpus': [...], 'priority': int, 'gc_control': bool, 'lock_memory': bool}，None 为关闭"""
+        self.realtime_config = data or None
+        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['set_realtime_mode_success']}: {self.realtime_config}"})
+        self.output_queue.put({"order":"setRealtimeMode_success","data":self.realtime_config})
+
+    def get_preview_timing(self, data):
+        timing = self.preview_thread.timing_stats() if self.preview_thread is not None else None
+        self.output_queue.put({"order":"previewTiming_success","data":timing})
+
     def update_preview_pause(self, data):
         if self.preview_thread is not None:
             self.preview_thread.set_pause(data) 
             
     def update_shared_image_data(self, data):
         w, h, c, b = data
-        if self.preview_thread is not None:
+        if self.external_trigger_thread is not None:
+            # 外触发期间预览线程保持暂停，只更新触发线程的缓冲池
+            self.external_trigger_thread.set_image_data((w, h, c, b))
+            self.output_queue.put({"order":"updateSharedImageData_success","data":(w,h,c,b)})
+        elif self.preview_thread is not None:
             self.preview_thread.update_image_parameters(w, h, c, b)
         
     def clear_fps_data(self,data):
@@ -1473,22 +1810,56 @@ class QHYCCDSDK(multiprocessing.Process):
             
     def single_capture(self,data):
         image_w, image_h, image_c, camera_bit = data
-        self.capture_thread = CaptureThread(self.camhandle, self.qhyccddll, image_w, image_h, image_c, camera_bit, self.GPS_control,self.output_queue, self.language)
+        self.capture_thread = CaptureThread(self.camhandle, self.qhyccddll, image_w, image_h, image_c, camera_bit, self.GPS_control,self.output_queue, self.frame_slot, self.exposure_progress, self.language)
         self.capture_thread.start()
-        
-    def get_single_capture_status(self,data):
+
+    def sequence_capture(self,data):
         if self.qhyccddll is None:
             self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
             return
-        elapsed_time = self.qhyccddll.GetQHYCCDExposureRemaining(self.camhandle) 
-        if elapsed_time == -1:
-            elapsed_time = 0
-        self.output_queue.put({"order":"singleCapture_status","data":elapsed_time})
+        if self.sequence_thread is not None and self.sequence_thread.is_alive():
+            # 旧线程结束前仍可能写同一组槽，确认结束后才开始新的序列
+            if not self.sequence_thread.stop(SEQUENCE_STOP_TIMEOUT):
+                self._report_error(translations[self.language]['qhyccd_sdk']['sequence_stop_timeout'],sys._getframe().f_lineno)
+                self.output_queue.put({"order":"sequenceCapture_failed","data":None})
+                return
+        gate = data.get('temperature_gate')
+        if gate:
+            setpoint = gate.get('setpoint')
+            if setpoint is not None:
+                self.set_temperature(setpoint)
+            elif self.temperature_setpoint is not None:
+                gate = dict(gate, setpoint=self.temperature_setpoint)
+            else:
+                self.output_queue.put({"order":"tip","data":translations[self.language]['qhyccd_sdk']['temperature_gate_no_setpoint']})
+                gate = None
+        # 上一次序列中接收端未读完的帧不再等待释放
+        for slot in self.sequence_slots:
+            slot.release()
+        self.sequence_thread = SequenceCaptureThread(self.camhandle, self.qhyccddll, data['image_data'], data['count'], self.GPS_control, self.output_queue,
+                                                     self.sequence_slots, data.get('save'), self.exposure_progress, self.language,
+                                                     temperature_gate=gate, telemetry=self.telemetry)
+        self.sequence_thread.start()
+
+    def release_frame_slot(self, data):
+        for slot in self.sequence_slots:
+            if slot.slot_id == data['slot_id']:
+                slot.release(data['sequence'])
         
+    def set_exposure_progress_rate(self,data):
+        # 曝光进行中每秒推送 data 次 exposure_progress
+        if self.exposure_progress is not None:
+            self.exposure_progress.set_rate(data)
+
     def cancel_capture(self,data):
         if self.qhyccddll is None:
             self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
             return
+        if self.sequence_thread is not None and self.sequence_thread.is_alive():
+            self.sequence_thread.stop()
+            self.sequence_thread = None
+        self.stop_usb_tuner()
+        self.abort_plan_row()
         self.qhyccddll.CancelQHYCCDExposingAndReadout(self.camhandle) 
         
     def set_image_buffer(self,data):
@@ -1506,17 +1877,29 @@ class QHYCCDSDK(multiprocessing.Process):
         trigger_interface_id = self.trigger_interface_names[trigger_interface]
         if self.external_trigger_thread is None:
             self.preview_thread.set_pause(True)
-            self.external_trigger_thread = ExternalTriggerThread(self.camhandle, self.qhyccddll,self.output_queue,trigger_interface_id,use_trigger_output,image_data,self.language)
+            self.telemetry.set_paused(True)  # 等待触发期间不读取相机参数
+            self.external_trigger_thread = ExternalTriggerThread(self.camhandle, self.qhyccddll,self.output_queue,trigger_interface_id,use_trigger_output,image_data,self.shm1_name,self.shm2_name,self.GPS_control,self.language)
             self.external_trigger_thread.start()
 
     def stop_external_trigger(self,data):
         if self.external_trigger_thread is not None:
             self.external_trigger_thread.stop()
+            self.external_trigger_timing = self.external_trigger_thread.timing_stats()
             self.external_trigger_thread = None
+            self.telemetry.set_paused(False)
+            latency = self.external_trigger_timing['trigger_latency']
+            if latency is not None:
+                self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['external_trigger_timing']}: n={self.external_trigger_timing['count']} p50={latency['p50']:.2f} p99={latency['p99']:.2f} max={latency['max']:.2f}"})
             if self.preview_thread is not None:
                 self.preview_thread.set_pause(False)
             self.output_queue.put({"order":"stopExternalTrigger_success","data":''})
             
+    def get_external_trigger_timing(self,data):
+        timing = self.external_trigger_timing
+        if self.external_trigger_thread is not None:
+            timing = self.external_trigger_thread.timing_stats()
+        self.output_queue.put({"order":"externalTriggerTiming_success","data":timing})
+
     def get_external_trigger_status(self,data):
         if self.qhyccddll is None:
             self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
@@ -1601,10 +1984,17 @@ class QHYCCDSDK(multiprocessing.Process):
             self._report_error(translations[self.language]['qhyccd_sdk']['not_found_sdk'],sys._getframe().f_lineno)
             return
         humidity = self.qhyccddll.GetQHYCCDParam(self.camhandle, CONTROL_ID.CAM_HUMIDITY.value)
-        if humidity == -1:
+        if humidity == QHYCCD_ERROR:
             humidity = 0
-        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['get_humidity_success']}: {humidity}"})
+        self.status.emit(GET_HUMIDITY, humidity)
         self.output_queue.put({"order":"getHumidity_success","data":humidity})
+
+    def set_telemetry_rate(self,data):
+        self.telemetry.set_rate(data)
+        self.output_queue.put({"order":"setTelemetryRate_success","data":self.telemetry.rate})
+
+    def get_telemetry_ring(self,data):
+        self.output_queue.put({"order":"telemetry_ring","data":self.telemetry_ring.descriptor()})
         
         
     def start_save_video(self,data):
@@ -0,0 +1,159 @@
+import ctypes
+import ctypes.util
+import gc
+import os
+import threading
+import time
+
+import numpy as np
+
+_libc = None
+
+
+def load_libc():
+    global _libc
+    if _libc is None and os.name == 'posix':
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    return _libc
+
+
+def interval_stats(samples):
+    """间隔样本（毫秒）的分布，无样本时返回 None"""
+    if not samples:
+        return None
+    values = np.asarray(samples)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'min': float(values.min()), 'p50': float(p50), 'p90': float(p90), 'p99': float(p99),
+            'max': float(values.max()), 'std': float(values.std())}
+
+
+class RealtimeMode:
+    """采集线程的实时调度设置
+
+    apply 必须在采集线程内调用：绑定到 cpus 指定的核心，按 priority 提升调度优先级
+    （优先 SCHED_FIFO，无权限时退回降低 nice 值），冻结已有对象并关闭自动垃圾回收，
+    改由采集循环每帧调用 collect 回收。垃圾回收设置作用于整个进程，own_process 为 False
+    （SDK 与界面同一进程）时不接管。lock 用 mlock 锁定帧缓冲，避免换页。
+    每一项失败只记录在报告中，不影响采集。restore 恢复原设置。
+    """
+
+    collect_interval = 0.1  # 持续出帧时至少每隔这么多秒回收一次（秒）
+
+    def __init__(self, cpus=None, priority=None, gc_control=True, lock_memory=True, own_process=True):
+        self.cpus = set(cpus) if cpus else None
+        self.priority = priority
+        self.gc_control = gc_control
+        self.lock_memory = lock_memory
+        self.own_process = own_process
+        self.last_collect = 0.0
+        self.report = {'cpus': None, 'priority': None, 'gc': False, 'locked': 0, 'errors': []}
+        self.old_affinity = None
+        self.old_scheduler = None
+        self.old_nice = None
+        self.gc_was_enabled = False
+        self.locked = []
+
+    def apply(self):
+        if self.cpus and hasattr(os, 'sched_setaffinity'):
+            try:
+                self.old_affinity = os.sched_getaffinity(0)
+                os.sched_setaffinity(0, self.cpus)
+                self.report['cpus'] = sorted(self.cpus)
+            except OSError as e:
+                self.report['errors'].append(f"affinity: {e}")
+        if self.priority:
+            self.raise_priority()
+        if self.gc_control and not self.own_process:
+            self.report['errors'].append("gc: shared process, not disabled")
+        elif self.gc_control:
+            self.last_collect = time.monotonic()
+            self.gc_was_enabled = gc.isenabled()
+            gc.collect()
+            gc.freeze()
+            gc.disable()
+            self.report['gc'] = True
+        return self.report
+
+    def raise_priority(self):
+        if hasattr(os, 'sched_setscheduler'):
+            try:
+                self.old_scheduler = (os.sched_getscheduler(0), os.sched_getparam(0))
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(int(self.priority)))
+                self.report['priority'] = f"SCHED_FIFO {int(self.priority)}"
+                return
+            except (OSError, ValueError) as e:
+                self.old_scheduler = None
+                self.report['errors'].append(f"SCHED_FIFO: {e}")
+        if hasattr(os, 'setpriority'):
+            # Linux 上以线程号设置 nice 值只影响本线程
+            try:
+                tid = threading.get_native_id()
+                self.old_nice = (tid, os.getpriority(os.PRIO_PROCESS, tid))
+                os.setpriority(os.PRIO_PROCESS, tid, -10)
+                self.report['priority'] = "nice -10"
+            except OSError as e:
+                self.old_nice = None
+                self.report['errors'].append(f"nice: {e}")
+
+    def lock(self, buffers):
+        """buffers 为可写的缓冲区（如 SharedMemory.buf）"""
+        libc = load_libc()
+        if not self.lock_memory or libc is None:
+            return
+        for buffer in buffers:
+            view = np.frombuffer(buffer, dtype=np.uint8)
+            address = view.ctypes.data
+            length = view.nbytes
+            del view
+            if libc.mlock(ctypes.c_void_p(address), ctypes.c_size_t(length)) == 0:
+                self.locked.append((address, length))
+                self.report['locked'] += length
+            else:
+                self.report['errors'].append(f"mlock: {os.strerror(ctypes.get_errno())}")
+
+    def collect(self, idle):
+        """按原来的阈值分代回收。idle 为 True 表示正在等待下一帧，随时可以回收；
+        否则每隔 collect_interval 秒才回收一次，未达到阈值时也至少回收第 0 代"""
+        if not self.report['gc']:
+            return
+        now = time.monotonic()
+        if not idle and now - self.last_collect < self.collect_interval:
+            return
+        counts = gc.get_count()
+        thresholds = gc.get_threshold()
+        for generation in (2, 1, 0):
+            if thresholds[generation] and counts[generation] >= thresholds[generation]:
+                break
+        else:
+            if idle:
+                return
+            generation = 0
+        gc.collect(generation)
+        self.last_collect = now
+
+    def restore(self):
+        libc = load_libc()
+        for address, length in self.locked:
+            libc.munlock(ctypes.c_void_p(address), ctypes.c_size_t(length))
+        self.locked = []
+        if self.report['gc']:
+            gc.unfreeze()
+            if self.gc_was_enabled:
+                gc.enable()
+        if self.old_scheduler is not None:
+            policy, param = self.old_scheduler
+            try:
+                os.sched_setscheduler(0, policy, param)
+            except OSError:
+                pass
+        if self.old_nice is not None:
+            tid, nice = self.old_nice
+            try:
+                os.setpriority(os.PRIO_PROCESS, tid, nice)
+            except OSError:
+                pass
+        if self.old_affinity is not None:
+            try:
+                os.sched_setaffinity(0, self.old_affinity)
+            except OSError:
+                pass
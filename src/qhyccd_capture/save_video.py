@@ -1,13 +1,43 @@
 import cv2
 import os
+import threading
 from concurrent.futures import ThreadPoolExecutor
-from PyQt5.QtCore import QThread, pyqtSignal
 from datetime import datetime
 from astropy.io import fits
 import numpy as np
 from .language import translations
 
-class SaveThread(QThread):
+
+def apply_fits_header(header, fits_header, language):
+    """把 FITS 头编辑器的数据 {关键字: {'value', 'description'}} 写入 header，数字字符串转换为数字"""
+    if fits_header is None:
+        return
+    for key, header_item in fits_header.items():
+        if key == 'SIMPLE' or key == 'EXTEND':
+            continue  # SIMPLE 关键字通常由FITS库自动处理
+        # 尝试将值转换为适当的格式
+        if isinstance(header_item['value'], str):
+            try:
+                # 尝试转换为整数
+                value = int(header_item['value'])
+            except ValueError:
+                try:
+                    # 尝试转换为浮点数
+                    value = float(header_item['value'])
+                except ValueError:
+                    # 保留为字符串
+                    value = header_item['value']
+        else:
+            value = header_item['value']
+
+        header[key] = value  # 设置头信息的关键字和值
+
+        # 添加描述信息到头文件，如果有的话
+        if 'description' in header_item and language == "en":
+            header.comments[key] = header_item['description']
+
+
+class SaveThread(threading.Thread):
 
     def __init__(self, output_buffer, buffer_queue, file_path, file_name, file_format, save_mode, fps,language,jpeg_quality = 100,tiff_compression = 0,fits_header = None,num_threads=4):
         super().__init__()
@@ -110,31 +140,7 @@ class SaveThread(QThread):
             if file_format.lower() == 'fits':
                 # 创建FITS HDU对象
                 hdu = fits.PrimaryHDU(imgdata_np)
-                # 假设 self.fits_header 是一个字典，包含要添加到FITS头的键值对
-                if self.fits_header is not None:
-                    for key, header_item in self.fits_header.items():
-                        if key == 'SIMPLE' or key == 'EXTEND':
-                            continue  # SIMPLE 关键字通常由FITS库自动处理
-                        # 尝试将值转换为适当的格式
-                        if isinstance(header_item['value'], str):
-                            try:
-                                # 尝试转换为整数
-                                value = int(header_item['value'])
-                            except ValueError:
-                                try:
-                                    # 尝试转换为浮点数
-                                    value = float(header_item['value'])
-                                except ValueError:
-                                    # 保留为字符串
-                                    value = header_item['value']
-                        else:
-                            value = header_item['value']
-                        
-                        hdu.header[key] = value  # 设置头信息的关键字和值
-                        
-                        # 添加描述信息到头文件，如果有的话
-                        if 'description' in header_item and self.language == "en":
-                            hdu.header.comments[key] = header_item['description']
+                apply_fits_header(hdu.header, self.fits_header, self.language)
                 # 写入文件
                 try:
                     hdu.writeto(file_path, overwrite=True)
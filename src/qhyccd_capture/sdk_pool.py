@@ -0,0 +1,103 @@
+from .sdk_thread import create_queue, create_sdk
+
+
+class CameraTaggedQueue:
+    """给 SDK 进程输出的每条消息附加相机 ID，多个工作进程可共用一个输出通道"""
+
+    def __init__(self, queue, camera_id, shared=False):
+        self.queue = queue
+        self.camera_id = camera_id
+        self.shared = shared
+
+    def put(self, item, *args, **kwargs):
+        item['camera_id'] = self.camera_id
+        self.queue.put(item, *args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        return self.queue.get(*args, **kwargs)
+
+    def get_nowait(self):
+        return self.queue.get_nowait()
+
+    def empty(self):
+        # 共享通道中还有其他相机的消息，不允许单个工作进程清空
+        return True if self.shared else self.queue.empty()
+
+    def qsize(self):
+        return self.queue.qsize()
+
+
+class SDKWorker:
+    """单台相机独占的 SDK 工作进程，拥有独立的命令通道和帧缓冲
+
+    backend 为 'thread' 时在本进程的线程中运行同一命令循环，命令和帧不跨进程传递。
+    """
+
+    def __init__(self, camera_id, output_queue=None, language='en', backend='process'):
+        self.camera_id = camera_id
+        self.language = language
+        self.backend = backend
+        self.input_queue = create_queue(backend)
+        shared = output_queue is not None
+        self.output_queue = output_queue if shared else create_queue(backend)
+        self.process = create_sdk(backend, self.input_queue, CameraTaggedQueue(self.output_queue, camera_id, shared), language)
+
+    def start(self, sdk_path=None):
+        """启动进程并完成资源初始化和相机扫描，之后即可按相机 ID 下发命令"""
+        self.process.start()
+        self.put('init_qhyccd_resource', sdk_path or '')
+        self.put('read_camera_name', '')
+
+    def put(self, order, data):
+        self.input_queue.put({'order': order, 'data': data})
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def stop(self, timeout=5.0):
+        if self.process.is_alive():
+            self.put('stop', '')
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class SDKWorkerPool:
+    """按相机 ID 管理 SDK 工作进程，每台相机一个进程，可在不同核心上并行曝光和读出"""
+
+    def __init__(self, output_queue=None, language='en', sdk_path=None, progress_rate=0.0, backend='process'):
+        self.output_queue = output_queue
+        self.language = language
+        self.backend = backend
+        self.sdk_path = sdk_path
+        self.progress_rate = progress_rate  # 新进程的曝光进度推送频率，0 为不推送
+        self.workers = {}
+
+    def __contains__(self, camera_id):
+        return camera_id in self.workers
+
+    def __getitem__(self, camera_id):
+        return self.workers[camera_id]
+
+    def start_worker(self, camera_id):
+        """获取相机对应的工作进程，不存在或已退出时重新创建"""
+        worker = self.workers.get(camera_id)
+        if worker is None or not worker.is_alive():
+            worker = SDKWorker(camera_id, self.output_queue, self.language, self.backend)
+            worker.start(self.sdk_path)
+            if self.progress_rate > 0:
+                worker.put('set_exposure_progress_rate', self.progress_rate)
+            self.workers[camera_id] = worker
+        return worker
+
+    def put(self, camera_id, order, data):
+        self.start_worker(camera_id).put(order, data)
+
+    def stop_worker(self, camera_id):
+        worker = self.workers.pop(camera_id, None)
+        if worker is not None:
+            worker.stop()
+
+    def stop(self):
+        for camera_id in list(self.workers.keys()):
+            self.stop_worker(camera_id)
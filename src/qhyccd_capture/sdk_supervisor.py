@@ -0,0 +1,236 @@
+import collections
+import multiprocessing
+import os
+import threading
+import time
+
+from .language import translations
+from .sdk_thread import create_queue, create_sdk
+
+# 重启后需要重放的命令，后下发的排在后面，同名命令只保留最后一次
+GLOBAL_ORDERS = ('init_qhyccd_resource', 'read_camera_name', 'set_image_buffer', 'set_exposure_progress_rate', 'set_realtime_mode')
+CAMERA_ORDERS = ('open_camera', 'init_camera', 'set_camera_pixel_bin', 'set_camera_depth', 'update_debayer_mode',
+                 'set_resolution', 'update_resolution', 'set_exposure_time', 'set_gain', 'set_offset', 'set_usb_traffic',
+                 'set_white_balance', 'set_temperature', 'set_GPS_control')
+PREVIEW_ORDERS = ('start_preview', 'update_shared_image_data', 'set_preview_pause')
+# 重放期间照常转发的回复：错误，以及新进程启动时发出的遥测环形缓冲区
+REPLAY_FORWARD_ORDERS = ('error', 'telemetry_ring')
+
+
+class ReplayQueue:
+    """SDK 命令队列，记录最近的相机配置，SDK 进程重启后按下发顺序重放
+
+    每条命令带递增的 seq，SDK 取出命令时把 seq 写入 consumed；尚未取出的命令另存一份，
+    进程失效后从这份记录重新下发，不需要从失效进程的队列中取回。
+    """
+
+    def __init__(self, queue=None):
+        self.queue = queue if queue is not None else multiprocessing.Queue()
+        self.lock = threading.RLock()
+        self.orders = {}  # 命令 -> 最近一次的参数，保持下发顺序
+        self.stopping = False
+        self.supervisor = None  # 当前负责的监视线程，重新初始化后旧的监视线程退出
+        self.seq = 0
+        self.consumed = multiprocessing.Value('q', 0, lock=False)  # SDK 最近取出的命令序号
+        self.sent = collections.deque()  # 已下发、可能尚未被 SDK 取出的命令
+
+    def put(self, item, *args, **kwargs):
+        with self.lock:
+            self.record(item['order'], item['data'])
+            self.seq += 1
+            item = dict(item, seq=self.seq)
+            self.trim()
+            self.sent.append(item)
+            self.queue.put(item, *args, **kwargs)
+
+    def trim(self):
+        while self.sent and self.sent[0]['seq'] <= self.consumed.value:
+            self.sent.popleft()
+
+    def pending_items(self):
+        """SDK 尚未取出的命令，按下发顺序"""
+        with self.lock:
+            self.trim()
+            return list(self.sent)
+
+    def record(self, order, data):
+        if order == 'stop':
+            self.stopping = True
+            self.orders.clear()
+        elif order == 'init_qhyccd_resource':
+            self.discard(CAMERA_ORDERS + PREVIEW_ORDERS + ('read_camera_name',))
+        elif order == 'close_camera':
+            self.discard(CAMERA_ORDERS + PREVIEW_ORDERS)
+        elif order in ('open_camera', 'init_camera'):
+            # 切换相机后之前的参数不再适用
+            self.discard(CAMERA_ORDERS[CAMERA_ORDERS.index(order):] + PREVIEW_ORDERS)
+        elif order == 'stop_preview':
+            self.discard(PREVIEW_ORDERS)
+        if order in GLOBAL_ORDERS or order in CAMERA_ORDERS or order in PREVIEW_ORDERS:
+            self.orders.pop(order, None)
+            self.orders[order] = data
+
+    def discard(self, orders):
+        for order in orders:
+            self.orders.pop(order, None)
+
+    def replay_items(self):
+        with self.lock:
+            return [{'order': order, 'data': data} for order, data in self.orders.items()]
+
+    def get(self, *args, **kwargs):
+        return self.taken(self.queue.get(*args, **kwargs))
+
+    def get_nowait(self):
+        return self.taken(self.queue.get_nowait())
+
+    def taken(self, item):
+        # 由界面清空的命令同样不再重新下发
+        if item is not None and 'seq' in item:
+            self.consumed.value = max(self.consumed.value, item['seq'])
+        return item
+
+    def empty(self):
+        return self.queue.empty()
+
+    def qsize(self):
+        return self.queue.qsize()
+
+
+class ReplayOutputQueue:
+    """重放期间只转发错误和新的遥测缓冲区，其余回复丢弃，界面不会把重放的结果当作新的操作处理"""
+
+    def __init__(self, queue, heartbeat_seq, replay_seq):
+        self.queue = queue
+        self.heartbeat_seq = heartbeat_seq
+        self.replay_seq = replay_seq
+
+    def put(self, item, *args, **kwargs):
+        if item['order'] not in REPLAY_FORWARD_ORDERS and self.heartbeat_seq.value < self.replay_seq.value:
+            return
+        self.queue.put(item, *args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        return self.queue.get(*args, **kwargs)
+
+    def get_nowait(self):
+        return self.queue.get_nowait()
+
+    def empty(self):
+        return self.queue.empty()
+
+    def qsize(self):
+        return self.queue.qsize()
+
+
+class SDKSupervisor(threading.Thread):
+    """监视 SDK 进程
+
+    进程退出或心跳超时即判定为失效，终止后重新创建进程，重新挂接共享内存并重放最近的相机配置。
+    重放完成（进程确认最后一个心跳序号）的耗时作为恢复时间，以 sdk_recovered 发送给界面。
+    期间界面下发的命令保留在队列中，在重放之后执行。进程内后端只在线程退出后重启，卡死时只提示。
+    """
+
+    def __init__(self, input_queue, output_queue, language='en', hang_timeout=15.0, check_interval=0.5, recovery_timeout=30.0, max_restarts=5, restart_window=60.0, backend='process'):
+        super().__init__(daemon=True)
+        self.input_queue = input_queue if isinstance(input_queue, ReplayQueue) else ReplayQueue(input_queue)
+        self.output_queue = output_queue
+        self.language = language
+        self.backend = backend
+        self.hang_timeout = hang_timeout
+        self.check_interval = check_interval
+        self.recovery_timeout = recovery_timeout
+        self.max_restarts = max_restarts  # restart_window 秒内超过该次数不再重启，避免重放的配置反复导致崩溃
+        self.restart_window = restart_window
+        self.replay_seq = multiprocessing.Value('i', 0, lock=False)
+        self.process = None
+        self.restarts = []
+        self.recovery_times = []
+        self.hang_reported = False
+        self.running = True
+
+    def start(self):
+        self.input_queue.stopping = False
+        self.input_queue.supervisor = self
+        self.process = self.spawn()
+        super().start()
+
+    def spawn(self):
+        process = create_sdk(self.backend, self.input_queue.queue, self.output_queue, self.language)
+        process.command_seq = self.input_queue.consumed
+        process.output_queue = ReplayOutputQueue(self.output_queue, process.heartbeat_seq, self.replay_seq)
+        process.start()
+        return process
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def sdk_pid(self):
+        """当前 SDK 所在进程的 pid，与遥测缓冲区描述中的 pid 对照；进程内后端为本进程"""
+        if self.backend == 'process':
+            return self.process.pid if self.process is not None else None
+        return os.getpid()
+
+    def failure(self):
+        """返回失效原因，正常时返回 None"""
+        if not self.process.is_alive():
+            return 'exited'
+        heartbeat = self.process.heartbeat.value
+        if heartbeat and time.monotonic() - heartbeat > self.hang_timeout + self.process.heartbeat_grace.value:
+            return 'hung'
+        return None
+
+    def stopping(self):
+        return not self.running or self.input_queue.stopping or self.input_queue.supervisor is not self
+
+    def run(self):
+        while not self.stopping():
+            time.sleep(self.check_interval)
+            reason = self.failure()
+            if reason is None:
+                self.hang_reported = False
+                continue
+            if self.stopping():
+                return
+            if reason == 'hung' and not getattr(self.process, 'restartable', True):
+                if not self.hang_reported:
+                    self.hang_reported = True
+                    self.output_queue.put({"order":"error","data":translations[self.language]['qhyccd_sdk']['sdk_thread_hung']})
+                continue
+            now = time.monotonic()
+            self.restarts = [t for t in self.restarts if now - t < self.restart_window] + [now]
+            if len(self.restarts) > self.max_restarts:
+                self.output_queue.put({"order":"error","data":translations[self.language]['qhyccd_sdk']['sdk_restart_limit']})
+                return
+            self.recover(reason)
+
+    def recover(self, reason):
+        start = time.monotonic()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(5)
+        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['sdk_restarting']}: {reason}"})
+        with self.input_queue.lock:
+            # 界面在失效期间下发的命令排到重放之后。被终止的进程可能持有旧队列的读锁，不再从旧队列取命令，
+            # 按记录重新下发尚未被取出的命令，并换用新队列
+            pending = self.input_queue.pending_items()
+            self.input_queue.queue = create_queue(self.backend)
+            self.replay_seq.value += 1
+            seq = self.replay_seq.value
+            self.process = self.spawn()
+            for item in self.input_queue.replay_items():
+                self.input_queue.queue.put(item)
+            self.input_queue.queue.put({'order': 'heartbeat', 'data': seq})
+            for item in pending:
+                self.input_queue.queue.put(item)
+        while self.process.heartbeat_seq.value < seq:
+            if not self.process.is_alive() or time.monotonic() - start > self.recovery_timeout:
+                return
+            time.sleep(0.01)
+        recovery_time = time.monotonic() - start
+        self.recovery_times.append(recovery_time)
+        self.output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['sdk_recovered']}: {recovery_time:.2f}s"})
+        self.output_queue.put({"order":"sdk_recovered","data":{'reason': reason, 'recovery_time': recovery_time, 'restarts': len(self.recovery_times)}})
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,58 @@
+import multiprocessing
+import queue
+import threading
+
+from .qhyccd_sdk import QHYCCDSDK
+
+SDK_BACKENDS = ('process', 'thread')
+
+
+class QHYCCDSDKThread(QHYCCDSDK):
+    """在本进程的专用线程中运行 SDK 命令循环
+
+    与 QHYCCDSDK 进程使用同一个命令表和 {"order","data"} 协议，提供相同的 start/is_alive/join/terminate，
+    可直接替换 SDK 进程。命令和应答经 queue.Queue 按引用传递，不经过序列化和管道；单帧结果的共享内存对象
+    和遥测环形缓冲区随描述直接交给接收端，不再按名称重新映射。代价是 SDK 崩溃会连同本进程退出，卡死的命令也无法强制终止。
+    """
+
+    restartable = False  # 卡死时无法终止线程，监视线程不做重启
+    own_process = False  # 与界面同一进程，实时模式不接管整个进程的垃圾回收
+
+    def __init__(self, input_queue, output_queue, language):
+        super().__init__(input_queue, output_queue, language)
+        for slot in [self.frame_slot, self.plan_slot] + self.sequence_slots:
+            slot.handoff = True
+        self.telemetry_handoff = True
+        self.thread = threading.Thread(target=self.run, name='QHYCCDSDK', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+
+    def terminate(self):
+        # 线程不能被外部终止，只能在当前命令返回后退出循环
+        self.is_running = False
+
+    def kill(self):
+        self.terminate()
+
+
+def create_sdk(backend, input_queue, output_queue, language):
+    """按后端名称创建 SDK 进程或线程，两者的命令和应答完全相同"""
+    if backend == 'thread':
+        return QHYCCDSDKThread(input_queue, output_queue, language)
+    if backend == 'process':
+        return QHYCCDSDK(input_queue, output_queue, language)
+    raise ValueError(f"unknown SDK backend: {backend}, expected one of {SDK_BACKENDS}")
+
+
+def create_queue(backend):
+    """进程内后端只需线程队列，对象按引用传递"""
+    if backend == 'thread':
+        return queue.Queue()
+    return multiprocessing.Queue()
@@ -0,0 +1,167 @@
+import ctypes
+import queue
+import threading
+import time
+from ctypes import byref
+
+import numpy as np
+
+from .control_id import CONTROL_ID
+from .language import translations
+from .qhyccd_dll import QHYCCD_SUCCESS
+from .save_video import SaveThread
+
+
+class SequenceCaptureThread(threading.Thread):
+    """单帧模式连续拍摄 N 帧
+
+    读出完成后立即开始下一次曝光，上一帧的转换、保存和发送在工作线程中并行进行。
+    读出使用预分配的缓冲池，工作线程处理完才归还，处理跟不上时曝光等待空闲缓冲。
+    每帧写入轮流使用的共享内存槽，队列中只发送描述；槽在接收端发回 release_frame_slot 之前不再写入，接收端跟不上时处理线程等待。
+    给出 temperature_gate 时先由遥测线程等待温度稳定再开始第一次曝光。
+    """
+
+    def __init__(self, camhandle, qhyccddll, image_data, count, GPS_control, sdk_output_queue, frame_slots, save=None, exposure_progress=None, language='en', pool_size=3,
+                 temperature_gate=None, telemetry=None):
+        super().__init__()
+        self.camhandle = camhandle
+        self.qhyccddll = qhyccddll
+        self.image_w, self.image_h, self.image_c, self.camera_bit = image_data
+        self.count = count
+        self.GPS_control = GPS_control
+        self.sdk_output_queue = sdk_output_queue
+        self.frame_slots = frame_slots
+        self.save = save
+        self.exposure_progress = exposure_progress
+        self.language = language
+        self.temperature_gate = temperature_gate  # {'setpoint', 'tolerance', 'hold', 'timeout'}
+        self.telemetry = telemetry
+        self.gate_wait = 0.0
+        self.running = threading.Event()
+        self.running.set()
+        length = int(self.image_h * self.image_w * self.image_c * (self.camera_bit // 8))
+        if self.GPS_control:
+            length += 44
+        self.free_buffers = queue.Queue()
+        for _ in range(pool_size):
+            self.free_buffers.put((ctypes.c_ubyte * length)())
+        self.frame_queue = queue.Queue()
+        self.save_queue = None
+        self.save_thread = None
+        self.worker = threading.Thread(target=self.process_frames)
+        # 每帧曝光开始（调用 ExpQHYCCDSingleFrame）和读出结束的时间
+        self.exposure_start = []
+        self.readout_end = []
+
+    def run(self):
+        if self.save is not None:
+            self.start_save_thread()
+        self.worker.start()
+        exposure = self.qhyccddll.GetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_EXPOSURE.value) / 1e6
+        w, h, b, c = ctypes.c_uint32(), ctypes.c_uint32(), ctypes.c_uint32(), ctypes.c_uint32()
+        try:
+            if not self.wait_temperature():
+                self.running.clear()  # 不开始曝光，照常结束并发送统计
+            for index in range(self.count):
+                imgdata = self.free_buffers.get()
+                if not self.running.is_set():
+                    break
+                self.exposure_start.append(time.perf_counter())
+                if self.exposure_progress is not None:
+                    self.exposure_progress.begin('sequence', exposure, index, self.count)
+                ret = self.qhyccddll.ExpQHYCCDSingleFrame(self.camhandle)
+                if ret != QHYCCD_SUCCESS:
+                    self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['debug']['exp_qhyccd_single_frame_failed']}: {ret}"})
+                    break
+                ret = self.qhyccddll.GetQHYCCDSingleFrame(self.camhandle, byref(w), byref(h), byref(b), byref(c), imgdata)
+                self.readout_end.append(time.perf_counter())
+                if not self.running.is_set():
+                    break
+                if ret != QHYCCD_SUCCESS:
+                    self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['debug']['get_qhyccd_single_frame_failed']}: {ret}"})
+                    break
+                self.frame_queue.put((index, imgdata, w.value, h.value, b.value, c.value))
+        finally:
+            if self.exposure_progress is not None:
+                self.exposure_progress.end('sequence')
+            self.frame_queue.put(None)
+            self.worker.join()
+            if self.save_thread is not None:
+                self.save_queue.put("end")
+                self.save_thread.join()
+        self.sdk_output_queue.put({"order":"sequenceCapture_success","data":self.timing_stats(exposure)})
+
+    def wait_temperature(self):
+        """等待温度稳定，超时或被停止时返回 False"""
+        gate = self.temperature_gate
+        if gate is None or self.telemetry is None:
+            return True
+        result = self.telemetry.wait_stable_blocking(gate['setpoint'], gate['tolerance'], gate['hold'], gate.get('timeout', 0), self.running)
+        if result is None:
+            return False
+        self.gate_wait = result['duration']
+        if not result['ok']:
+            self.sdk_output_queue.put({"order":"error","data":f"{translations[self.language]['qhyccd_sdk']['temperature_gate_timeout']}: {result['duration']:.0f}s"})
+            return False
+        self.sdk_output_queue.put({"order":"tip","data":f"{translations[self.language]['qhyccd_sdk']['temperature_gate_stable']}:{result['temperature']:.1f}°C ({result['duration']:.1f}s)"})
+        return True
+
+    def process_frames(self):
+        while True:
+            item = self.frame_queue.get()
+            if item is None:
+                return
+            index, imgdata, w, h, b, c = item
+            try:
+                if self.save_queue is not None:
+                    self.save_queue.put(self.to_image(imgdata, w, h, b, c).copy())
+                slot = self.frame_slots[index % len(self.frame_slots)]
+                if not slot.acquire(self.running):
+                    continue  # 已停止，不再发送
+                with slot.lock:
+                    buffer = slot.buffer(ctypes.sizeof(imgdata))
+                    ctypes.memmove(buffer, imgdata, ctypes.sizeof(imgdata))
+                    del buffer
+                    frame = slot.descriptor(w, h, b, c, self.GPS_control)
+            finally:
+                self.free_buffers.put(imgdata)
+            self.sdk_output_queue.put({"order":"sequenceCapture_frame","data":{"index":index,"count":self.count,"frame":frame}})
+
+    def to_image(self, imgdata, w, h, b, c):
+        dtype = np.uint16 if b == 16 else np.uint8
+        shape = (h, w, c) if c == 3 else (h, w)
+        offset = 44 if self.GPS_control else 0
+        img = np.frombuffer(imgdata, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+        if c == 3:
+            img = img[:, :, ::-1]  # 将 BGR 转换为 RGB
+        return img
+
+    def start_save_thread(self):
+        save = self.save
+        self.save_queue = queue.Queue()
+        save_mode = translations[self.language]["qhyccd_capture"]["single_frame_storage"]
+        self.save_thread = SaveThread(self.sdk_output_queue, self.save_queue, save['path'], save['file_name'], save['save_format'], save_mode, 0, self.language,
+                                      save.get('jpeg_quality', 100), save.get('tiff_compression', 0), save.get('fits_header'))
+        self.save_thread.start()
+
+    def timing_stats(self, exposure):
+        """占空比为曝光时间总和与整个序列耗时之比，间隔为上一帧读出结束到下一次曝光开始；间隔单位为毫秒，其余时间为秒"""
+        count = len(self.readout_end)
+        stats = {'count': count, 'exposure': exposure, 'elapsed': 0.0, 'duty_cycle': 0.0, 'gap_mean_ms': 0.0, 'gap_max_ms': 0.0, 'gate_wait': self.gate_wait}
+        if count == 0:
+            return stats
+        elapsed = self.readout_end[-1] - self.exposure_start[0]
+        gaps = [(start - end) * 1000 for start, end in zip(self.exposure_start[1:], self.readout_end)]
+        stats['elapsed'] = elapsed
+        stats['duty_cycle'] = min(count * exposure / elapsed, 1.0) if elapsed > 0 else 0.0
+        if gaps:
+            stats['gap_mean_ms'] = sum(gaps) / len(gaps)
+            stats['gap_max_ms'] = max(gaps)
+        return stats
+
+    def stop(self, timeout=None):
+        """返回线程是否已结束"""
+        self.running.clear()
+        self.qhyccddll.CancelQHYCCDExposingAndReadout(self.camhandle)
+        self.join(timeout)
+        return not self.is_alive()
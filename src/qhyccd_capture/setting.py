@@ -89,9 +89,13 @@ class SettingsDialog(QDialog):
                 settings = json.load(f)
                 self.qhyccd_path = settings.get("qhyccd_path", "")
                 self.language = settings.get("language", "en")
+                self.realtime_mode = settings.get("realtime_mode")  # 只在文件中配置，保存时原样保留
+                self.sdk_backend = settings.get("sdk_backend")
         else:
             self.qhyccd_path = ""
             self.language = "en"  # 默认语言
+            self.realtime_mode = None
+            self.sdk_backend = None
 
     def save_settings(self):
         current_language = self.language_combo.currentText()
@@ -99,6 +103,10 @@ class SettingsDialog(QDialog):
             "qhyccd_path": self.qhyccd_path_label.text(),
             "language": self.language_name[self.language_combo.currentText()]
         }
+        if self.realtime_mode:
+            settings["realtime_mode"] = self.realtime_mode
+        if self.sdk_backend:
+            settings["sdk_backend"] = self.sdk_backend
         with open(self.settings_file, 'w') as f:
             json.dump(settings, f)
         QMessageBox.information(self, translations[self.language]["setting"]["settings_saved"], translations[self.language]["setting"]["settings_saved_message"])  # 添加提示信息
@@ -0,0 +1,894 @@
+import ctypes
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .control_id import CONTROL_ID
+from .qhyccd_dll import QHYCCD_ERROR, QHYCCD_SUCCESS
+
+SIMULATOR_PREFIX = 'simulator'
+
+# GPS 时间从 1995-10-10 UTC 起算，与 parse_gps_data 一致
+GPS_EPOCH = datetime(1995, 10, 10, tzinfo=timezone.utc).timestamp()
+GPS_HEADER_SIZE = 44
+
+# 参数读写是高频调用，预先取出枚举值
+CAM_HUMIDITY = CONTROL_ID.CAM_HUMIDITY.value
+CAM_IS_COLOR = CONTROL_ID.CAM_IS_COLOR.value
+CONTROL_CFWPORT = CONTROL_ID.CONTROL_CFWPORT.value
+CONTROL_CFWSLOTSNUM = CONTROL_ID.CONTROL_CFWSLOTSNUM.value
+CONTROL_COOLER = CONTROL_ID.CONTROL_COOLER.value
+CONTROL_CURPWM = CONTROL_ID.CONTROL_CURPWM.value
+CONTROL_CURTEMP = CONTROL_ID.CONTROL_CURTEMP.value
+CONTROL_TRANSFERBIT = CONTROL_ID.CONTROL_TRANSFERBIT.value
+
+DEFAULT_CONFIG = {
+    'cameras': 1,               # 模拟相机数量
+    'model': '',                # 相机型号，留空时按是否彩色生成 QHY600M / QHY600C
+    'width': 1920,              # 传感器宽度
+    'height': 1080,             # 传感器高度
+    'depth': 16,                # 最大位深，支持 8 和 16
+    'bayer': '',                # 彩色相机的 Bayer 排列，例如 RGGB，留空为黑白相机
+    'pixel_size': 3.76,         # 像元尺寸（微米）
+    'readout_modes': 2,         # 读出模式数量
+    'readout_time': 0.05,       # 16 位全幅读出时间（秒）
+    'usb_traffic_cost': 0.01,   # 每级 USB 流量对读出时间的增量比例
+    'usb_drop_traffic': 0.0,    # USB 流量低于该值时按差值比例丢帧（帧序号照常递增），0 表示不丢帧
+    'exposure': 20000,          # 默认曝光时间（微秒）
+    'stars': 300,               # 星点数量
+    'fwhm': 2.5,                # 星点半高全宽（像素）
+    'sky': 50.0,                # 天光背景（e-/s）
+    'dark_current': 0.1,        # 0°C 时的暗电流（e-/s），每升高 6°C 翻倍
+    'read_noise': 3.0,          # 读出噪声（e-）
+    'seed': 0,                  # 随机种子，保证星场和噪声可复现
+    'gps': True,                # 是否支持 GPS 帧头
+    'latitude': 39.9,
+    'longitude': 116.4,
+    'cfw_slots': 7,             # 滤镜轮孔位数量，0 表示无滤镜轮
+    'cfw_move_time': 0.5,       # 滤镜轮每移动一个孔位的时间（秒）
+    'ambient': 20.0,            # 环境温度（°C）
+    'cooling_tau': 30.0,        # 制冷时间常数（秒）
+    'temp_drift': 0.05,         # 温度随机漂移（°C/√s）
+    'humidity': 35.0,           # 湿度（%）
+    'trigger_interval': 0.0,    # 外触发周期（秒），0 表示只响应软触发
+    'time_scale': 1.0,          # 曝光、读出、滤镜轮等耗时的缩放系数，0 表示不等待
+}
+
+
+def is_simulator_path(file_path):
+    return isinstance(file_path, str) and file_path.split(':', 1)[0] == SIMULATOR_PREFIX
+
+
+def parse_simulator_path(file_path):
+    """解析 simulator:width=3000,height=2000,bayer=RGGB 形式的路径为模拟器配置"""
+    config = dict(DEFAULT_CONFIG)
+    _, _, options = file_path.partition(':')
+    for item in options.split(','):
+        if not item.strip():
+            continue
+        key, _, value = item.partition('=')
+        key = key.strip()
+        if key not in config:
+            raise ValueError(f"unknown simulator option: {key}")
+        default = DEFAULT_CONFIG[key]
+        value = value.strip()
+        if isinstance(default, bool):
+            config[key] = value.lower() in ('1', 'true', 'yes', 'on')
+        elif isinstance(default, int):
+            config[key] = int(value)
+        elif isinstance(default, float):
+            config[key] = float(value)
+        else:
+            config[key] = value
+    return config
+
+
+_libraries = {}
+_libraries_lock = threading.Lock()
+
+
+def load_simulator(file_path):
+    """按路径返回模拟的 qhyccddll，同一进程内重复加载得到同一实例，相机状态在释放和重新初始化资源后保留"""
+    with _libraries_lock:
+        if file_path not in _libraries:
+            _libraries[file_path] = SimulatedQHYCCD(parse_simulator_path(file_path))
+        return _libraries[file_path]
+
+
+def _value(arg):
+    if isinstance(arg, (ctypes._SimpleCData, ctypes.Array)):
+        return arg.value
+    return arg
+
+
+def _store(ref, value):
+    """向 byref 或指针参数写回结果"""
+    if type(ref).__name__ == 'CArgObject':
+        ref._obj.value = value
+    elif isinstance(ref, ctypes._Pointer):
+        ref.contents.value = value
+    else:
+        ref.value = value
+
+
+def _write_buffer(dst, data):
+    """把帧数据拷贝到调用方提供的缓冲区，不超过缓冲区长度"""
+    data = np.ascontiguousarray(data)
+    size = data.nbytes
+    if isinstance(dst, ctypes.Array):
+        size = min(size, ctypes.sizeof(dst))
+        address = ctypes.addressof(dst)
+    elif isinstance(dst, ctypes._Pointer):
+        address = ctypes.cast(dst, ctypes.c_void_p).value
+    elif isinstance(dst, np.ndarray):
+        size = min(size, dst.nbytes)
+        address = dst.ctypes.data
+    else:
+        address = int(dst)
+    ctypes.memmove(address, data.ctypes.data, size)
+    return size
+
+
+class SimulatedFunction:
+    """模拟 ctypes 导出函数，可设置 argtypes/restype，返回值按 restype 转换"""
+
+    def __init__(self, func, name):
+        self.func = func
+        self.__name__ = name
+        self.argtypes = None
+        self.restype = ctypes.c_int
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        result = self.func(*args)
+        if self.restype is None:
+            return None
+        if isinstance(result, float) and not issubclass(self.restype, (ctypes.c_double, ctypes.c_float)):
+            # 未声明 restype 时 double 返回值被当作整数读取
+            result = int(result)
+        return self.restype(result).value
+
+
+class export:
+    """把方法导出为 SimulatedFunction，首次访问后缓存在实例上，与 CDLL 的属性行为一致"""
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        function = SimulatedFunction(self.func.__get__(obj), self.name)
+        obj.__dict__[self.name] = function
+        return function
+
+
+class SimulatedCamera:
+    """单台模拟相机的状态：参数、ROI、曝光与读出时序、星场、滤镜轮和温度"""
+
+    def __init__(self, index, config):
+        self.index = index
+        self.config = config
+        self.is_color = bool(config['bayer'])
+        model = config['model'] or ('QHY600C' if self.is_color else 'QHY600M')
+        self.camera_id = f"{model}-SIM{index:04d}"
+        self.width = config['width']
+        self.height = config['height']
+        self.lock = threading.RLock()
+        self.cancel_event = threading.Event()
+        self.trigger_event = threading.Event()
+        self.rng = np.random.default_rng(config['seed'] + index)
+        self.temp_rng = np.random.default_rng(config['seed'] + index + 1000)
+        self.sky_map = None
+        self.noise_bank = {}
+
+        self.params = {
+            CONTROL_ID.CONTROL_EXPOSURE.value: float(config['exposure']),
+            CONTROL_ID.CONTROL_GAIN.value: 0.0,
+            CONTROL_ID.CONTROL_OFFSET.value: 10.0,
+            CONTROL_ID.CONTROL_USBTRAFFIC.value: 20.0,
+            CONTROL_ID.CONTROL_TRANSFERBIT.value: float(config['depth']),
+            CONTROL_ID.CONTROL_COOLER.value: config['ambient'],
+            CONTROL_ID.CONTROL_MANULPWM.value: 0.0,
+            CONTROL_ID.CAM_GPS.value: 0.0,
+        }
+        self.limits = {
+            CONTROL_ID.CONTROL_EXPOSURE.value: (1.0, 3600.0e6, 1.0),
+            CONTROL_ID.CONTROL_GAIN.value: (0.0, 100.0, 1.0),
+            CONTROL_ID.CONTROL_OFFSET.value: (0.0, 255.0, 1.0),
+            CONTROL_ID.CONTROL_USBTRAFFIC.value: (0.0, 60.0, 1.0),
+            CONTROL_ID.CONTROL_TRANSFERBIT.value: (8.0, float(config['depth']), 8.0),
+            CONTROL_ID.CONTROL_COOLER.value: (-50.0, 50.0, 0.1),
+            CONTROL_ID.CONTROL_MANULPWM.value: (0.0, 255.0, 1.0),
+            CONTROL_ID.CAM_GPS.value: (0.0, 1.0, 1.0),
+        }
+        if self.is_color:
+            for control in (CONTROL_ID.CONTROL_WBR, CONTROL_ID.CONTROL_WBG, CONTROL_ID.CONTROL_WBB):
+                self.params[control.value] = 128.0
+                self.limits[control.value] = (0.0, 255.0, 1.0)
+        self.available = set(self.params) | {
+            CONTROL_ID.CONTROL_CURTEMP.value,
+            CONTROL_ID.CONTROL_CURPWM.value,
+            CONTROL_ID.CAM_BIN1X1MODE.value,
+            CONTROL_ID.CAM_BIN2X2MODE.value,
+            CONTROL_ID.CAM_BIN3X3MODE.value,
+            CONTROL_ID.CAM_BIN4X4MODE.value,
+            CONTROL_ID.CAM_SINGLEFRAMEMODE.value,
+            CONTROL_ID.CAM_LIVEVIDEOMODE.value,
+            CONTROL_ID.CAM_HUMIDITY.value,
+            CONTROL_ID.CAM_TRIGER_INTERFACE.value,
+        }
+        if not config['gps']:
+            self.available.discard(CONTROL_ID.CAM_GPS.value)
+        if self.is_color:
+            self.available.add(CONTROL_ID.CAM_IS_COLOR.value)
+        if config['cfw_slots'] > 0:
+            self.available.add(CONTROL_ID.CONTROL_CFWPORT.value)
+            self.available.add(CONTROL_ID.CONTROL_CFWSLOTSNUM.value)
+
+        self.is_open = False
+        self.read_mode = 0
+        self.stream_mode = 0
+        self.bin = (1, 1)
+        self.roi = (0, 0, self.width, self.height)
+        self.debayer = False
+        self.trigger_function = False
+        self.armed = False
+        self.trigger_epoch = 0.0
+        self.last_trigger = None
+        self.frame_count = 0
+
+        self.exposure_start = None
+        self.exposure_end = None
+        self.live = False
+        self.next_live_frame = 0.0
+
+        self.cfw_position = 0
+        self.cfw_target = 0
+        self.cfw_move_start = 0.0
+        self.cfw_move_end = 0.0
+
+        self.temperature = config['ambient']
+        self.temperature_time = time.monotonic()
+
+    # 时序
+    def scaled(self, seconds):
+        return seconds * self.config['time_scale']
+
+    def sleep_until(self, deadline):
+        """等待到指定时刻，期间可被取消，返回是否正常结束"""
+        while True:
+            remaining = deadline - time.monotonic()
+            if self.cancel_event.is_set():
+                return False
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, 0.01))
+
+    def exposure_seconds(self):
+        return self.params[CONTROL_ID.CONTROL_EXPOSURE.value] / 1e6
+
+    def readout_seconds(self):
+        """读出时间与像素数、位深成正比，USB 流量越大越慢"""
+        _, _, w, h = self.roi
+        fraction = (w * h * self.channels() * self.depth() / 8) / (self.width * self.height * 2)
+        traffic = self.params[CONTROL_ID.CONTROL_USBTRAFFIC.value]
+        return self.config['readout_time'] * fraction * (1 + traffic * self.config['usb_traffic_cost'])
+
+    def frame_period(self):
+        return max(self.exposure_seconds(), self.readout_seconds())
+
+    def start_exposure(self):
+        self.exposure_start = time.monotonic()
+        self.exposure_end = self.exposure_start + self.scaled(self.exposure_seconds())
+
+    def exposure_remaining(self):
+        """剩余曝光时间（毫秒），没有进行中的曝光时返回 QHYCCD_ERROR"""
+        if self.exposure_end is None:
+            return QHYCCD_ERROR
+        return int(max(self.exposure_end - time.monotonic(), 0) * 1000)
+
+    # 图像
+    def depth(self):
+        return int(self.params[CONTROL_ID.CONTROL_TRANSFERBIT.value])
+
+    def channels(self):
+        return 3 if self.is_color and self.debayer else 1
+
+    def set_roi(self, x, y, w, h):
+        bin_x, bin_y = self.bin
+        if w <= 0 or h <= 0 or x + w > self.width // bin_x or y + h > self.height // bin_y:
+            return QHYCCD_ERROR
+        self.roi = (x, y, w, h)
+        return QHYCCD_SUCCESS
+
+    def render_sky(self):
+        """生成全分辨率的星场通量图（e-/s），只生成一次"""
+        if self.sky_map is not None:
+            return self.sky_map
+        rng = np.random.default_rng(self.config['seed'])
+        sky = np.full((self.height, self.width), self.config['sky'], dtype=np.float32)
+        sigma = self.config['fwhm'] / 2.3548
+        radius = max(int(math.ceil(sigma * 4)), 1)
+        offsets = np.arange(-radius, radius + 1)
+        for _ in range(self.config['stars']):
+            x = rng.uniform(0, self.width)
+            y = rng.uniform(0, self.height)
+            # 星等分布近似幂律，亮星少、暗星多
+            flux = 2e5 * rng.pareto(1.5) + 500
+            ix, iy = int(x), int(y)
+            xs = ix + offsets
+            ys = iy + offsets
+            xs = xs[(xs >= 0) & (xs < self.width)]
+            ys = ys[(ys >= 0) & (ys < self.height)]
+            if xs.size == 0 or ys.size == 0:
+                continue
+            psf = np.exp(-((xs[None, :] + 0.5 - x) ** 2 + (ys[:, None] + 0.5 - y) ** 2) / (2 * sigma ** 2))
+            sky[ys[0]:ys[-1] + 1, xs[0]:xs[-1] + 1] += (flux / (2 * math.pi * sigma ** 2) * psf).astype(np.float32)
+        if self.is_color:
+            # 按 Bayer 排列对 R/G/B 像素施加不同的光谱响应
+            response = {'R': 0.8, 'G': 1.0, 'B': 0.6}
+            pattern = self.config['bayer'].upper()
+            for i, color in enumerate(pattern[:4]):
+                sky[i // 2::2, i % 2::2] *= response.get(color, 1.0)
+        self.sky_map = sky
+        return sky
+
+    def noise(self, shape):
+        """预生成的标准正态噪声帧，按帧号轮换，避免每帧生成随机数的开销"""
+        bank = self.noise_bank.get(shape)
+        if bank is None:
+            bank = self.rng.standard_normal((4,) + shape, dtype=np.float32)
+            self.noise_bank = {shape: bank}
+        return bank[self.frame_count % len(bank)]
+
+    def render_frame(self, exposure_seconds):
+        bin_x, bin_y = self.bin
+        x, y, w, h = self.roi
+        sky = self.render_sky()
+        region = sky[y * bin_y:(y + h) * bin_y, x * bin_x:(x + w) * bin_x]
+        if bin_x > 1 or bin_y > 1:
+            region = region.reshape(h, bin_y, w, bin_x).sum(axis=(1, 3))
+        dark = self.config['dark_current'] * 2 ** (self.temperature / 6.0)
+        signal = (region + dark) * exposure_seconds
+        read_noise = self.config['read_noise']
+        electrons = signal + self.noise(signal.shape) * np.sqrt(signal + read_noise ** 2)
+        depth = self.depth()
+        gain = 10 ** (self.params[CONTROL_ID.CONTROL_GAIN.value] / 100.0)
+        adu = electrons * gain * (2 ** depth / 65536.0) + self.params[CONTROL_ID.CONTROL_OFFSET.value] * (2 ** depth / 256.0)
+        dtype = np.uint8 if depth == 8 else np.uint16
+        img = np.clip(adu, 0, 2 ** depth - 1).astype(dtype)
+        if self.channels() == 3:
+            # 简单去马赛克：灰度复制到三个通道并乘以白平衡系数，输出 BGR 顺序
+            wb = [self.params[CONTROL_ID.CONTROL_WBB.value], self.params[CONTROL_ID.CONTROL_WBG.value], self.params[CONTROL_ID.CONTROL_WBR.value]]
+            img = np.stack([np.clip(img * (v / 128.0), 0, 2 ** depth - 1).astype(dtype) for v in wb], axis=-1)
+        self.frame_count += 1
+        return img
+
+    def gps_header(self, start, end):
+        """按 parse_gps_data 的字节布局生成 44 字节 GPS 帧头"""
+        header = bytearray(GPS_HEADER_SIZE)
+        _, _, w, h = self.roi
+        header[0:4] = (self.frame_count & 0xFFFFFFFF).to_bytes(4, 'big')
+        header[5:7] = w.to_bytes(2, 'big')
+        header[7:9] = h.to_bytes(2, 'big')
+        latitude = abs(self.config['latitude'])
+        deg, minutes = int(latitude), (latitude - int(latitude)) * 60
+        value = deg * 10000000 + int(minutes * 100000) + (1000000000 if self.config['latitude'] < 0 else 0)
+        header[9:13] = value.to_bytes(4, 'big')
+        longitude = abs(self.config['longitude'])
+        deg, minutes = int(longitude), (longitude - int(longitude)) * 60
+        value = deg * 1000000 + int(minutes * 10000) + (1000000000 if self.config['longitude'] < 0 else 0)
+        header[13:17] = value.to_bytes(4, 'big')
+        for offset, timestamp in ((18, start), (26, end), (34, time.time())):
+            seconds = timestamp - GPS_EPOCH
+            header[offset:offset + 4] = int(seconds).to_bytes(4, 'big')
+            header[offset + 4:offset + 7] = int((seconds % 1) * 1e7).to_bytes(3, 'big')
+        # 状态位 3 表示已锁定
+        header[33] = 3 << 4
+        header[41:44] = (self.frame_count & 0xFFFFFF).to_bytes(3, 'big')
+        return header
+
+    def fill_frame(self, w_ref, h_ref, b_ref, c_ref, buffer, exposure_seconds, start, end):
+        img = self.render_frame(exposure_seconds)
+        _, _, w, h = self.roi
+        _store(w_ref, w)
+        _store(h_ref, h)
+        _store(b_ref, self.depth())
+        _store(c_ref, self.channels())
+        if self.params.get(CONTROL_ID.CAM_GPS.value):
+            header = np.frombuffer(bytes(self.gps_header(start, end)), dtype=np.uint8)
+            data = np.concatenate([header, img.reshape(-1).view(np.uint8)])
+        else:
+            data = img
+        _write_buffer(buffer, data)
+
+    def wait_trigger(self):
+        """外触发模式下等待软触发或按固定周期到来的下一个触发"""
+        interval = self.scaled(self.config['trigger_interval'])
+        if interval > 0:
+            now = time.monotonic()
+            deadline = self.trigger_epoch + math.ceil((now - self.trigger_epoch) / interval) * interval
+        while not self.cancel_event.is_set():
+            timeout = min(deadline - time.monotonic(), 0.01) if interval > 0 else 0.01
+            if self.trigger_event.wait(max(timeout, 0)):
+                self.trigger_event.clear()
+                return True
+            if interval > 0 and time.monotonic() >= deadline:
+                return True
+        return False
+
+    # 滤镜轮
+    def cfw_current(self):
+        now = time.monotonic()
+        if now >= self.cfw_move_end:
+            self.cfw_position = self.cfw_target
+            return self.cfw_target
+        # 移动过程中报告已经过的孔位
+        slots = self.config['cfw_slots']
+        distance = (self.cfw_target - self.cfw_position) % slots
+        passed = int(distance * (now - self.cfw_move_start) / (self.cfw_move_end - self.cfw_move_start))
+        return (self.cfw_position + passed) % slots
+
+    def move_cfw(self, slot):
+        slots = self.config['cfw_slots']
+        if not 0 <= slot < slots:
+            return QHYCCD_ERROR
+        current = self.cfw_current()
+        self.cfw_position = current
+        self.cfw_target = slot
+        self.cfw_move_start = time.monotonic()
+        self.cfw_move_end = self.cfw_move_start + self.scaled(self.config['cfw_move_time'] * ((slot - current) % slots))
+        return QHYCCD_SUCCESS
+
+    # 温度
+    def update_temperature(self):
+        """一阶制冷模型加随机漂移，目标温度不低于环境温度减 40°C"""
+        with self.lock:
+            now = time.monotonic()
+            dt = now - self.temperature_time
+            self.temperature_time = now
+            ambient = self.config['ambient']
+            target = max(self.params[CONTROL_ID.CONTROL_COOLER.value], ambient - 40.0)
+            self.temperature += (target - self.temperature) * (1 - math.exp(-dt / self.config['cooling_tau']))
+            self.temperature += self.config['temp_drift'] * math.sqrt(dt) * float(self.temp_rng.standard_normal())
+            return self.temperature
+
+    def pwm(self):
+        return float(np.clip((self.config['ambient'] - self.update_temperature()) / 40.0 * 255.0, 0, 255))
+
+
+class SimulatedQHYCCD:
+    """与 libqhyccd 同接口的模拟库，init_qhyccd_resource 传入 simulator[:选项] 路径时使用
+
+    选项见 DEFAULT_CONFIG，例如 simulator:width=3000,height=2000,bayer=RGGB,time_scale=0
+    """
+
+    def __init__(self, config=None):
+        self.config = dict(DEFAULT_CONFIG) if config is None else config
+        self.cameras = [SimulatedCamera(i, self.config) for i in range(self.config['cameras'])]
+        self.handles = {}
+
+    def camera(self, handle):
+        camera = self.handles.get(_value(handle))
+        if camera is None or not camera.is_open:
+            return None
+        return camera
+
+    # 资源与枚举
+    @export
+    def InitQHYCCDResource(self):
+        return QHYCCD_SUCCESS
+
+    @export
+    def ReleaseQHYCCDResource(self):
+        return QHYCCD_SUCCESS
+
+    @export
+    def ScanQHYCCD(self):
+        return len(self.cameras)
+
+    @export
+    def GetQHYCCDId(self, index, id_buffer):
+        if not 0 <= index < len(self.cameras):
+            return QHYCCD_ERROR
+        _store(id_buffer, self.cameras[index].camera_id.encode('utf-8'))
+        return QHYCCD_SUCCESS
+
+    @export
+    def OpenQHYCCD(self, camera_id):
+        camera_id = _value(camera_id)
+        if isinstance(camera_id, bytes):
+            camera_id = camera_id.decode('utf-8')
+        for camera in self.cameras:
+            if camera.camera_id == camera_id:
+                camera.is_open = True
+                handle = 0x1000 + camera.index
+                self.handles[handle] = camera
+                return handle
+        return 0
+
+    @export
+    def CloseQHYCCD(self, handle):
+        camera = self.camera(handle)
+        if camera is None:
+            return QHYCCD_ERROR
+        camera.cancel_event.set()
+        camera.live = False
+        camera.is_open = False
+        return QHYCCD_SUCCESS
+
+    @export
+    def InitQHYCCD(self, handle):
+        camera = self.camera(handle)
+        if camera is None:
+            return QHYCCD_ERROR
+        camera.cancel_event.clear()
+        camera.roi = (0, 0, camera.width // camera.bin[0], camera.height // camera.bin[1])
+        return QHYCCD_SUCCESS
+
+    # 读出模式
+    @export
+    def GetQHYCCDNumberOfReadModes(self, handle, num):
+        if self.camera(handle) is None:
+            return QHYCCD_ERROR
+        _store(num, self.config['readout_modes'])
+        return QHYCCD_SUCCESS
+
+    @export
+    def GetQHYCCDReadModeName(self, handle, index, name_buffer):
+        if self.camera(handle) is None or not 0 <= index < self.config['readout_modes']:
+            return QHYCCD_ERROR
+        _store(name_buffer, f"SIM Mode {index}".encode('utf-8'))
+        return QHYCCD_SUCCESS
+
+    @export
+    def GetQHYCCDReadModeResolution(self, handle, index, w, h):
+        camera = self.camera(handle)
+        if camera is None or not 0 <= index < self.config['readout_modes']:
+            return QHYCCD_ERROR
+        _store(w, camera.width)
+        _store(h, camera.height)
+        return QHYCCD_SUCCESS
+
+    @export
+    def SetQHYCCDReadMode(self, handle, index):
+        camera = self.camera(handle)
+        if camera is None or not 0 <= index < self.config['readout_modes']:
+            return QHYCCD_ERROR
+        camera.read_mode = index
+        return QHYCCD_SUCCESS
+
+    @export
+    def SetQHYCCDStreamMode(self, handle, mode):
+        camera = self.camera(handle)
+        if camera is None or mode not in (0, 1):
+            return QHYCCD_ERROR
+        camera.stream_mode = mode
+        return QHYCCD_SUCCESS
+
+    # 芯片信息
+    @export
+    def GetQHYCCDChipInfo(self, handle, chip_w, chip_h, image_w, image_h, pixel_w, pixel_h, image_b):
+        camera = self.camera(handle)
+        if camera is None:
+            return QHYCCD_ERROR
+        pixel_size = self.config['pixel_size']
+        _store(chip_w, camera.width * pixel_size / 1000)
+        _store(chip_h, camera.height * pixel_size / 1000)
+        _store(image_w, camera.width)
+        _store(image_h, camera.height)
+        _store(pixel_w, pixel_size)
+        _store(pixel_h, pixel_size)
+        _store(image_b, self.config['depth'])
+        return QHYCCD_SUCCESS
+
+    @export
+    def GetQHYCCDEffectiveArea(self, handle, start_x, start_y, size_x, size_y):
+        camera = self.camera(handle)
+        if camera is None:
+            return QHYCCD_ERROR
+        _store(start_x, 0)
+        _store(start_y, 0)
+        _store(size_x, camera.width)
+        _store(size_y, camera.height)
+        return QHYCCD_SUCCESS
+
+    # 参数
+    @export
+    def IsQHYCCDControlAvailable(self, handle, control_id):
+        camera = self.camera(handle)
+        if camera is None or control_id not in camera.available:
+            return QHYCCD_ERROR
+        return QHYCCD_SUCCESS
+
+    @export
+    def GetQHYCCDParam(self, handle, control_id):
+        camera = self.camera(handle)
+        if camera is None or control_id not in camera.available:
+            return float(QHYCCD_ERROR)
+        if control_id == CONTROL_CURTEMP:
+            return camera.update_temperature()
+        if control_id == CONTROL_CURPWM:
+            return camera.pwm()
+        if control_id == CONTROL_CFWPORT:
+            return float(ord(format(camera.cfw_current(), 'x')))
+        if control_id == CONTROL_CFWSLOTSNUM:
+            return float(self.config['cfw_slots'])
+        if control_id == CAM_HUMIDITY:
+            return float(self.config['humidity'])
+        if control_id == CAM_IS_COLOR:
+            return 0.0
+        return float(camera.params.get(control_id, 0.0))
+
+    @export
+    def SetQHYCCDParam(self, handle, control_id, value):
+        camera = self.camera(handle)
+        if camera is None or control_id not in camera.available:
+            return QHYCCD_ERROR
+        value = float(_value(value))
+        if control_id == CONTROL_CFWPORT:
+            try:
+                return camera.move_cfw(int(chr(int(value)), 16))
+            except ValueError:
+                return QHYCCD_ERROR
+        if control_id not in camera.limits:
+            return QHYCCD_ERROR
+        min_value, max_value, _ = camera.limits[control_id]
+        if control_id == CONTROL_TRANSFERBIT and value not in (8.0, 16.0):
+            return QHYCCD_ERROR
+        if control_id == CONTROL_COOLER:
+            camera.update_temperature()
+        camera.params[control_id] = min(max(value, min_value), max_value)
+        return QHYCCD_SUCCESS
+
+    @export
+    def GetQHYCCDParamMinMaxStep(self, handle, control_id, min_value, max_value, step):
+        camera = self.camera(handle)
+        if camera is None or control_id not in camera.limits:
+            return QHYCCD_ERROR
+        low, high, increment = camera.limits[control_id]
+        _store(min_value, low)
+        _store(max_value, high)
+        _store(step, increment)
+        return QHYCCD_SUCCESS
+
+    @export
+    def GetQHYCCDHumidity(self, handle, humidity):
+        if self.camera(handle) is None:
+            return QHYCCD_ERROR
+        _store(humidity, float(self.config['humidity']))
+        return QHYCCD_SUCCESS
+
+    # 图像格式
+    @export
+    def SetQHYCCDDebayerOnOff(self, handle, state):
+        camera = self.camera(handle)
+        if camera is None or not camera.is_color:
+            return QHYCCD_ERROR
+        camera.debayer = bool(_value(state))
+        return QHYCCD_SUCCESS
+
+    @export
+    def SetQHYCCDBinMode(self, handle, bin_x, bin_y=None):
+        camera = self.camera(handle)
+        if camera is None or bin_x not in (1, 2, 3, 4):
+            return QHYCCD_ERROR
+        camera.bin = (bin_x, bin_y or bin_x)
+        camera.roi = (0, 0, camera.width // camera.bin[0], camera.height // camera.bin[1])
+        return QHYCCD_SUCCESS
+
+    @export
+    def SetQHYCCDResolution(self, handle, x, y, w, h):
+        camera = self.camera(handle)
+        if camera is None:
+            return QHYCCD_ERROR
+        return camera.set_roi(x, y, w, h)
+
+    @export
+    def Bits16ToBits8(self, handle, src, dst, w, h, black, white):
+        count = w * h
+        data = np.ctypeslib.as_array(ctypes.cast(src, ctypes.POINTER(ctypes.c_uint16)), shape=(count,))
+        scale = 255.0 / max(white - black, 1)
+        _write_buffer(dst, np.clip((data.astype(np.float32) - black) * scale, 0, 255).astype(np.uint8))
+        return QHYCCD_SUCCESS
+
+    # 单帧
+    @export
+    def ExpQHYCCDSingleFrame(self, handle):
+        camera = self.camera(handle)
+        # 外触发在连续模式暂停后也按单帧方式取图，与界面的外触发流程一致
+        if camera is None or (camera.stream_mode != 0 and not camera.trigger_function):
+            return QHYCCD_ERROR
+        camera.cancel_event.clear()
+        # 外触发模式下只做准备，曝光在 GetQHYCCDSingleFrame 收到触发后开始
+        camera.armed = camera.trigger_function
+        if not camera.armed:
+            camera.start_exposure()
+        return QHYCCD_SUCCESS
+
+    @export
+    def GetQHYCCDExposureRemaining(self, handle):
+        camera = self.camera(handle)
+        if camera is None:
+            return QHYCCD_ERROR
+        return camera.exposure_remaining()
+
+    @export
+    def GetQHYCCDSingleFrame(self, handle, w, h, b, c, buffer):
+        camera = self.camera(handle)
+        if camera is None or (camera.exposure_start is None and not camera.armed):
+            return QHYCCD_ERROR
+        if camera.armed:
+            camera.armed = False
+            if not camera.wait_trigger():
+                return QHYCCD_ERROR
+            camera.last_trigger = time.monotonic()
+            camera.start_exposure()
+        start_wall = time.time() - (time.monotonic() - camera.exposure_start)
+        exposure_end = camera.exposure_end
+        if not camera.sleep_until(exposure_end + camera.scaled(camera.readout_seconds())):
+            camera.exposure_start = camera.exposure_end = None
+            return QHYCCD_ERROR
+        with camera.lock:
+            exposure_seconds = camera.exposure_seconds()
+            camera.fill_frame(w, h, b, c, buffer, exposure_seconds, start_wall, start_wall + exposure_seconds)
+        camera.exposure_start = camera.exposure_end = None
+        return QHYCCD_SUCCESS
+
+    @export
+    def CancelQHYCCDExposingAndReadout(self, handle):
+        camera = self.camera(handle)
+        if camera is None:
+            return QHYCCD_ERROR
+        camera.cancel_event.set()
+        return QHYCCD_SUCCESS
+
+    # 连续模式
+    @export
+    def BeginQHYCCDLive(self, handle):
+        camera = self.camera(handle)
+        if camera is None or camera.stream_mode != 1:
+            return QHYCCD_ERROR
+        camera.live = True
+        camera.next_live_frame = time.monotonic() + camera.scaled(camera.frame_period())
+        return QHYCCD_SUCCESS
+
+    @export
+    def GetQHYCCDLiveFrame(self, handle, w, h, b, c, buffer):
+        """帧未就绪时立即返回 QHYCCD_ERROR，调用方轮询，与真实 SDK 一致"""
+        camera = self.camera(handle)
+        if camera is None or not camera.live:
+            return QHYCCD_ERROR
+        now = time.monotonic()
+        if now < camera.next_live_frame:
+            return QHYCCD_ERROR
+        period = camera.scaled(camera.frame_period())
+        # 取帧不及时时相机丢弃积压的帧
+        camera.next_live_frame = max(camera.next_live_frame + period, now)
+        drop_traffic = self.config['usb_drop_traffic']
+        traffic = camera.params[CONTROL_ID.CONTROL_USBTRAFFIC.value]
+        if traffic < drop_traffic and camera.rng.random() < (drop_traffic - traffic) / drop_traffic:
+            # 带宽不足时相机丢弃该帧
+            camera.frame_count += 1
+            return QHYCCD_ERROR
+        exposure_seconds = camera.exposure_seconds()
+        end = time.time()
+        with camera.lock:
+            camera.fill_frame(w, h, b, c, buffer, exposure_seconds, end - exposure_seconds, end)
+        return QHYCCD_SUCCESS
+
+    @export
+    def StopQHYCCDLive(self, handle):
+        camera = self.camera(handle)
+        if camera is None:
+            return QHYCCD_ERROR
+        camera.live = False
+        return QHYCCD_SUCCESS
+
+    # 滤镜轮
+    @export
+    def IsQHYCCDCFWPlugged(self, handle):
+        if self.camera(handle) is None or self.config['cfw_slots'] <= 0:
+            return QHYCCD_ERROR
+        return QHYCCD_SUCCESS
+
+    @export
+    def SendOrder2QHYCCDCFW(self, handle, order, length):
+        camera = self.camera(handle)
+        if camera is None or self.config['cfw_slots'] <= 0:
+            return QHYCCD_ERROR
+        order = _value(order)
+        try:
+            slot = int(order[:length].decode('utf-8'), 16)
+        except ValueError:
+            return QHYCCD_ERROR
+        return camera.move_cfw(slot)
+
+    # 外触发
+    @export
+    def GetQHYCCDTrigerInterfaceNumber(self, handle, num):
+        if self.camera(handle) is None:
+            return QHYCCD_ERROR
+        _store(num, 1)
+        return QHYCCD_SUCCESS
+
+    @export
+    def GetQHYCCDTrigerInterfaceName(self, handle, index, name_buffer):
+        if self.camera(handle) is None or index != 0:
+            return QHYCCD_ERROR
+        _store(name_buffer, b"SIM Trigger")
+        return QHYCCD_SUCCESS
+
+    @export
+    def SetQHYCCDTrigerInterface(self, handle, index):
+        if self.camera(handle) is None or index != 0:
+            return QHYCCD_ERROR
+        return QHYCCD_SUCCESS
+
+    @export
+    def SetQHYCCDTrigerFunction(self, handle, state):
+        camera = self.camera(handle)
+        if camera is None:
+            return QHYCCD_ERROR
+        camera.trigger_function = bool(_value(state))
+        camera.trigger_epoch = time.monotonic()
+        return QHYCCD_SUCCESS
+
+    @export
+    def SendSoftTriger2QHYCCDCam(self, handle):
+        camera = self.camera(handle)
+        if camera is None:
+            return QHYCCD_ERROR
+        camera.trigger_event.set()
+        return QHYCCD_SUCCESS
+
+    @export
+    def EnableQHYCCDTrigerOut(self, handle):
+        return QHYCCD_SUCCESS if self.camera(handle) is not None else QHYCCD_ERROR
+
+    @export
+    def EnableQHYCCDTrigerOutA(self, handle):
+        return QHYCCD_SUCCESS if self.camera(handle) is not None else QHYCCD_ERROR
+
+    @export
+    def SetQHYCCDTrigerMode(self, handle, mode):
+        return QHYCCD_SUCCESS if self.camera(handle) is not None else QHYCCD_ERROR
+
+    @export
+    def SetQHYCCDTrigerFilterOnOff(self, handle, state):
+        return QHYCCD_SUCCESS if self.camera(handle) is not None else QHYCCD_ERROR
+
+    @export
+    def SetQHYCCDTrigerFilterTime(self, handle, value):
+        return QHYCCD_SUCCESS if self.camera(handle) is not None else QHYCCD_ERROR
+
+    # 连拍模式（模拟相机不支持，CAM_BURST_MODE 不可用，调用只返回成功）
+    @export
+    def EnableQHYCCDBurstMode(self, handle, state):
+        return QHYCCD_SUCCESS if self.camera(handle) is not None else QHYCCD_ERROR
+
+    @export
+    def SetQHYCCDBurstModeStartEnd(self, handle, start, end):
+        return QHYCCD_SUCCESS if self.camera(handle) is not None else QHYCCD_ERROR
+
+    @export
+    def SetQHYCCDBurstModePatchNumber(self, handle, value):
+        return QHYCCD_SUCCESS if self.camera(handle) is not None else QHYCCD_ERROR
+
+    @export
+    def SetQHYCCDBurstIDLE(self, handle, *args):
+        return QHYCCD_SUCCESS if self.camera(handle) is not None else QHYCCD_ERROR
+
+    @export
+    def ReleaseQHYCCDBurstIDLE(self, handle):
+        return QHYCCD_SUCCESS if self.camera(handle) is not None else QHYCCD_ERROR
+
+    @export
+    def OutputQHYCCDDebug(self, message):
+        return None
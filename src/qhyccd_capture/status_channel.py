@@ -0,0 +1,97 @@
+import threading
+import time
+
+from .language import translations
+
+# 状态事件编号，发送端只发送编号和参数，界面显示时才翻译
+RECORD_PROGRESS = 1000  # 录像进度，参数为百分比，显示在进度条上
+MEMORY_WARNING = 1001
+RECORD_TIME_MODE_SUCCESS = 1002
+RECORD_FRAME_MODE_SUCCESS = 1003
+PREVIEW_PAUSE = 1004
+PREVIEW_UPDATE_PARAMETERS = 1005
+START_SAVE_VIDEO = 1006
+STOP_SAVE_VIDEO = 1007
+QUEUE_SIZE = 2000
+GET_TEMPERATURE = 2001
+GET_HUMIDITY = 2002
+GET_EXPOSURE_VALUE = 2003
+SET_EXPOSURE_TIME = 2004
+SET_GAIN = 2005
+SET_OFFSET = 2006
+SET_USB_TRAFFIC = 2007
+SET_WHITE_BALANCE = 2008
+
+STATUS_EVENTS = {
+    MEMORY_WARNING: ('preview_thread', 'memory_warning'),
+    RECORD_TIME_MODE_SUCCESS: ('preview_thread', 'record_time_mode_success'),
+    RECORD_FRAME_MODE_SUCCESS: ('preview_thread', 'record_frame_mode_success'),
+    PREVIEW_PAUSE: ('preview_thread', 'set_pause_success'),
+    PREVIEW_UPDATE_PARAMETERS: ('preview_thread', 'preview_update_parameters_success'),
+    START_SAVE_VIDEO: ('preview_thread', 'start_save_video_success'),
+    STOP_SAVE_VIDEO: ('preview_thread', 'stop_save_video_success'),
+    QUEUE_SIZE: ('qhyccd_sdk', 'queue_size'),
+    GET_TEMPERATURE: ('qhyccd_sdk', 'get_temperature_success'),
+    GET_HUMIDITY: ('qhyccd_sdk', 'get_humidity_success'),
+    GET_EXPOSURE_VALUE: ('qhyccd_sdk', 'get_exposure_value_success'),
+    SET_EXPOSURE_TIME: ('qhyccd_sdk', 'set_exposure_time_success'),
+    SET_GAIN: ('qhyccd_sdk', 'set_gain_success'),
+    SET_OFFSET: ('qhyccd_sdk', 'set_offset_success'),
+    SET_USB_TRAFFIC: ('qhyccd_sdk', 'set_usb_traffic_success'),
+    SET_WHITE_BALANCE: ('qhyccd_sdk', 'set_white_balance_success'),
+}
+
+
+class StatusChannel:
+    """结构化状态通道
+
+    以 {"order":"status","data":{"code","args"}} 发送事件，同一编号在 interval 秒内只发送一次，
+    间隔内的后续事件只保留最新一条，间隔结束时补发。force 的事件不限流。
+    """
+
+    def __init__(self, output_queue, interval=0.2):
+        self.output_queue = output_queue
+        self.interval = interval
+        self.last_sent = {}
+        self.pending = {}
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def emit(self, code, *args, force=False):
+        now = time.monotonic()
+        with self.lock:
+            if not force and now - self.last_sent.get(code, -self.interval) < self.interval:
+                self.pending[code] = args
+                if self.timer is None:
+                    self.timer = threading.Timer(self.interval, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+            self.pending.pop(code, None)
+            self.last_sent[code] = now
+        self.put(code, args)
+
+    def put(self, code, args):
+        self.output_queue.put({"order":"status","data":{"code":code,"args":args}})
+
+    def flush(self):
+        now = time.monotonic()
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            for code in pending:
+                self.last_sent[code] = now
+        for code, args in pending.items():
+            self.put(code, args)
+
+
+def format_status(language, data):
+    """把状态事件翻译为日志文本"""
+    section, key = STATUS_EVENTS[data['code']]
+    text = translations[language][section][key]
+    if data['args']:
+        text = f"{text}: {', '.join(str(arg) for arg in data['args'])}"
+    return text
@@ -0,0 +1,252 @@
+import math
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import psutil
+
+from .control_id import CONTROL_ID
+from .qhyccd_dll import QHYCCD_ERROR
+
+# 环形缓冲区每条记录的字段，缺失的值为 NaN；time 为 Unix 时间，pwm 和 memory 为百分比
+TELEMETRY_FIELDS = ('time', 'temperature', 'setpoint', 'pwm', 'humidity', 'memory')
+RING_SIZE = 3600  # 每秒采样一次时约保留一小时
+CAMERA_CONTROLS = (('temperature', CONTROL_ID.CONTROL_CURTEMP), ('pwm', CONTROL_ID.CONTROL_CURPWM), ('humidity', CONTROL_ID.CAM_HUMIDITY))
+
+
+class TemperatureGate:
+    """温度稳定门限：传感器温度在设定值 ±tolerance 内持续 hold 秒视为稳定
+
+    由遥测线程在每个样本到达时调用 update，稳定或等待超过 timeout 秒（0 为不限）时调用一次
+    callback({'ok', 'duration', 'error', 'temperature'})，duration 为等待的秒数。
+    """
+
+    def __init__(self, setpoint, tolerance, hold, timeout, callback, start=None):
+        self.setpoint = setpoint
+        self.tolerance = tolerance
+        self.hold = hold
+        self.timeout = timeout
+        self.callback = callback
+        self.start = time.monotonic() if start is None else start
+        self.since = None  # 进入容差范围的时刻
+        self.done = False
+
+    def update(self, now, temperature):
+        """检查一个样本，返回是否已结束；temperature 为 None 表示没有样本，只检查超时"""
+        if self.done:
+            return True
+        if temperature is not None and abs(temperature - self.setpoint) <= self.tolerance:
+            if self.since is None:
+                self.since = now
+            if now - self.since >= self.hold:
+                return self.finish(now, temperature, None)
+        elif temperature is not None:
+            self.since = None
+        if self.timeout and now - self.start >= self.timeout:
+            return self.finish(now, temperature, 'timeout')
+        return False
+
+    def finish(self, now, temperature, error):
+        self.done = True
+        self.callback({'ok': error is None, 'duration': now - self.start, 'error': error, 'temperature': temperature})
+        return True
+
+
+class TelemetryRing:
+    """遥测样本的共享内存环形缓冲区
+
+    头部 8 字节为已写入的样本总数，之后为 size 条 float64 记录，字段见 TELEMETRY_FIELDS。
+    只有 SDK 进程的遥测线程写入：先写记录再增加总数；读取端按总数取最近的样本，
+    读取期间被覆盖的记录丢弃，不需要跨进程加锁。界面和无界面接口按描述附加后直接读取，不经过命令队列。
+    """
+
+    def __init__(self, size=RING_SIZE, name=None):
+        width = len(TELEMETRY_FIELDS)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=8 + size * width * 8)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.size = size
+        self.handoff = False  # SDK 在本进程的线程中运行时，随描述直接交出环形缓冲区对象
+        self.pid = os.getpid()  # 写入端所在的进程，附加时取自描述
+        self.count = np.ndarray((1,), dtype=np.uint64, buffer=self.shm.buf)
+        self.records = np.ndarray((size, width), dtype=np.float64, buffer=self.shm.buf, offset=8)
+        if self.owner:
+            self.count[0] = 0
+
+    def descriptor(self):
+        descriptor = {'shm_name': self.shm.name, 'size': self.size, 'pid': os.getpid(), 'fields': TELEMETRY_FIELDS}
+        if self.handoff:
+            descriptor['ring'] = self
+        return descriptor
+
+    @classmethod
+    def attach(cls, descriptor):
+        if descriptor.get('ring') is not None:
+            return descriptor['ring']
+        ring = cls(descriptor['size'], descriptor['shm_name'])
+        ring.pid = descriptor['pid']
+        return ring
+
+    def append(self, sample):
+        index = int(self.count[0])
+        self.records[index % self.size] = [math.nan if sample.get(field) is None else sample[field] for field in TELEMETRY_FIELDS]
+        self.count[0] = index + 1
+
+    def history(self, seconds=None, count=None):
+        """最近的样本，按时间从早到晚排列，返回 {字段: 数组}；seconds 只取最近若干秒，count 限制条数"""
+        end = int(self.count[0])
+        length = min(end, self.size, count if count is not None else self.size)
+        start = end - length
+        indexes = np.arange(start, end) % self.size
+        rows = self.records[indexes].copy()
+        # 写入端先写记录再增加计数，复制后重新读取计数：读取期间已被覆盖的样本和正在写入的槽位（计数之后的一条）都丢弃
+        overwritten = int(self.count[0]) - self.size + 1 - start
+        if overwritten > 0:
+            rows = rows[overwritten:]
+        if seconds is not None and len(rows):
+            rows = rows[rows[:, 0] >= rows[-1, 0] - seconds]
+        return {field: rows[:, i] for i, field in enumerate(TELEMETRY_FIELDS)}
+
+    def latest(self):
+        """最新样本 {字段: 值}，缺失的值为 None，还没有样本时返回 None"""
+        history = self.history(count=1)
+        if not len(history['time']):
+            return None
+        return {field: None if math.isnan(values[0]) else float(values[0]) for field, values in history.items()}
+
+    def close(self):
+        del self.count, self.records
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class TelemetryThread(threading.Thread):
+    """SDK 进程内唯一的遥测采样线程
+
+    按 rate（次/秒）读取当前相机的传感器温度、制冷功率和湿度以及系统内存占用，latest 为最新样本，
+    同时写入共享内存环形缓冲区供界面绘制历史和读取当前值，不再由界面定时发命令查询。
+    温度门限在每个样本到达时检查，计划行和序列拍摄据此等待温度稳定。相机打开和关闭时由 SDK 通过 set_camera 登记，
+    切换时等待进行中的采样结束，不会读取已关闭的句柄；外部触发期间暂停读取相机。
+    """
+
+    def __init__(self, rate=1.0, ring=None):
+        super().__init__(daemon=True)
+        self.rate = rate
+        self.ring = ring
+        self.qhyccddll = None
+        self.camhandle = 0
+        self.available = set()  # 当前相机支持的遥测项
+        self.paused = False
+        self.setpoint = None  # 制冷目标温度，由 SDK 在设置时更新
+        self.latest = None  # {'time', 'monotonic', 'temperature', 'setpoint', 'pwm', 'humidity', 'memory'}
+        self.gates = []
+        self.lock = threading.Lock()  # 采样与切换相机互斥
+        self.gate_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = True
+
+    def set_rate(self, rate):
+        self.rate = max(float(rate), 0.0)
+        self.wakeup.set()
+
+    def set_camera(self, qhyccddll, camhandle):
+        """登记要采样的相机，camhandle 为 0 时停止读取相机"""
+        with self.lock:
+            self.qhyccddll = qhyccddll
+            self.camhandle = camhandle or 0
+            self.available = set()
+            if qhyccddll is not None and self.camhandle:
+                self.available = {key for key, control in CAMERA_CONTROLS if qhyccddll.IsQHYCCDControlAvailable(self.camhandle, control.value) == 0}
+        self.wakeup.set()
+
+    def set_paused(self, paused):
+        with self.lock:
+            self.paused = paused
+
+    def sample(self):
+        sample = {'time': time.time(), 'monotonic': time.monotonic(), 'setpoint': self.setpoint,
+                  'temperature': None, 'pwm': None, 'humidity': None, 'memory': psutil.virtual_memory().percent}
+        with self.lock:
+            if self.qhyccddll is not None and self.camhandle and not self.paused:
+                for key, control in CAMERA_CONTROLS:
+                    if key in self.available:
+                        value = self.qhyccddll.GetQHYCCDParam(self.camhandle, control.value)
+                        sample[key] = None if value == QHYCCD_ERROR else float(value)
+        if sample['pwm'] is not None:
+            sample['pwm'] = sample['pwm'] / 255.0 * 100.0
+        return sample
+
+    def run(self):
+        while self.running:
+            if self.rate > 0:
+                sample = self.sample()
+                self.latest = sample
+                if self.ring is not None:
+                    self.ring.append(sample)
+                self.check_gates(sample['monotonic'], sample['temperature'])
+            else:
+                self.check_gates(time.monotonic(), None)
+            # 有温度门限时至少每秒检查一次超时
+            interval = 1 / self.rate if self.rate > 0 else None
+            if self.gates:
+                interval = min(interval or 1.0, 1.0)
+            self.wakeup.wait(interval)
+            self.wakeup.clear()
+
+    def check_gates(self, now, temperature):
+        with self.gate_lock:
+            gates = list(self.gates)
+        finished = [gate for gate in gates if gate.update(now, temperature)]
+        if finished:
+            with self.gate_lock:
+                self.gates = [gate for gate in self.gates if gate not in finished]
+
+    def wait_stable(self, setpoint, tolerance, hold, timeout, callback):
+        """登记一个温度门限，结果在遥测线程中回调，返回门限对象供 cancel 使用"""
+        gate = TemperatureGate(setpoint, tolerance, hold, timeout, callback)
+        with self.gate_lock:
+            self.gates.append(gate)
+        self.wakeup.set()  # 立即取一个样本，已稳定且 hold 为 0 时不必等待一个周期
+        return gate
+
+    def wait_stable_blocking(self, setpoint, tolerance, hold, timeout, running=None):
+        """在调用线程中等待温度稳定，running 被清除时放弃等待并返回 None"""
+        done = threading.Event()
+        result = {}
+
+        def callback(value):
+            result.update(value)
+            done.set()
+
+        gate = self.wait_stable(setpoint, tolerance, hold, timeout, callback)
+        while not done.wait(0.2):
+            if running is not None and not running.is_set():
+                self.cancel(gate)
+                return None
+        return result
+
+    def cancel(self, gate):
+        gate.done = True
+        with self.gate_lock:
+            if gate in self.gates:
+                self.gates.remove(gate)
+
+    def stop(self):
+        self.running = False
+        with self.gate_lock:
+            for gate in self.gates:
+                gate.done = True
+            self.gates = []
+        self.wakeup.set()
+        self.set_camera(None, 0)
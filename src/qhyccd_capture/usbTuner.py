@@ -0,0 +1,210 @@
+import ctypes
+import json
+import socket
+import threading
+import time
+from ctypes import byref
+
+import numpy as np
+
+from .control_id import CONTROL_ID
+from .frame_slot import GPS_HEADER_SIZE
+from .qhyccd_dll import QHYCCD_ERROR, QHYCCD_SUCCESS
+
+# 试验期间会被改动、结束后恢复的参数
+RESTORE_CONTROLS = (CONTROL_ID.CONTROL_EXPOSURE.value, CONTROL_ID.CONTROL_GAIN.value, CONTROL_ID.CONTROL_OFFSET.value,
+                    CONTROL_ID.CONTROL_USBTRAFFIC.value, CONTROL_ID.CONTROL_TRANSFERBIT.value)
+
+
+def traffic_candidates(limit, count=8):
+    """在 (最小, 最大, 步长) 范围内均匀取至多 count 个 USB 流量值"""
+    low, high, step = limit
+    step = step or 1
+    values = np.linspace(low, high, count) if high > low else [low]
+    return sorted({float(low + round((value - low) / step) * step) for value in values})
+
+
+def select_best(results, tolerance=0.02):
+    """不丢帧的设置中帧率最高者；帧率相差在 tolerance 以内时取 USB 流量较大的，留出带宽余量"""
+    stable = [r for r in results if r['frames'] >= 2 and r['drops'] == 0 and r['error'] is None]
+    if not stable:
+        return None
+    best_fps = max(r['fps'] for r in stable)
+    close = [r for r in stable if r['fps'] >= best_fps * (1 - tolerance)]
+    best = max(close, key=lambda r: (r['traffic'], r['fps']))
+    return {key: best[key] for key in ('readout_mode', 'depth', 'traffic', 'fps', 'throughput')}
+
+
+class USBTuningCache:
+    """按相机和主机保存调优结果，换主机（USB 控制器不同）后需要重新调优"""
+
+    def __init__(self, file_path="usb_tuning.json"):
+        self.file_path = file_path
+
+    @staticmethod
+    def key(camera_name):
+        return f"{camera_name}@{socket.gethostname()}"
+
+    def load(self):
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, camera_name, signature):
+        """signature 记录调优时的读出模式、ROI 和曝光，不一致时缓存无效"""
+        entry = self.load().get(self.key(camera_name))
+        if entry is None or entry.get('signature') != signature:
+            return None
+        return entry
+
+    def put(self, camera_name, entry):
+        data = self.load()
+        data[self.key(camera_name)] = entry
+        try:
+            with open(self.file_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False, indent=4)
+        except OSError:
+            pass
+
+
+class USBTrafficTuner(threading.Thread):
+    """连续模式下逐个试验 USB 流量（可选读出模式和位深），找出不丢帧且帧率最高的设置
+
+    每个设置重新开始连续模式，丢弃前 settle 帧后采集 duration 秒，统计帧率、GetQHYCCDLiveFrame 返回失败的次数和丢帧数。
+    GetQHYCCDLiveFrame 在帧未就绪时同样返回失败，因此丢帧以 GPS 帧头序号的跳变判断；未开启 GPS 时以超过中位间隔
+    drop_ratio 倍的帧间隔估计。结束后恢复原来的读出模式和参数，结果交给 callback(result)。
+    """
+
+    def __init__(self, camhandle, qhyccddll, candidates, readout_modes, current_mode, resolution, GPS_control, output_queue, callback,
+                 duration=2.0, settle=2, drop_ratio=1.8):
+        super().__init__(daemon=True)
+        self.camhandle = camhandle
+        self.qhyccddll = qhyccddll
+        self.candidates = candidates  # [(读出模式名称, 位深, USB 流量), ...]，同一读出模式的排在一起
+        self.readout_modes = readout_modes  # 读出模式名称 -> 编号
+        self.current_mode = current_mode
+        self.resolution = resolution  # 当前 ROI (x, y, w, h)，None 为读出模式的全幅
+        self.GPS_control = GPS_control
+        self.output_queue = output_queue
+        self.callback = callback
+        self.duration = duration
+        self.settle = settle
+        self.drop_ratio = drop_ratio
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        saved = {control: self.qhyccddll.GetQHYCCDParam(self.camhandle, control) for control in RESTORE_CONTROLS}
+        exposure = saved[CONTROL_ID.CONTROL_EXPOSURE.value] / 1e6 if saved[CONTROL_ID.CONTROL_EXPOSURE.value] != QHYCCD_ERROR else 1.0
+        self.frame_timeout = 2.0 + 2 * exposure
+        results = []
+        error = None
+        mode = self.current_mode
+        frame_size = self.switch_mode(mode, self.resolution, saved, reinit=False)
+        try:
+            for readout_mode, depth, traffic in self.candidates:
+                if not self.running:
+                    break
+                if readout_mode != mode:
+                    frame_size = self.switch_mode(readout_mode, None, saved)
+                    mode = readout_mode
+                result = self.measure(frame_size, depth, traffic)
+                result['readout_mode'] = readout_mode
+                results.append(result)
+                self.output_queue.put({"order": "usb_tune_step", "data": result})
+        except Exception as e:
+            error = str(e)
+        finally:
+            self.qhyccddll.StopQHYCCDLive(self.camhandle)
+            if mode != self.current_mode:
+                self.switch_mode(self.current_mode, self.resolution, saved)
+            for control, value in saved.items():
+                if value != QHYCCD_ERROR:
+                    self.qhyccddll.SetQHYCCDParam(self.camhandle, control, value)
+        self.callback({'results': results, 'best': select_best(results), 'canceled': not self.running, 'error': error})
+
+    def switch_mode(self, readout_mode, resolution, saved, reinit=True):
+        """切换读出模式并重新初始化，返回 (w, h)；InitQHYCCD 会重置参数，需重新写入原来的值"""
+        index = self.readout_modes[readout_mode]
+        if reinit:
+            self.qhyccddll.StopQHYCCDLive(self.camhandle)
+            if self.qhyccddll.SetQHYCCDReadMode(self.camhandle, index) != QHYCCD_SUCCESS:
+                raise RuntimeError(f"SetQHYCCDReadMode {readout_mode}")
+            self.qhyccddll.SetQHYCCDStreamMode(self.camhandle, 1)
+            if self.qhyccddll.InitQHYCCD(self.camhandle) != QHYCCD_SUCCESS:
+                raise RuntimeError(f"InitQHYCCD {readout_mode}")
+            for control, value in saved.items():
+                if value != QHYCCD_ERROR:
+                    self.qhyccddll.SetQHYCCDParam(self.camhandle, control, value)
+        if resolution is None:
+            w, h = ctypes.c_uint32(), ctypes.c_uint32()
+            self.qhyccddll.GetQHYCCDReadModeResolution(self.camhandle, index, byref(w), byref(h))
+            resolution = (0, 0, w.value, h.value)
+        if reinit:
+            self.qhyccddll.SetQHYCCDResolution(self.camhandle, *resolution)
+        return resolution[2], resolution[3]
+
+    def measure(self, frame_size, depth, traffic):
+        self.qhyccddll.StopQHYCCDLive(self.camhandle)
+        if depth is not None:
+            self.qhyccddll.SetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_TRANSFERBIT.value, depth)
+        self.qhyccddll.SetQHYCCDParam(self.camhandle, CONTROL_ID.CONTROL_USBTRAFFIC.value, traffic)
+        result = {'depth': depth, 'traffic': traffic, 'frames': 0, 'fps': 0.0, 'throughput': 0.0, 'failures': 0,
+                  'drops': 0, 'gps_gaps': None, 'interval_max': None, 'error': None}
+        if self.qhyccddll.BeginQHYCCDLive(self.camhandle) != QHYCCD_SUCCESS:
+            result['error'] = 'BeginQHYCCDLive'
+            return result
+        w, h, b, c = ctypes.c_uint32(), ctypes.c_uint32(), ctypes.c_uint32(), ctypes.c_uint32()
+        buffer = (ctypes.c_ubyte * (frame_size[0] * frame_size[1] * 3 * 2 + GPS_HEADER_SIZE))()
+        skipped = 0
+        intervals = []
+        gps_gaps = 0
+        last_seq = None
+        start = last = None
+        last_frame = time.monotonic()
+        while self.running:
+            ret = self.qhyccddll.GetQHYCCDLiveFrame(self.camhandle, byref(w), byref(h), byref(b), byref(c), buffer)
+            now = time.monotonic()
+            if ret != QHYCCD_SUCCESS:
+                result['failures'] += 1
+                if now - last_frame > self.frame_timeout:
+                    result['error'] = 'timeout'
+                    break
+                time.sleep(0.001)
+                continue
+            last_frame = now
+            if self.GPS_control:
+                seq = int.from_bytes(bytes(buffer[0:4]), 'big')
+                if last_seq is not None and seq > last_seq + 1:
+                    gps_gaps += seq - last_seq - 1
+                last_seq = seq
+            if skipped < self.settle:
+                # 开始连续模式后的头几帧耗时不稳定，不计入统计
+                skipped += 1
+                gps_gaps = 0
+                result['failures'] = 0
+                continue
+            if start is None:
+                start = now
+            else:
+                intervals.append(now - last)
+            last = now
+            result['frames'] += 1
+            if now - start >= self.duration:
+                break
+        if intervals:
+            elapsed = last - start
+            result['fps'] = len(intervals) / elapsed if elapsed > 0 else 0.0
+            result['throughput'] = result['fps'] * w.value * h.value * c.value * b.value / 8 / 2**20
+            result['interval_max'] = max(intervals) * 1000
+        if self.GPS_control:
+            result['gps_gaps'] = gps_gaps
+            result['drops'] = gps_gaps
+        elif intervals:
+            median = float(np.median(intervals))
+            result['drops'] = sum(int(round(interval / median)) - 1 for interval in intervals if median > 0 and interval > median * self.drop_ratio)
+        return result